@@ -1,5 +1,5 @@
 from django.contrib import admin # Để cấu hình cách hiển thị dữ liệu trong admin
-from .models import Profile
+from .models import Profile, CoinTransaction
 
 @admin.register(Profile) #Đây là decorator để đăng ký model Profile với Django Admin.
 class ProfileAdmin(admin.ModelAdmin): #Định nghĩa cách hiển thị model trong admin
@@ -11,3 +11,12 @@ class ProfileAdmin(admin.ModelAdmin): #Định nghĩa cách hiển thị model t
     #email_reminder: bật/tắt nhắc nhở email.
     #created_at: thời điểm tạo profile.
     search_fields = ('user__username',) #Cho phép tìm kiếm theo trường hoặc trường liên kết
+    # coins chỉ thay đổi qua sổ giao dịch (add_coins/spend_coins), không sửa tay trong admin
+    readonly_fields = ('coins', 'data_version')
+
+
+@admin.register(CoinTransaction)
+class CoinTransactionAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'transaction_type', 'amount', 'description', 'created_at')
+    list_filter = ('transaction_type',)
+    search_fields = ('profile__user__username', 'description')
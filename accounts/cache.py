@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+# Thời gian sống mặc định của một response trong cache (giây).
+# Dữ liệu không bao giờ cũ nhờ data_version, TTL chỉ để dọn bớt bộ nhớ.
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+# Bộ đếm hit/miss theo từng namespace (trong phạm vi process)
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'not_modified': 0})
+_stats_lock = threading.Lock()
+
+
+def get_api_cache():
+    '''Cache backend dùng cho API (locmem hoặc file-based, cấu hình qua API_CACHE_ALIAS)'''
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def make_cache_key(namespace, profile, request, timeout=DEFAULT_TIMEOUT, extra=None):
+    '''Key = namespace + profile + data_version + ngày hiện tại + URL (kèm query string).
+    - Với timeout ngắn hơn mặc định, thêm mốc thời gian để dữ liệu phụ thuộc đồng hồ được làm mới.
+    - extra: phiên bản của dữ liệu dùng chung (vd. catalog nhân vật), không thuộc riêng profile.'''
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = f"api:{namespace}:{profile.pk}:v{profile.data_version}:{timezone.localdate()}:{path_hash}"
+    if timeout < DEFAULT_TIMEOUT:
+        key += f":t{int(time.time() // timeout)}"
+    if extra:
+        key += f":x{extra}"
+    return key
+
+
+def make_etag(cache_key):
+    '''ETag mạnh suy ra từ cache key (tức là từ data_version của profile)'''
+    return '"%s"' % hashlib.sha1(cache_key.encode()).hexdigest()
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def _with_validators(response, etag):
+    response['ETag'] = etag
+    # Trình duyệt phải hỏi lại server (kèm If-None-Match) trước khi dùng bản đã lưu
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _count(namespace, field):
+    with _stats_lock:
+        _stats[namespace][field] += 1
+
+
+def get_cache_stats():
+    '''Trả về bản sao bộ đếm: {namespace: {'hits': x, 'misses': y, 'not_modified': z}}'''
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def cached_api(namespace, timeout=DEFAULT_TIMEOUT, extra_key=None):
+    '''Decorator cache response JSON của các API GET chỉ đọc theo profile.
+    - Chỉ lưu response thành công (HTTP 200 và "status" là "success" hoặc không có).
+    - Gắn ETag theo data_version; nếu If-None-Match khớp thì trả 304 mà không chạy view.
+    - extra_key: hàm không tham số trả về phiên bản dữ liệu dùng chung để ghép vào key.'''
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            profile = request.user.profile
+            cache = get_api_cache()
+            extra = extra_key() if extra_key else None
+            key = make_cache_key(namespace, profile, request, timeout, extra)
+            etag = make_etag(key)
+
+            if _etag_matches(request, etag):
+                _count(namespace, 'not_modified')
+                return _with_validators(HttpResponseNotModified(), etag)
+
+            content = cache.get(key)
+            if content is not None:
+                _count(namespace, 'hits')
+                return _with_validators(HttpResponse(content, content_type='application/json'), etag)
+
+            _count(namespace, 'misses')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or not _is_success(response):
+                return response
+            cache.set(key, response.content, timeout)
+            return _with_validators(response, etag)
+        return wrapper
+    return decorator
+
+
+def _is_success(response):
+    try:
+        return json.loads(response.content).get('status', 'success') == 'success'
+    except (ValueError, AttributeError):
+        return False
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from accounts.models import Profile, CoinTransaction
+
+
+class Command(BaseCommand):
+    help = "Đối soát số dư Profile.coins với tổng sổ giao dịch CoinTransaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Ghi thêm giao dịch điều chỉnh để sổ giao dịch khớp với số dư hiện tại "
+                 "(dùng một lần cho các tài khoản có xu từ trước khi có sổ giao dịch)",
+        )
+
+    def handle(self, *args, **options):
+        ledger = dict(
+            CoinTransaction.objects.order_by()
+            .values("profile_id")
+            .annotate(total=Sum("amount"))
+            .values_list("profile_id", "total")
+        )
+
+        mismatches = []
+        for profile_id, username, coins in Profile.objects.values_list("id", "user__username", "coins"):
+            total = ledger.get(profile_id, 0)
+            if coins != total:
+                mismatches.append((profile_id, username, coins, total))
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ {username}: balance {coins}, ledger {total} (diff {coins - total})"
+                ))
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("✅ All balances match the ledger."))
+            return
+
+        if not options["fix"]:
+            raise CommandError(f"{len(mismatches)} profiles are out of sync with the ledger")
+
+        CoinTransaction.objects.bulk_create([
+            CoinTransaction(
+                profile_id=profile_id,
+                amount=coins - total,
+                transaction_type="earn" if coins > total else "spend",
+                description="Điều chỉnh đối soát",
+            )
+            for profile_id, _, coins, total in mismatches
+        ])
+        self.stdout.write(self.style.SUCCESS(f"🎉 Wrote {len(mismatches)} adjustment transactions."))
@@ -1,4 +1,6 @@
-from django.db import models #tạo các bảng trong database
+from django.db import models, transaction #tạo các bảng trong database
+from django.db.models import F
+from django.utils import timezone
 from django.conf import settings # lấy cấu hình của ứng dụng
 
 # # Lấy model User mặc định từ Django (có thể là 'auth.User' hoặc custom user model) chỉ bao gồm username, password, email, first_name, last_name
@@ -20,6 +22,10 @@ class Profile(models.Model): #Tạo một bảng mới tên là "Profile" trong
     # Bật/tắt thông báo email nhắc nhở (deadline của task sắp đến) # phát triển sau
     email_reminder = models.BooleanField(default=True)
 
+    # Bộ đếm phiên bản dữ liệu: tăng mỗi khi user ghi dữ liệu (session, cảm xúc, task, nhân vật)
+    # Dùng làm một phần của cache key nên không cần xóa cache thủ công
+    data_version = models.PositiveIntegerField(default=0)
+
     # Timestamps: auto_now_add lưu thời điểm tạo; auto_now cập nhật khi save()
     created_at = models.DateTimeField(auto_now_add=True) #Thời điểm tạo profile (chỉ ghi 1 lần đầu)
     updated_at = models.DateTimeField(auto_now=True) #Thời điểm cập nhật (tự động cập nhật mỗi khi save)
@@ -38,21 +44,88 @@ class Profile(models.Model): #Tạo một bảng mới tên là "Profile" trong
         '''Hiển thị thông tin profile ngắn gọn, gồm username và số xu'''
         return f"{self.user.username} ({self.coins})"
     
-    def add_coins(self, amount: int):
-        '''Thêm xu cho người dùng'''
-        self.coins += amount
-        # Cập nhật trường coins và updated_at
-        self.save(update_fields=['coins', 'updated_at'])
+    # Các field chỉ được thay đổi bằng F() update (xem add_coins/spend_coins/bump_data_version)
+    ATOMIC_FIELDS = ('coins', 'data_version')
+
+    def save(self, *args, **kwargs):
+        '''coins và data_version chỉ được thay đổi qua F() update.
+        Khi save() toàn bộ một instance cũ, bỏ qua các field này để không ghi đè giá trị mới hơn.'''
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.ATOMIC_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def bump_data_version(self):
+        '''Tăng phiên bản dữ liệu → mọi response đã cache của profile này tự động hết hạn'''
+        Profile.objects.filter(pk=self.pk).update(data_version=F('data_version') + 1)
+        # Giữ instance hiện tại đồng bộ (giá trị chính xác không quan trọng, chỉ cần khác)
+        self.data_version += 1
+
+    @classmethod
+    def bump_data_versions(cls, profile_ids=None):
+        '''Như bump_data_version cho nhiều profile cùng lúc (profile_ids=None → tất cả),
+        dùng cho các lần ghi ngoài view như backfill hay lệnh quản trị'''
+        profiles = cls.objects.all() if profile_ids is None else cls.objects.filter(pk__in=profile_ids)
+        profiles.update(data_version=F('data_version') + 1)
+
+    def refresh_coins(self):
+        self.coins = Profile.objects.filter(pk=self.pk).values_list('coins', flat=True).get()
         return self.coins
 
-    def spend_coins(self, amount: int):
+    def add_coins(self, amount: int, description: str = ''):
+        '''Thêm xu cho người dùng (cộng nguyên tử bằng F() + ghi sổ CoinTransaction)'''
+        if amount <= 0:
+            return self.coins
+        with transaction.atomic():
+            Profile.objects.filter(pk=self.pk).update(
+                coins=F('coins') + amount, updated_at=timezone.now()
+            )
+            CoinTransaction.objects.create(
+                profile=self, amount=amount, transaction_type='earn', description=description
+            )
+            return self.refresh_coins()
+
+    def spend_coins(self, amount: int, description: str = ''):
         '''Trừ xu khi mua vật phẩm'''
         # Nếu đủ xu thì trừ và trả về True, không đủ thì trả về False
-        if self.coins >= amount: #Kiểm tra có đủ coins không
-            self.coins -= amount
-            self.save(update_fields=['coins', 'updated_at'])
+        # Điều kiện coins >= amount nằm ngay trong câu UPDATE nên 2 request song song không thể cùng trừ
+        with transaction.atomic():
+            updated = Profile.objects.filter(pk=self.pk, coins__gte=amount).update(
+                coins=F('coins') - amount, updated_at=timezone.now()
+            )
+            if not updated:
+                self.refresh_coins()
+                return False
+            if amount:
+                CoinTransaction.objects.create(
+                    profile=self, amount=-amount, transaction_type='spend', description=description
+                )
+            self.refresh_coins()
             return True
-        return False
+
+    @classmethod
+    def bulk_add_coins(cls, amounts: dict, description: str = ''):
+        '''Cộng xu cho nhiều profile cùng lúc: amounts = {profile_id: amount}.
+        Một câu UPDATE cho mỗi mức xu + một bulk_create sổ giao dịch, tất cả trong 1 transaction.'''
+        amounts = {pid: amt for pid, amt in amounts.items() if amt > 0}
+        if not amounts:
+            return 0
+
+        by_amount = {}
+        for pid, amt in amounts.items():
+            by_amount.setdefault(amt, []).append(pid)
+
+        now = timezone.now()
+        with transaction.atomic():
+            for amt, pids in by_amount.items():
+                cls.objects.filter(pk__in=pids).update(coins=F('coins') + amt, updated_at=now)
+            CoinTransaction.objects.bulk_create([
+                CoinTransaction(profile_id=pid, amount=amt, transaction_type='earn', description=description)
+                for pid, amt in amounts.items()
+            ], batch_size=1000)
+        return len(amounts)
     
 class CoinTransaction(models.Model):
     '''Lịch sử giao dịch xu của người dùng'''
@@ -66,7 +139,7 @@ class CoinTransaction(models.Model):
     # ForeignKey: Một profile có NHIỀU giao dịch
     # on_delete=models.CASCADE: Xóa profile → xóa tất cả giao dịch của profile đó
     # related_name='transactions': Đặt tên cho mối quan hệ (dùng để truy vấn)
-    amount = models.IntegerField() # Số xu thay đổi (có thể là dương hoặc âm)
+    amount = models.IntegerField() # Số xu thay đổi: dương khi earn, âm khi spend → tổng amount = số dư
     transaction_type = models.CharField(max_length=5, choices=TRANSACTION_TYPES)
     created_at = models.DateTimeField(auto_now_add=True) # Thời gian giao dịch
     description = models.CharField(max_length=255, blank=True) # Mô tả, Ví dụ: "Hoàn thành task X"
@@ -1,3 +1,116 @@
-from django.test import TestCase
+import time
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+
+from .models import Profile, CoinTransaction
+
+
+def _retry_locked(func, attempts=200):
+    '''SQLite khóa cả database khi ghi; thử lại để mô phỏng busy timeout của DB thật'''
+    for _ in range(attempts):
+        try:
+            return func()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            time.sleep(0.005)
+    raise AssertionError('database stayed locked')
+
+
+def _ledger_total(profile):
+    return CoinTransaction.objects.filter(profile=profile).aggregate(total=Sum('amount'))['total'] or 0
+
+
+class CoinLedgerTest(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create_user(username='ledger', password='secret').profile
+
+    def test_add_and_spend_write_ledger(self):
+        self.assertEqual(self.profile.add_coins(100, 'bonus'), 100)
+        self.assertTrue(self.profile.spend_coins(30, 'shop'))
+        self.assertFalse(self.profile.spend_coins(500, 'too expensive'))
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.coins, 70)
+        self.assertEqual(_ledger_total(self.profile), 70)
+        self.assertEqual(
+            list(self.profile.transactions.order_by('id').values_list('transaction_type', 'amount')),
+            [('earn', 100), ('spend', -30)],
+        )
+
+    def test_stale_profile_save_does_not_overwrite_coins(self):
+        stale = Profile.objects.get(pk=self.profile.pk)
+        self.profile.add_coins(50)
+        stale.email_reminder = False
+        stale.save()
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.coins, 50)
+        self.assertFalse(self.profile.email_reminder)
+
+    def test_bulk_add_coins(self):
+        others = [
+            User.objects.create_user(username=f'bulk{i}', password='secret').profile
+            for i in range(3)
+        ]
+        amounts = {self.profile.pk: 10, others[0].pk: 10, others[1].pk: 25, others[2].pk: 0}
+
+        self.assertEqual(Profile.bulk_add_coins(amounts, 'event'), 3)
+
+        balances = dict(Profile.objects.values_list('pk', 'coins'))
+        self.assertEqual(balances[self.profile.pk], 10)
+        self.assertEqual(balances[others[1].pk], 25)
+        self.assertEqual(balances[others[2].pk], 0)
+        self.assertEqual(CoinTransaction.objects.count(), 3)
+
+    def test_reconcile_command(self):
+        self.profile.add_coins(40)
+        call_command('reconcile_coins', stdout=StringIO())
+
+        # Số dư có từ trước khi có sổ giao dịch
+        Profile.objects.filter(pk=self.profile.pk).update(coins=55)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 profiles are out of sync with the ledger'):
+            call_command('reconcile_coins', stdout=out)
+        self.assertIn('balance 55, ledger 40 (diff 15)', out.getvalue())
+        call_command('reconcile_coins', fix=True, stdout=StringIO())
+        self.assertEqual(_ledger_total(self.profile), 55)
+
+
+class CoinLedgerConcurrencyTest(TransactionTestCase):
+    '''Nhiều thread cùng cộng/trừ xu: không được mất cập nhật, không được âm xu'''
+
+    def test_concurrent_awards_and_purchases(self):
+        profile = User.objects.create_user(username='race', password='secret').profile
+        profile.add_coins(100)
+
+        def award(_):
+            try:
+                _retry_locked(lambda: Profile.objects.get(pk=profile.pk).add_coins(5, 'award'))
+            finally:
+                connection.close()
+
+        def purchase(_):
+            try:
+                return _retry_locked(lambda: Profile.objects.get(pk=profile.pk).spend_coins(40, 'purchase'))
+            finally:
+                connection.close()
+
+        # Xen kẽ 40 lần thưởng và 20 lần mua
+        jobs = [award if i % 3 else purchase for i in range(60)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda job: job(None), jobs))
+
+        profile.refresh_from_db()
+        awards = jobs.count(award)
+        bought = sum(1 for job, result in zip(jobs, results) if job is purchase and result)
+        self.assertGreater(bought, 0)
+        self.assertEqual(profile.coins, 100 + 5 * awards - 40 * bought)
+        self.assertGreaterEqual(profile.coins, 0)
+        self.assertEqual(_ledger_total(profile), profile.coins)
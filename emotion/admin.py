@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import EmotionEntry
+from .models import EmotionEntry, EmotionSnapshot
 
 @admin.register(EmotionEntry)
 class EmotionEntryAdmin(admin.ModelAdmin):
     list_display = ('profile', 'study_session', 'emotion', 'created_at')
     list_filter = ('emotion', 'created_at')
     search_fields = ('profile__user__username', 'study_session__subject__name')
+
+
+@admin.register(EmotionSnapshot)
+class EmotionSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'latest_emotion', 'latest_at', 'streak_current', 'streak_longest', 'updated_at')
+    readonly_fields = ('updated_at',)
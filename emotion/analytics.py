@@ -0,0 +1,113 @@
+from django.db.models.functions import ExtractHour
+
+from .models import EMOTION_COLORS, EMOTION_ICONS, EMOTION_LABELS, EmotionEntry
+
+# Thứ tự cảm xúc cố định cho mọi bảng kết quả (theo EMOTION_CHOICES)
+EMOTIONS = tuple(EMOTION_LABELS)
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+# Kiểu dòng của mảng NumPy tương ứng với load_sessions
+ROW_DTYPE = [('emotion', 'U10'), ('duration', 'f8'), ('hour', 'i8'), ('subject', 'i8')]
+
+
+def load_sessions(profile):
+    '''(emotion, duration_seconds, giờ bắt đầu địa phương, subject_id) của các ca học đã có cảm xúc - 1 query.
+    Giờ bắt đầu theo múi giờ hiện tại do database tính (ExtractHour), không đổi múi giờ từng dòng bằng Python.'''
+    return list(
+        EmotionEntry.objects.filter(profile=profile, study_session__end_time__isnull=False)
+        .annotate(hour=ExtractHour('study_session__start_time'))
+        .order_by()
+        .values_list('emotion', 'study_session__duration_seconds', 'hour', 'study_session__subject_id')
+    )
+
+
+def _round(values):
+    return [round(float(v), 1) for v in values]
+
+
+def mood_productivity(profile):
+    '''Liên hệ cảm xúc ↔ kết quả học, tính vector hóa bằng NumPy:
+    - by_emotion: số ca, thời lượng trung bình / trung vị (phút) theo cảm xúc
+    - by_hour: phân bố cảm xúc theo giờ bắt đầu ca học (0-23)
+    - by_subject: tỷ lệ cảm xúc (%) của từng môn'''
+    # Import muộn: NumPy chỉ cần cho endpoint này, không làm chậm lúc khởi động
+    import numpy as np
+
+    from study.models import Subject
+
+    rows = load_sessions(profile)
+    n_emotions = len(EMOTIONS)
+    # Chuyển cả danh sách tuple sang mảng có cấu trúc trong một lượt (không tách cột bằng Python)
+    data = np.fromiter(rows, dtype=ROW_DTYPE, count=len(rows))
+
+    # Mã hóa cảm xúc bằng tìm nhị phân trong danh sách cảm xúc đã sắp xếp (chỉ 6 giá trị).
+    # Cảm xúc lạ (không có trong EMOTION_CHOICES) bị bỏ qua
+    sorted_emotions = np.array(sorted(EMOTIONS))
+    position = np.searchsorted(sorted_emotions, data['emotion']).clip(max=n_emotions - 1)
+    known = sorted_emotions[position] == data['emotion']
+    codes = np.array([EMOTION_INDEX[e] for e in sorted_emotions.tolist()])[position[known]]
+    data = data[known]
+
+    minutes = data['duration'] / 60
+    hours = data['hour']
+    subject_ids = data['subject']
+
+    # Trung bình / trung vị theo nhóm: sắp xếp theo (cảm xúc, thời lượng) rồi lấy phần tử giữa mỗi nhóm
+    counts = np.bincount(codes, minlength=n_emotions)
+    sums = np.bincount(codes, weights=minutes, minlength=n_emotions)
+    means = np.divide(sums, counts, out=np.zeros(n_emotions), where=counts > 0)
+    sorted_minutes = minutes[np.lexsort((minutes, codes))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_data = counts > 0
+    lower = np.where(has_data, starts + (counts - 1) // 2, 0)
+    upper = np.where(has_data, starts + counts // 2, 0)
+    medians = np.zeros(n_emotions)
+    if len(sorted_minutes):
+        medians = np.where(has_data, (sorted_minutes[lower] + sorted_minutes[upper]) / 2, 0)
+
+    by_hour = np.bincount(hours * n_emotions + codes, minlength=24 * n_emotions).reshape(24, n_emotions)
+
+    unique_subjects, subject_index = np.unique(subject_ids, return_inverse=True)
+    subject_index = subject_index.reshape(-1)
+    by_subject = np.bincount(
+        subject_index * n_emotions + codes, minlength=len(unique_subjects) * n_emotions
+    ).reshape(len(unique_subjects), n_emotions)
+    subject_totals = by_subject.sum(axis=1)
+    names = dict(Subject.objects.filter(pk__in=unique_subjects.tolist()).values_list('pk', 'name'))
+    subject_mix = np.divide(
+        by_subject * 100, subject_totals[:, None],
+        out=np.zeros(by_subject.shape), where=subject_totals[:, None] > 0,
+    )
+
+    return {
+        'total_sessions': int(counts.sum()),
+        'by_emotion': [
+            {
+                'emotion': emotion,
+                'label': EMOTION_LABELS[emotion],
+                'icon': EMOTION_ICONS.get(emotion, '❓'),
+                'color': EMOTION_COLORS.get(emotion, '#6C63FF'),
+                'sessions': int(count),
+                'mean_minutes': mean,
+                'median_minutes': median,
+            }
+            for emotion, count, mean, median in zip(EMOTIONS, counts, _round(means), _round(medians))
+        ],
+        'by_hour': [
+            {'hour': hour, 'total': int(row.sum()), 'counts': dict(zip(EMOTIONS, row.tolist()))}
+            for hour, row in enumerate(by_hour)
+        ],
+        'by_subject': sorted(
+            (
+                {
+                    'subject_id': int(subject_id),
+                    'subject': names.get(int(subject_id)),
+                    'sessions': int(total),
+                    'mix': dict(zip(EMOTIONS, _round(mix))),
+                }
+                for subject_id, total, mix in zip(unique_subjects, subject_totals, subject_mix)
+            ),
+            key=lambda item: item['sessions'],
+            reverse=True,
+        ),
+    }
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from emotion.snapshot import check_consistency
+
+
+class Command(BaseCommand):
+    help = "So snapshot thống kê cảm xúc với dữ liệu EmotionEntry gốc (--fix để tính lại bản bị lệch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Ghi đè snapshot bị lệch bằng bản tính lại")
+
+    def handle(self, *args, **options):
+        mismatched = check_consistency(fix=options['fix'])
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("Tất cả snapshot cảm xúc đều khớp"))
+            return
+        action = "Đã tính lại" if options['fix'] else "Lệch"
+        self.stdout.write(self.style.WARNING(
+            f"{action} {len(mismatched)} snapshot: profile {', '.join(map(str, mismatched))}"
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("emotion", "0002_alter_emotionentry_emotion_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmotionSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("counts", models.JSONField(default=dict)),
+                ("recent_days", models.JSONField(default=dict)),
+                (
+                    "latest_emotion",
+                    models.CharField(blank=True, max_length=10, null=True),
+                ),
+                ("latest_at", models.DateTimeField(blank=True, null=True)),
+                ("streak_current", models.PositiveIntegerField(default=0)),
+                ("streak_longest", models.PositiveIntegerField(default=0)),
+                ("streak_last_day", models.DateField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "profile",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="emotion_snapshot",
+                        to="accounts.profile",
+                    ),
+                ),
+            ],
+        ),
+    ]
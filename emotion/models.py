@@ -1,9 +1,21 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Q
 
 from accounts.models import Profile
+from visualization.streaks import get_emotion_streak
+
+# Điểm tâm trạng (thang 1-10) của từng loại cảm xúc, dùng cho dự đoán/thống kê
+MOOD_SCORES = {
+    'excited': 9,
+    'happy': 8,
+    'calm': 7,
+    'tired': 4,
+    'stressed': 3,
+    'sad': 2,
+}
+NEUTRAL_MOOD_SCORE = 5
 
 class EmotionEntry(models.Model):
     profile = models.ForeignKey(
@@ -36,15 +48,31 @@ class EmotionEntry(models.Model):
         return f"{subject_name} - {self.get_emotion_display_icon()}"
 
     def get_emotion_display_icon(self):
-        icon_map = {
-            'happy': '😊 Happy',
-            'sad': '😢 Sad',
-            'tired': '😴 Tired',
-            'calm': '😌 Calm',
-            'stressed': '😤 Stressed',
-            'excited': '🤩 Excited',
-        }
-        return icon_map.get(self.emotion, '❓ Unknown')
+        return EMOTION_LABELS.get(self.emotion, '❓ Unknown')
+
+    @classmethod
+    def record(cls, session, emotion, notes=""):
+        '''Lưu (hoặc sửa) cảm xúc của một ca học và cập nhật snapshot thống kê trong cùng transaction.
+        Trả về (entry, created).'''
+        from .snapshot import record_entry
+
+        with transaction.atomic():
+            # Cảm xúc cũ (nếu có) để chuyển bộ đếm trong snapshot sang cảm xúc mới
+            previous = cls.objects.select_for_update().filter(
+                study_session=session
+            ).values_list('emotion', flat=True).first()
+
+            # Nếu đã có cảm xúc → update
+            entry, created = cls.objects.update_or_create(
+                study_session=session,
+                defaults={
+                    'profile_id': session.profile_id,
+                    'emotion': emotion,
+                    'notes': notes,
+                },
+            )
+            record_entry(entry, previous_emotion=None if created else previous)
+        return entry, created
 
     class Meta:
         verbose_name = "Emotion Entry (Cảm xúc)"
@@ -52,128 +80,190 @@ class EmotionEntry(models.Model):
         ordering = ['-created_at']
 
 
+# Bảng tra cố định theo loại cảm xúc (dựng một lần khi import module)
+EMOTION_LABELS = dict(EmotionEntry.EMOTION_CHOICES)
+EMOTION_ICONS = {
+    'happy': '😊',
+    'sad': '😢',
+    'tired': '😴',
+    'calm': '😌',
+    'stressed': '😤',
+    'excited': '🤩',
+}
+EMOTION_COLORS = {
+    'happy': '#4CAF50',
+    'sad': '#2196F3',
+    'tired': '#FF9800',
+    'calm': '#009688',
+    'stressed': '#F44336',
+    'excited': '#9C27B0',
+}
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
 class EmotionStats:
     """Helper class để tính toán thống kê cảm xúc"""
 
     @staticmethod
-    def get_weekly_history(profile):
-        """Lấy lịch sử cảm xúc 7 ngày (tương tự code cũ nhưng theo EmotionEntry)."""
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=6)
+    def _week_window():
+        """(ngày đầu, thời điểm bắt đầu) của cửa sổ 7 ngày gần nhất, tính theo giờ địa phương"""
+        start_date = timezone.localdate() - timedelta(days=6)
+        return start_date, timezone.make_aware(datetime.combine(start_date, time.min))
+
+    @staticmethod
+    def _emotion_counts(profile):
+        """{emotion: (số lần từ trước tới nay, số lần trong 7 ngày)} - 1 query gom nhóm"""
+        _, week_start = EmotionStats._week_window()
+        rows = EmotionEntry.objects.filter(profile=profile).values('emotion').annotate(
+            total=Count('id'),
+            week=Count('id', filter=Q(created_at__gte=week_start)),
+        ).order_by()
+        return {row['emotion']: (row['total'], row['week']) for row in rows}
 
+    @staticmethod
+    def get_weekly_history(profile):
+        """Lấy lịch sử cảm xúc 7 ngày: cảm xúc gần nhất của mỗi ngày (1 query, duyệt theo thời gian)."""
+        start_date, week_start = EmotionStats._week_window()
         entries = EmotionEntry.objects.filter(
-            profile=profile,
-            created_at__date__range=[start_date, end_date]
-        ).order_by('created_at')
+            profile=profile, created_at__gte=week_start
+        ).order_by('created_at').values_list('emotion', 'created_at')
 
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        history = []
+        # Duyệt tăng dần nên bản ghi sau ghi đè bản ghi trước → còn lại cảm xúc gần nhất trong ngày
+        latest_by_day = {timezone.localdate(created_at): emotion for emotion, created_at in entries}
 
+        history = []
         for i in range(7):
             day_date = start_date + timedelta(days=i)
-            day_entries = entries.filter(created_at__date=day_date)
-
-            if day_entries.exists():
-                latest = day_entries.last()
-                history.append({
-                    "day": days[day_date.weekday()],
-                    "emotion": latest.emotion,
-                    "icon": latest.get_emotion_display_icon(),
-                    "level": 30 + (i * 5),  # mức hiển thị tùy ý
-                })
-            else:
-                history.append({
-                    "day": days[day_date.weekday()],
-                    "emotion": None,
-                    "icon": "—",
-                    "level": 0,
-                })
-
+            emotion = latest_by_day.get(day_date)
+            history.append({
+                "day": WEEKDAY_NAMES[day_date.weekday()],
+                "emotion": emotion,
+                "icon": EMOTION_LABELS.get(emotion, '❓ Unknown') if emotion else "—",
+                "level": 30 + (i * 5) if emotion else 0,  # mức hiển thị tùy ý
+            })
         return history
 
     @staticmethod
-    def get_weekly_emotion_distribution(profile):
-        """Thống kê tần suất các loại cảm xúc trong 7 ngày qua"""
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=6)
-
-        emotion_counts = EmotionEntry.objects.filter(
-            profile=profile,
-            created_at__date__range=[start_date, end_date]
-        ).values('emotion').annotate(count=Count('id')).order_by('-count')
-
-        # Tạo distribution với tất cả emotions, kể cả count = 0
-        distribution = []
-        all_emotions = dict(EmotionEntry.EMOTION_CHOICES)
-        
-        for emotion_value, emotion_display in all_emotions.items():
-            count_data = next((item for item in emotion_counts if item['emotion'] == emotion_value), None)
-            count = count_data['count'] if count_data else 0
-            
-            # Map emotion value với icon và màu sắc
-            icon_map = {
-                'happy': '😊',
-                'sad': '😢', 
-                'tired': '😴',
-                'calm': '😌',
-                'stressed': '😤',
-                'excited': '🤩',
+    def _build_distribution(weekly_counts):
+        """Danh sách đủ mọi loại cảm xúc (kể cả count = 0) kèm icon, màu, phần trăm"""
+        total = sum(weekly_counts.values())
+        distribution = [
+            {
+                'emotion': emotion,
+                'label': label,
+                'icon': EMOTION_ICONS.get(emotion, '❓'),
+                'color': EMOTION_COLORS.get(emotion, '#6C63FF'),
+                'count': weekly_counts.get(emotion, 0),
+                'percentage': round(weekly_counts.get(emotion, 0) / total * 100, 1) if total else 0,
             }
-            
-            color_map = {
-                'happy': '#4CAF50',
-                'sad': '#2196F3',
-                'tired': '#FF9800', 
-                'calm': '#009688',
-                'stressed': '#F44336',
-                'excited': '#9C27B0',
-            }
-            
-            distribution.append({
-                'emotion': emotion_value,
-                'label': emotion_display,
-                'icon': icon_map.get(emotion_value, '❓'),
-                'color': color_map.get(emotion_value, '#6C63FF'),
-                'count': count,
-                'percentage': 0  # Sẽ tính sau
-            })
+            for emotion, label in EMOTION_LABELS.items()
+        ]
+        return sorted(distribution, key=lambda x: x['count'], reverse=True)
 
-        # Tính tổng và phần trăm
-        total = sum(item['count'] for item in distribution)
-        for item in distribution:
-            item['percentage'] = round((item['count'] / total * 100) if total > 0 else 0, 1)
+    @staticmethod
+    def _build_statistics(counts, streak):
+        """counts: {emotion: số lần từ trước tới nay}, streak: (current, longest)"""
+        total = sum(counts.values())
+        # Hòa thì lấy theo thứ tự EMOTION_CHOICES để kết quả luôn xác định
+        most_frequent = max(
+            (emotion for emotion in EMOTION_LABELS if counts.get(emotion)),
+            key=lambda emotion: counts[emotion],
+            default=None,
+        )
+        return {
+            "total_entries": total,
+            "most_frequent_emotion": most_frequent,
+            "most_frequent_count": counts[most_frequent] if most_frequent else 0,
+            "current_streak": streak[0],
+            "longest_streak": streak[1],
+        }
 
-        return sorted(distribution, key=lambda x: x['count'], reverse=True)
+    @staticmethod
+    def get_weekly_emotion_distribution(profile):
+        """Thống kê tần suất các loại cảm xúc trong 7 ngày qua"""
+        counts = EmotionStats._emotion_counts(profile)
+        return EmotionStats._build_distribution({emotion: week for emotion, (_, week) in counts.items()})
 
     @staticmethod
     def get_emotion_statistics(profile):
         """Tính thống kê cảm xúc chung."""
-        total = EmotionEntry.objects.filter(profile=profile).count()
+        counts = EmotionStats._emotion_counts(profile)
+        return EmotionStats._build_statistics(
+            {emotion: total for emotion, (total, _) in counts.items()},
+            # Streak ngày liền kề có ghi nhận cảm xúc (1 query ngày)
+            get_emotion_streak(profile),
+        )
 
-        emotion_counts = EmotionEntry.objects.filter(profile=profile)\
-            .values('emotion')\
-            .annotate(count=Count('id'))\
-            .order_by('-count')
+    @staticmethod
+    def get_current_emotion(profile):
+        """Lấy cảm xúc gần nhất."""
+        return EmotionEntry.objects.filter(profile=profile).order_by('-created_at').values_list(
+            'emotion', flat=True
+        ).first()
 
-        most_frequent = emotion_counts.first() if emotion_counts else None
+    @staticmethod
+    def compute_summary(profile):
+        """Phân bố tuần + thống kê chung + cảm xúc hiện tại tính thẳng từ EmotionEntry (3 query).
+        Dùng để kiểm tra snapshot; trang/API đọc qua get_summary."""
+        counts = EmotionStats._emotion_counts(profile)
+        return {
+            "weekly_distribution": EmotionStats._build_distribution(
+                {emotion: week for emotion, (_, week) in counts.items()}
+            ),
+            "stats": EmotionStats._build_statistics(
+                {emotion: total for emotion, (total, _) in counts.items()},
+                get_emotion_streak(profile),
+            ),
+            "current_emotion": EmotionStats.get_current_emotion(profile),
+        }
 
-        # Streak ngày liền kề có ghi nhận cảm xúc
-        streak = 0
-        current_date = timezone.now().date()
+    @staticmethod
+    def get_summary(profile):
+        """Như compute_summary nhưng đọc từ EmotionSnapshot của profile (1 query)"""
+        from .snapshot import get_snapshot
 
-        while EmotionEntry.objects.filter(profile=profile, created_at__date=current_date).exists():
-            streak += 1
-            current_date -= timedelta(days=1)
+        return get_snapshot(profile).as_summary()
 
+
+class EmotionSnapshot(models.Model):
+    """Thống kê cảm xúc tính sẵn cho từng profile, cập nhật khi lưu cảm xúc (xem emotion.snapshot)
+    để trang/API cảm xúc không phải aggregate lại EmotionEntry"""
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='emotion_snapshot')
+    # {emotion: số lần từ trước tới nay}
+    counts = models.JSONField(default=dict)
+    # {'YYYY-MM-DD': {emotion: số lần}} cho 7 ngày (giờ địa phương) gần nhất tính tới lần ghi cuối
+    recent_days = models.JSONField(default=dict)
+    latest_emotion = models.CharField(max_length=10, null=True, blank=True)
+    latest_at = models.DateTimeField(null=True, blank=True)
+    # Chuỗi ngày liên tiếp kết thúc ở streak_last_day (giống StudyStreak)
+    streak_current = models.PositiveIntegerField(default=0)
+    streak_longest = models.PositiveIntegerField(default=0)
+    streak_last_day = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Emotion snapshot of {self.profile}"
+
+    def weekly_counts(self, today=None):
+        """{emotion: số lần} trong cửa sổ 7 ngày kết thúc ở hôm nay"""
+        today = today or timezone.localdate()
+        window = {(today - timedelta(days=i)).isoformat() for i in range(7)}
+        weekly = {}
+        for day, day_counts in self.recent_days.items():
+            if day in window:
+                for emotion, count in day_counts.items():
+                    weekly[emotion] = weekly.get(emotion, 0) + count
+        return weekly
+
+    def current_streak(self, today=None):
+        today = today or timezone.localdate()
+        return self.streak_current if self.streak_last_day == today else 0
+
+    def as_summary(self, today=None):
         return {
-            "total_entries": total,
-            "most_frequent_emotion": most_frequent["emotion"] if most_frequent else None,
-            "most_frequent_count": most_frequent["count"] if most_frequent else 0,
-            "current_streak": streak,
+            "weekly_distribution": EmotionStats._build_distribution(self.weekly_counts(today)),
+            "stats": EmotionStats._build_statistics(
+                self.counts, (self.current_streak(today), self.streak_longest)
+            ),
+            "current_emotion": self.latest_emotion,
         }
-
-    @staticmethod
-    def get_current_emotion(profile):
-        """Lấy cảm xúc gần nhất."""
-        latest = EmotionEntry.objects.filter(profile=profile).order_by('-created_at').first()
-        return latest.emotion if latest else None
\ No newline at end of file
@@ -0,0 +1,165 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.models import Profile
+from visualization.streaks import compute_streaks, emotion_days
+
+from .models import EmotionEntry, EmotionSnapshot
+
+# Số ngày giữ trong recent_days (đúng bằng cửa sổ phân bố tuần)
+RECENT_DAYS = 7
+
+
+def _trim_recent_days(recent_days, today):
+    oldest = (today - timedelta(days=RECENT_DAYS - 1)).isoformat()
+    return {day: counts for day, counts in recent_days.items() if day >= oldest}
+
+
+def get_snapshot(profile):
+    '''Snapshot của profile: 1 query khi đã có, tự tính lại khi chưa có (vd. sau khi bị invalidate)'''
+    snapshot = EmotionSnapshot.objects.filter(profile=profile).first()
+    if snapshot is None:
+        snapshot = rebuild([profile.pk])[profile.pk]
+    return snapshot
+
+
+def compute_snapshot(profile_id, today=None):
+    '''Tính snapshot (chưa lưu) thẳng từ EmotionEntry của profile'''
+    today = today or timezone.localdate()
+    entries = EmotionEntry.objects.filter(profile_id=profile_id)
+
+    counts = dict(entries.values_list('emotion').annotate(n=Count('id')).order_by())
+
+    recent_days = {}
+    window_start = timezone.make_aware(datetime.combine(today - timedelta(days=RECENT_DAYS - 1), time.min))
+    for emotion, created_at in entries.filter(created_at__gte=window_start).values_list('emotion', 'created_at'):
+        day_counts = recent_days.setdefault(timezone.localdate(created_at).isoformat(), {})
+        day_counts[emotion] = day_counts.get(emotion, 0) + 1
+
+    latest = entries.order_by('-created_at').values_list('emotion', 'created_at').first()
+
+    days = list(emotion_days(Profile(pk=profile_id)))
+    # streak_current là chuỗi kết thúc ở ngày cuối cùng, khi đọc mới so với hôm nay
+    current, longest, last_day = compute_streaks(days, today=max(days) if days else None)
+
+    return EmotionSnapshot(
+        profile_id=profile_id,
+        counts=counts,
+        recent_days=recent_days,
+        latest_emotion=latest[0] if latest else None,
+        latest_at=latest[1] if latest else None,
+        streak_current=current,
+        streak_longest=longest,
+        streak_last_day=last_day,
+    )
+
+
+def rebuild(profile_ids=None):
+    '''Tính lại snapshot từ EmotionEntry rồi upsert. profile_ids=None → tất cả profile.
+    Trả về {profile_id: EmotionSnapshot}.'''
+    if profile_ids is None:
+        profile_ids = Profile.objects.values_list('pk', flat=True)
+    snapshots = [compute_snapshot(pk) for pk in profile_ids]
+    EmotionSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=[
+            'counts', 'recent_days', 'latest_emotion', 'latest_at',
+            'streak_current', 'streak_longest', 'streak_last_day', 'updated_at',
+        ],
+    )
+    return {snapshot.profile_id: snapshot for snapshot in snapshots}
+
+
+def invalidate(profile_id):
+    '''Bỏ snapshot (vd. khi xóa ca học kéo theo cảm xúc); lần đọc sau sẽ tính lại'''
+    EmotionSnapshot.objects.filter(profile_id=profile_id).delete()
+
+
+def _add(counts, emotion, delta):
+    counts[emotion] = counts.get(emotion, 0) + delta
+    if counts[emotion] <= 0:
+        del counts[emotion]
+
+
+def record_entry(entry, previous_emotion=None):
+    '''Cập nhật snapshot sau khi lưu một EmotionEntry.
+    previous_emotion: cảm xúc cũ nếu đây là sửa bản ghi đã có (None nếu là bản ghi mới).
+    Chạy trong transaction và khóa dòng snapshot nên các lần lưu đồng thời được cộng lần lượt.'''
+    with transaction.atomic():
+        snapshot = EmotionSnapshot.objects.select_for_update().filter(profile_id=entry.profile_id).first()
+        if snapshot is None:
+            rebuild([entry.profile_id])
+            return
+
+        today = timezone.localdate()
+        day = timezone.localdate(entry.created_at)
+        day_key = day.isoformat()
+        recent_days = _trim_recent_days(snapshot.recent_days, today)
+
+        if previous_emotion is not None:
+            # Sửa cảm xúc: chuyển 1 lần đếm từ cảm xúc cũ sang cảm xúc mới, ngày không đổi
+            _add(snapshot.counts, previous_emotion, -1)
+            _add(snapshot.counts, entry.emotion, 1)
+            if day_key in recent_days:
+                _add(recent_days[day_key], previous_emotion, -1)
+                _add(recent_days[day_key], entry.emotion, 1)
+            if snapshot.latest_at == entry.created_at:
+                snapshot.latest_emotion = entry.emotion
+        else:
+            last_day = snapshot.streak_last_day
+            if last_day is not None and day < last_day:
+                # Ghi bù ngày cũ: chuỗi có thể thay đổi ở giữa → tính lại toàn bộ
+                rebuild([entry.profile_id])
+                return
+
+            _add(snapshot.counts, entry.emotion, 1)
+            if day >= today - timedelta(days=RECENT_DAYS - 1):
+                _add(recent_days.setdefault(day_key, {}), entry.emotion, 1)
+            if snapshot.latest_at is None or entry.created_at >= snapshot.latest_at:
+                snapshot.latest_emotion = entry.emotion
+                snapshot.latest_at = entry.created_at
+
+            if last_day is None or day - last_day > timedelta(days=1):
+                snapshot.streak_current = 1
+            elif day - last_day == timedelta(days=1):
+                snapshot.streak_current += 1
+            snapshot.streak_longest = max(snapshot.streak_longest, snapshot.streak_current)
+            snapshot.streak_last_day = day
+
+        snapshot.recent_days = recent_days
+        snapshot.save()
+
+
+def _comparable(snapshot, today):
+    '''Các giá trị mà người đọc thấy được (bỏ qua ngày đã ra khỏi cửa sổ và bộ đếm bằng 0)'''
+    return (
+        {emotion: n for emotion, n in snapshot.counts.items() if n},
+        snapshot.weekly_counts(today),
+        snapshot.latest_emotion,
+        snapshot.latest_at,
+        snapshot.current_streak(today),
+        snapshot.streak_longest,
+    )
+
+
+def check_consistency(profile_ids=None, fix=False):
+    '''So các snapshot đã lưu với bản tính lại từ EmotionEntry (profile chưa có snapshot thì bỏ qua,
+    lần đọc sau sẽ tự tính). Trả về danh sách profile_id bị lệch; fix=True → ghi đè bằng bản tính lại.'''
+    today = timezone.localdate()
+    stored = EmotionSnapshot.objects.order_by('profile_id')
+    if profile_ids is not None:
+        stored = stored.filter(profile_id__in=profile_ids)
+
+    mismatched = [
+        snapshot.profile_id
+        for snapshot in stored.iterator()
+        if _comparable(snapshot, today) != _comparable(compute_snapshot(snapshot.profile_id, today), today)
+    ]
+    if fix and mismatched:
+        rebuild(mismatched)
+    return mismatched
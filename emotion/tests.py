@@ -1,3 +1,285 @@
+import os
+import timeit
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.cache import get_api_cache
+from study.models import StudySession, Subject
+
+from .analytics import EMOTIONS, mood_productivity
+from .models import EmotionEntry, EmotionSnapshot, EmotionStats
+from .snapshot import check_consistency, rebuild as rebuild_snapshots
+
+# Kiểm tra thời gian chạy chỉ bật khi cần (máy CI bận sẽ làm test đo thời gian chập chờn)
+RUN_TIMING_TESTS = os.environ.get('TIMING_TESTS') == '1'
+# Ngân sách cho mood_productivity với 20k ca học (ms).
+# SQLite tính ExtractHour bằng hàm Python cho từng dòng (~250 ms / 20k dòng) nên có ngân sách riêng
+ANALYTICS_BUDGET_MS = float(os.environ.get('ANALYTICS_BUDGET_MS', '50'))
+SQLITE_ANALYTICS_BUDGET_MS = float(os.environ.get('SQLITE_ANALYTICS_BUDGET_MS', '500'))
+
+
+class EmotionStatsTest(TestCase):
+    '''Lịch sử tuần, phân bố và thống kê cảm xúc với số query cố định'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='mood', password='secret')
+        self.profile = self.user.profile
+        self.subject = Subject.objects.create(profile=self.profile, name='Math')
+        self.client.login(username='mood', password='secret')
+
+    def log(self, emotion, days_ago=0, minute=0):
+        # Ghi vào giữa trưa (giờ địa phương) của ngày tương ứng để không lệch ngày khi chạy gần nửa đêm
+        session = StudySession.objects.create(profile=self.profile, subject=self.subject)
+        entry = EmotionEntry.objects.create(profile=self.profile, study_session=session, emotion=emotion)
+        day = timezone.localdate() - timedelta(days=days_ago)
+        created_at = timezone.make_aware(datetime.combine(day, time(12, minute)))
+        EmotionEntry.objects.filter(pk=entry.pk).update(created_at=created_at)
+        return entry
+
+    def test_weekly_history_keeps_latest_entry_per_day(self):
+        self.log('happy', days_ago=2, minute=30)
+        self.log('sad', days_ago=2)
+        self.log('calm', days_ago=30)
+
+        with self.assertNumQueries(1):
+            history = EmotionStats.get_weekly_history(self.profile)
+
+        self.assertEqual(len(history), 7)
+        day = history[4]
+        self.assertEqual(day['emotion'], 'happy')
+        self.assertEqual(day['icon'], '😊 Happy')
+        self.assertEqual(
+            day['day'], ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")[
+                (timezone.localdate() - timedelta(days=2)).weekday()
+            ],
+        )
+        self.assertEqual(sum(1 for d in history if d['emotion']), 1)
+        self.assertIsNone(history[0]['emotion'])
+        self.assertEqual((history[0]['icon'], history[0]['level']), ('—', 0))
+
+    def test_distribution_and_statistics(self):
+        self.log('happy', minute=1)
+        self.log('happy', days_ago=1)
+        self.log('sad', days_ago=1)
+        self.log('calm', days_ago=30)
+        self.log('calm', days_ago=31)
+        self.log('calm', days_ago=32)
+
+        with self.assertNumQueries(3):
+            summary = EmotionStats.compute_summary(self.profile)
+
+        distribution = {item['emotion']: item for item in summary['weekly_distribution']}
+        self.assertEqual(len(distribution), len(EmotionEntry.EMOTION_CHOICES))
+        self.assertEqual(distribution['happy']['count'], 2)
+        self.assertAlmostEqual(distribution['happy']['percentage'], 66.7)
+        self.assertEqual(distribution['happy']['color'], '#4CAF50')
+        self.assertEqual(distribution['calm']['count'], 0)
+        self.assertEqual(summary['weekly_distribution'][0]['emotion'], 'happy')
+
+        stats = summary['stats']
+        self.assertEqual(stats['total_entries'], 6)
+        self.assertEqual(stats['most_frequent_emotion'], 'calm')
+        self.assertEqual(stats['most_frequent_count'], 3)
+        self.assertEqual(stats['current_streak'], 2)
+        self.assertEqual(summary['current_emotion'], 'happy')
+
+    def test_stats_api_reads_only_the_snapshot(self):
+        for days_ago in range(20):
+            self.log(['happy', 'sad', 'calm'][days_ago % 3], days_ago=days_ago)
+        rebuild_snapshots([self.profile.pk])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('emotion:get_emotion_stats'))
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(response.json()['mood_stats']['total_entries'], 20)
+        self.assertFalse([q for q in queries if 'emotion_emotionentry' in q['sql']])
+        self.assertEqual(len([q for q in queries if 'emotion_emotionsnapshot' in q['sql']]), 1)
+
+
+class EmotionSnapshotTest(TestCase):
+    '''Snapshot cảm xúc cập nhật khi lưu, bỏ khi hủy ca học, và khớp với dữ liệu gốc'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='snap', password='secret')
+        self.profile = self.user.profile
+        self.subject = Subject.objects.create(profile=self.profile, name='Math')
+        self.client.login(username='snap', password='secret')
+
+    def save_emotion(self, session, emotion):
+        response = self.client.post(
+            reverse('emotion:save_emotion'),
+            data={'session_id': session.pk, 'emotion': emotion},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'success')
+
+    def session(self):
+        return StudySession.objects.create(profile=self.profile, subject=self.subject)
+
+    def test_save_and_update_keep_snapshot_in_sync(self):
+        first, second = self.session(), self.session()
+        self.save_emotion(first, 'sad')
+        self.save_emotion(second, 'happy')
+        # Sửa cảm xúc của ca đầu: bộ đếm chuyển từ sad sang calm
+        self.save_emotion(first, 'calm')
+
+        with self.assertNumQueries(1):
+            summary = EmotionStats.get_summary(self.profile)
+        self.assertEqual(summary, EmotionStats.compute_summary(self.profile))
+        self.assertEqual(summary['stats']['total_entries'], 2)
+        self.assertEqual(summary['current_emotion'], 'happy')
+        self.assertEqual(EmotionSnapshot.objects.get(profile=self.profile).counts, {'calm': 1, 'happy': 1})
+        self.assertEqual(check_consistency(), [])
+
+    def test_cancel_session_invalidates_snapshot(self):
+        kept, cancelled = self.session(), self.session()
+        self.save_emotion(kept, 'happy')
+        self.save_emotion(cancelled, 'sad')
+
+        self.client.post(
+            reverse('study:api_cancel_session'), data={'session_id': cancelled.pk}, content_type='application/json'
+        )
+        self.assertFalse(EmotionSnapshot.objects.filter(profile=self.profile).exists())
+
+        summary = EmotionStats.get_summary(self.profile)
+        self.assertEqual(summary['stats']['total_entries'], 1)
+        self.assertEqual(summary['current_emotion'], 'happy')
+
+    def test_consistency_checker_detects_and_fixes_drift(self):
+        self.save_emotion(self.session(), 'happy')
+        EmotionSnapshot.objects.filter(profile=self.profile).update(counts={'happy': 5})
+
+        self.assertEqual(check_consistency(), [self.profile.pk])
+        self.assertEqual(check_consistency(fix=True), [self.profile.pk])
+        self.assertEqual(check_consistency(), [])
+        self.assertEqual(EmotionSnapshot.objects.get(profile=self.profile).counts, {'happy': 1})
+
+
+class MoodAnalyticsTest(TestCase):
+    '''Phân tích cảm xúc ↔ thời lượng học theo cảm xúc, giờ bắt đầu và môn học'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='analytics', password='secret')
+        self.profile = self.user.profile
+        self.math = Subject.objects.create(profile=self.profile, name='Math')
+        self.physics = Subject.objects.create(profile=self.profile, name='Physics')
+        self.client.login(username='analytics', password='secret')
+
+    def log(self, emotion, minutes, hour, subject):
+        start = timezone.make_aware(datetime.combine(timezone.localdate(), time(hour, 15)))
+        session = StudySession.objects.create(
+            profile=self.profile, subject=subject, start_time=start,
+            end_time=start + timedelta(minutes=minutes), duration_seconds=minutes * 60,
+        )
+        return EmotionEntry.objects.create(profile=self.profile, study_session=session, emotion=emotion)
+
+    def test_aggregates_by_emotion_hour_and_subject(self):
+        empty = mood_productivity(self.profile)
+        self.assertEqual((empty['total_sessions'], empty['by_subject']), (0, []))
+
+        self.log('happy', 30, 9, self.math)
+        self.log('happy', 60, 9, self.math)
+        self.log('happy', 120, 21, self.physics)
+        self.log('sad', 20, 21, self.physics)
+        # Ca học chưa kết thúc không được tính
+        unfinished = StudySession.objects.create(profile=self.profile, subject=self.math)
+        EmotionEntry.objects.create(profile=self.profile, study_session=unfinished, emotion='sad')
+
+        result = mood_productivity(self.profile)
+
+        self.assertEqual(result['total_sessions'], 4)
+        by_emotion = {item['emotion']: item for item in result['by_emotion']}
+        self.assertEqual(by_emotion['happy']['sessions'], 3)
+        self.assertEqual(by_emotion['happy']['mean_minutes'], 70.0)
+        self.assertEqual(by_emotion['happy']['median_minutes'], 60.0)
+        self.assertEqual(by_emotion['sad']['median_minutes'], 20.0)
+        self.assertEqual(by_emotion['calm']['sessions'], 0)
+
+        by_hour = {item['hour']: item for item in result['by_hour']}
+        self.assertEqual(len(by_hour), 24)
+        self.assertEqual(by_hour[9]['counts']['happy'], 2)
+        self.assertEqual((by_hour[21]['counts']['happy'], by_hour[21]['counts']['sad']), (1, 1))
+        self.assertEqual(by_hour[12]['total'], 0)
+
+        by_subject = {item['subject']: item for item in result['by_subject']}
+        self.assertEqual(by_subject['Math']['mix']['happy'], 100.0)
+        self.assertEqual(by_subject['Physics']['mix']['sad'], 50.0)
+
+    def test_hours_are_local_start_hours(self):
+        # Các mốc UTC quanh nửa đêm giờ địa phương (TIME_ZONE)
+        moments = [datetime(2024, 3, 10, 15, 30, tzinfo=dt_timezone.utc) + timedelta(minutes=45 * i) for i in range(20)]
+        sessions = StudySession.objects.bulk_create([
+            StudySession(
+                profile=self.profile, subject=self.math, start_time=moment,
+                end_time=moment + timedelta(minutes=30), duration_seconds=1800,
+            )
+            for moment in moments
+        ])
+        EmotionEntry.objects.bulk_create(
+            [EmotionEntry(profile=self.profile, study_session=session, emotion='calm') for session in sessions]
+        )
+
+        expected = [0] * 24
+        for moment in moments:
+            expected[timezone.localtime(moment).hour] += 1
+        self.assertEqual([item['counts']['calm'] for item in mood_productivity(self.profile)['by_hour']], expected)
+
+    @skipUnless(RUN_TIMING_TESTS, 'set TIMING_TESTS=1 to check the analytics time budget')
+    def test_twenty_thousand_sessions_fit_time_budget(self):
+        import random
+
+        rng = random.Random(1)
+        now = timezone.now()
+        sessions = []
+        for _ in range(20000):
+            start = now - timedelta(minutes=rng.randint(0, 60 * 24 * 400))
+            minutes = rng.randint(5, 180)
+            sessions.append(StudySession(
+                profile=self.profile, subject=rng.choice((self.math, self.physics)), is_active=False,
+                start_time=start,
+                end_time=start + timedelta(minutes=minutes), duration_seconds=minutes * 60,
+            ))
+        sessions = StudySession.objects.bulk_create(sessions, batch_size=2000)
+        EmotionEntry.objects.bulk_create(
+            [EmotionEntry(profile=self.profile, study_session=s, emotion=rng.choice(EMOTIONS)) for s in sessions],
+            batch_size=2000,
+        )
+
+        mood_productivity(self.profile)  # import NumPy, làm nóng cache của SQLite
+        # Lấy lần nhanh nhất để bỏ nhiễu do máy bận
+        seconds = min(timeit.repeat(lambda: mood_productivity(self.profile), number=1, repeat=5))
+        budget = SQLITE_ANALYTICS_BUDGET_MS if connection.vendor == 'sqlite' else ANALYTICS_BUDGET_MS
+        self.assertLess(
+            seconds * 1000, budget,
+            f'mood_productivity took {seconds * 1000:.1f} ms (budget {budget:.0f} ms)',
+        )
+
+    def test_endpoint_is_cached_until_next_emotion_write(self):
+        entry = self.log('calm', 45, 8, self.math)
+        url = reverse('emotion:get_mood_analytics')
+
+        response = self.client.get(url).json()
+        self.assertEqual(response['status'], 'success')
+        self.assertEqual(response['total_sessions'], 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([q for q in queries if 'emotion_emotionentry' in q['sql']])
 
-# Create your tests here.
+        self.client.post(
+            reverse('emotion:save_emotion'),
+            data={'session_id': entry.study_session_id, 'emotion': 'happy'},
+            content_type='application/json',
+        )
+        by_emotion = {item['emotion']: item for item in self.client.get(url).json()['by_emotion']}
+        self.assertEqual(by_emotion['happy']['sessions'], 1)
+        self.assertEqual(by_emotion['calm']['sessions'], 0)
@@ -17,4 +17,7 @@ urlpatterns = [
     path('stats/', views.get_emotion_stats, name='get_emotion_stats'),
 
     path('get-mood-data/', views.get_emotion_stats, name='get_mood_data'),
+
+    # API phân tích cảm xúc ↔ thời lượng học
+    path('analytics/', views.get_mood_analytics, name='get_mood_analytics'),
 ]
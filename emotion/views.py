@@ -3,10 +3,13 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 import json
 
 from accounts.models import Profile
+from accounts.cache import cached_api
 from study.models import StudySession
+from .analytics import mood_productivity
 from .models import EmotionEntry, EmotionStats
 
 
@@ -31,14 +34,12 @@ def emotion_history(request):
     """Trang xem lịch sử & thống kê cảm xúc"""
     profile = request.user.profile
 
-    weekly_distribution = EmotionStats.get_weekly_emotion_distribution(profile)
-    stats = EmotionStats.get_emotion_statistics(profile)
-    current_emotion = EmotionStats.get_current_emotion(profile)
+    summary = EmotionStats.get_summary(profile)
 
     context = {
-        "weekly_distribution": weekly_distribution,
-        "stats": stats,
-        "current_emotion": current_emotion,
+        "weekly_distribution": summary["weekly_distribution"],
+        "stats": summary["stats"],
+        "current_emotion": summary["current_emotion"],
         "active_page": "emotion",
     }
 
@@ -72,15 +73,9 @@ def save_emotion(request):
 
         session = get_object_or_404(StudySession, id=session_id, profile=request.user.profile)
 
-        # Nếu đã có cảm xúc → update
-        entry, created = EmotionEntry.objects.update_or_create(
-            study_session=session,
-            defaults={
-                "profile": request.user.profile,
-                "emotion": emotion,
-                "notes": notes,
-            }
-        )
+        with transaction.atomic():
+            entry, created = EmotionEntry.record(session, emotion, notes)
+            request.user.profile.bump_data_version()
 
         return JsonResponse({
             "status": "success",
@@ -97,19 +92,29 @@ def save_emotion(request):
 # ============================
 
 @login_required
+@cached_api('emotion_stats')
 def get_emotion_stats(request):
     """API trả về dữ liệu thống kê cảm xúc cho frontend"""
     profile = request.user.profile
 
-    weekly_distribution = EmotionStats.get_weekly_emotion_distribution(profile)
-    stats = EmotionStats.get_emotion_statistics(profile)
-    current_emotion = EmotionStats.get_current_emotion(profile)
+    summary = EmotionStats.get_summary(profile)
 
     return JsonResponse({
         "status": "success",
-        "current_mood": current_emotion,
-        "weekly_distribution": weekly_distribution,
-        "mood_stats": stats,
+        "current_mood": summary["current_emotion"],
+        "weekly_distribution": summary["weekly_distribution"],
+        "mood_stats": summary["stats"],
+    })
+
+
+@login_required
+@cached_api('mood_analytics')
+def get_mood_analytics(request):
+    """API liên hệ cảm xúc ↔ thời lượng học (theo cảm xúc, giờ bắt đầu, môn học).
+    Cache theo data_version nên chỉ tính lại sau lần lưu cảm xúc/ca học tiếp theo."""
+    return JsonResponse({
+        "status": "success",
+        **mood_productivity(request.user.profile),
     })
 
 
@@ -21,6 +21,48 @@ function initializeTasks() {
 }
 */
 
+// ==========================================
+// Conditional GET: gửi If-None-Match, nếu server trả 304 thì dùng lại dữ liệu đã lưu
+// ==========================================
+const ETAG_CACHE_PREFIX = "etag-cache:";
+
+function fetchJSONWithETag(url) {
+  const storageKey = ETAG_CACHE_PREFIX + url;
+  let cached = null;
+  try {
+    cached = JSON.parse(sessionStorage.getItem(storageKey));
+  } catch (err) {
+    cached = null;
+  }
+
+  const headers = {};
+  if (cached && cached.etag) {
+    headers["If-None-Match"] = cached.etag;
+  }
+
+  return fetch(url, { headers }).then((response) => {
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.status}`);
+    }
+    return response.json().then((data) => {
+      const etag = response.headers.get("ETag");
+      if (etag) {
+        try {
+          sessionStorage.setItem(storageKey, JSON.stringify({ etag, data }));
+        } catch (err) {
+          // sessionStorage đầy hoặc bị chặn → bỏ qua, lần sau tải lại toàn bộ
+        }
+      }
+      return data;
+    });
+  });
+}
+
+window.fetchJSONWithETag = fetchJSONWithETag;
+
 // Update current date display
 function updateDateDisplay() {
   const dateElement = document.getElementById("current-date");
@@ -7,8 +7,7 @@ document.addEventListener("DOMContentLoaded", function () {
 });
 
 function loadCharacters() {
-  fetch("/shop/api/characters/")
-    .then((response) => response.json())
+  fetchJSONWithETag("/shop/api/characters/")
     .then((data) => {
       if (data.status === "success") {
         characters = data.characters;
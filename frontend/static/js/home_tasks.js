@@ -3,8 +3,7 @@ document.addEventListener("DOMContentLoaded", () => {
 });
 
 function loadTasks() {
-    fetch("/todo/api/get-tasks/?status=all")
-        .then(res => res.json())
+    fetchJSONWithETag("/todo/api/get-tasks/?status=all")
         .then(data => {
             if (data.status === "success") {
                 renderTasks(data.tasks);
@@ -69,13 +69,7 @@ function initializeMoodView() {
 }
 
 function loadUserMoodData() {
-  return fetch("/emotion/stats/")
-    .then((response) => {
-      if (!response.ok) {
-        throw new Error("Network response was not ok");
-      }
-      return response.json();
-    })
+  return fetchJSONWithETag("/emotion/stats/")
     .then((data) => {
       if (data.status === "success") {
         userMoodData = {
@@ -67,8 +67,8 @@ async function loadTracks() {
     grid.innerHTML = `<p>Loading tracks...</p>`;
 
     try {
-        const res = await fetch("/music/api/tracks/");
-        const data = await res.json();
+        // Gửi kèm ETag đã lưu: danh sách không đổi thì server trả 304, dùng lại bản trong sessionStorage
+        const data = await fetchJSONWithETag("/music/api/tracks/");
 
         if (data.status !== "success") {
             grid.innerHTML = `<p>Failed to load tracks.</p>`;
@@ -48,6 +48,34 @@ class StudyAPI {
   static stop() {
     return this.request("/study/api/stop/", "POST");
   } // Lưu và kết thúc
+  // Kết thúc + lưu cảm xúc trong 1 request (emotion = null khi bấm Skip).
+  // sessionId: session đang học; nếu server đã stop nó rồi (vd. lúc đóng tab) thì chỉ gắn thêm cảm xúc
+  static stopWithMood(emotion, notes, secondsSinceStop, sessionId = null) {
+    return this.request("/study/api/stop-with-mood/", "POST", {
+      emotion,
+      notes,
+      seconds_since_stop: secondsSinceStop,
+      session_id: sessionId,
+    });
+  }
+  // Đóng/tải lại trang khi popup cảm xúc còn mở: stop luôn để session không bị bỏ ngỏ.
+  // keepalive giữ request chạy tiếp sau khi trang đã đóng (không chờ kết quả)
+  static stopOnUnload(secondsSinceStop, sessionId) {
+    fetch("/study/api/stop-with-mood/", {
+      method: "POST",
+      keepalive: true,
+      headers: {
+        "Content-Type": "application/json",
+        "X-CSRFToken": this.getCSRF(),
+      },
+      body: JSON.stringify({
+        emotion: null,
+        notes: "",
+        seconds_since_stop: secondsSinceStop,
+        session_id: sessionId,
+      }),
+    });
+  }
   static cancel(sessionId) {
     return this.request("/study/api/cancel/", "POST", {
       session_id: sessionId,
@@ -63,17 +91,6 @@ class StudyAPI {
   static addSubject(name) {
     return this.request("/study/api/add-subject/", "POST", { name });
   }
-
-  static saveEmotion(sessionId, emotion, notes) {
-    return fetch("/emotion/save-mood/", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-        "X-CSRFToken": this.getCSRF(),
-      },
-      body: JSON.stringify({ session_id: sessionId, emotion, notes }),
-    });
-  }
 }
 
 // ==========================================
@@ -88,6 +105,7 @@ class PomodoroTimer {
     this.currentMode = "pomodoro"; // pomodoro | shortBreak | longBreak
     this.studiedSeconds = 0; // Thời gian học hiển thị trên UI
     this.currentSessionId = null; // ID của session trong Database
+    this.stoppedAt = null; // Lúc đồng hồ dừng, chờ người dùng chọn cảm xúc rồi mới gửi stop
 
     this.interval = null; // Biến giữ đồng hồ đếm ngược
     this.modes = {
@@ -125,6 +143,7 @@ class PomodoroTimer {
       totalTime: this.totalTime,
       studiedSeconds: this.studiedSeconds,
       currentSessionId: this.currentSessionId,
+      stoppedAt: this.stoppedAt,
       lastSavedTime: Date.now(),
       subjectId: document.getElementById("subjectSelect")?.value || "",
     };
@@ -139,6 +158,13 @@ class PomodoroTimer {
     this.totalTime = state.totalTime;
     this.studiedSeconds = state.studiedSeconds || 0;
     this.currentSessionId = state.currentSessionId;
+    this.stoppedAt = state.stoppedAt || null;
+
+    // Tải lại trang khi đang chờ chọn cảm xúc -> hiện lại popup, Save/Skip gửi lại stop + cảm xúc
+    if (this.stoppedAt) {
+      this.showEmotionModal();
+      return;
+    }
 
     // Tính toán thời gian trôi qua khi đóng tab
     if (this.isRunning && !this.isPaused) {
@@ -300,6 +326,7 @@ class PomodoroTimer {
     this.timeLeft = this.totalTime;
     this.studiedSeconds = 0;
     this.currentSessionId = null;
+    this.stoppedAt = null;
 
     this.clearState();
     this.updateDisplay();
@@ -313,41 +340,65 @@ class PomodoroTimer {
   }
 
   // Kết thúc session (Dùng khi hết giờ hoặc user chọn "No, I'm done")
-  async finishSession() {
+  // Chỉ dừng đồng hồ và hỏi cảm xúc; stop + cảm xúc được gửi chung 1 request ở submitStop().
+  // stoppedAt được lưu lại nên popup bị bỏ dở sẽ được stop lúc đóng trang / gửi lại khi mở lại trang
+  finishSession() {
     console.log("🏁 Finishing session...");
 
     // 1. Ẩn modal xác nhận nếu có
     const modal = document.getElementById("confirmation-modal");
     if (modal) modal.classList.remove("active");
 
-    // 2. Dừng timer local
+    // 2. Dừng timer local, ghi lại lúc dừng (thời gian chọn cảm xúc không tính vào ca học)
     this.stopLocalTimer();
+    this.stoppedAt = Date.now();
+    this.saveState();
 
-    // 3. GỌI API STOP ĐỂ LƯU END_TIME
-    const data = await StudyAPI.stop();
+    // 3. Hiện popup cảm xúc
+    this.showEmotionModal();
+  }
 
-    if (data) {
-      console.log("✅ Session saved:", data);
+  secondsSinceStop() {
+    return this.stoppedAt
+      ? Math.max(0, Math.round((Date.now() - this.stoppedAt) / 1000))
+      : 0;
+  }
 
-      // Lấy dữ liệu trả về để hiển thị
-      const duration = data.duration_seconds || this.studiedSeconds;
-      const points = data.points_awarded || 0;
-      const actualMins = Math.round(duration / 60);
+  showEmotionModal() {
+    // Ước tính phía client (1 giờ = 30 xu như server), số liệu chính xác trả về khi submitStop()
+    const actualMins = Math.round(this.studiedSeconds / 60);
+    const points = Math.floor((this.studiedSeconds / 3600) * 30);
+    const summaryText = document.getElementById("study-summary-text");
+    if (summaryText) {
+      summaryText.textContent = `You studied for ${actualMins} minutes and earned ${points} coins!`;
+    }
 
-      const summaryText = document.getElementById("study-summary-text");
-      if (summaryText) {
-        summaryText.textContent = `You studied for ${actualMins} minutes and earned ${points} coins!`;
-      }
+    const emotionModal = document.getElementById("emotionModal");
+    if (emotionModal) emotionModal.classList.remove("hidden");
+  }
 
-      // Hiện popup cảm xúc
-      const emotionModal = document.getElementById("emotionModal");
-      if (emotionModal) emotionModal.classList.remove("hidden");
-    } else {
-      // Fallback nếu lỗi mạng: vẫn hiện popup để user không bị kẹt
-      console.warn("⚠️ Could not stop properly. Showing modal anyway.");
-      const emotionModal = document.getElementById("emotionModal");
-      if (emotionModal) emotionModal.classList.remove("hidden");
+  // GỌI API STOP (kèm cảm xúc nếu có) ĐỂ LƯU END_TIME - 1 request cho cả stop và cảm xúc.
+  // Gửi kèm session_id nên gửi lại sau khi session đã được stop (lúc đóng trang) vẫn gắn được cảm xúc.
+  // Trả về dữ liệu server khi thành công, null nếu lỗi (giữ nguyên trạng thái để thử lại)
+  async submitStop(emotion, notes) {
+    const data = await StudyAPI.stopWithMood(
+      emotion,
+      notes,
+      this.secondsSinceStop(),
+      this.currentSessionId
+    );
+
+    if (data?.status === "stopped") {
+      console.log("✅ Session saved:", data);
+      return data;
     }
+    if (data?.code === "no_session") {
+      // Session đã được kết thúc ở nơi khác (tab/thiết bị khác) -> không còn gì để stop
+      console.warn("⚠️ Session already stopped elsewhere.");
+      return {};
+    }
+    console.warn("⚠️ Could not stop properly.", data);
+    return null;
   }
 
   /* --- UI HELPERS --- */
@@ -561,26 +612,44 @@ class PomodoroTimer {
       });
     });
 
-    const closeEmotion = () => {
+    const closeEmotion = (data) => {
+      const errorText = document.getElementById("study-summary-text");
+      if (!data) {
+        // Lỗi mạng/server: giữ popup và trạng thái (stoppedAt) để người dùng bấm lại
+        if (errorText) errorText.textContent = "Could not save your session. Please try again.";
+        return;
+      }
+
       document.getElementById("emotionModal").classList.add("hidden");
-      this.hardReset(); // Sau khi chọn cảm xúc xong -> Reset sạch đồng hồ để bắt đầu mới
+      this.hardReset(); // Chỉ reset khi server đã stop thành công
+
+      // Hiện tổng thời gian học hôm nay do server trả về
+      const progressText = document.getElementById("progress-text");
+      if (data.today_minutes !== undefined && progressText) {
+        progressText.textContent = `${data.today_minutes} minutes`;
+      }
     };
 
     document
       .getElementById("emotion-save-btn")
       ?.addEventListener("click", async () => {
         const notes = document.getElementById("emotion-notes-input").value;
-        await StudyAPI.saveEmotion(
-          this.currentSessionId,
-          selectedEmotion,
-          notes
-        );
-        closeEmotion();
+        closeEmotion(await this.submitStop(selectedEmotion, notes));
       });
 
     document
       .getElementById("emotion-skip-btn")
-      ?.addEventListener("click", closeEmotion);
+      ?.addEventListener("click", async () => {
+        closeEmotion(await this.submitStop(null, ""));
+      });
+
+    // Rời trang khi popup còn mở: stop ngay trên server. stoppedAt vẫn được lưu nên mở lại trang
+    // sẽ hỏi cảm xúc tiếp, và Save gắn cảm xúc vào session đã stop (qua session_id)
+    window.addEventListener("pagehide", () => {
+      if (this.stoppedAt) {
+        StudyAPI.stopOnUnload(this.secondsSinceStop(), this.currentSessionId);
+      }
+    });
   }
 }
 
@@ -2,6 +2,8 @@
 let currentTimeFilter = 'all';
 let currentSubjectFilter = 'all';
 let availableSubjects = [];
+let nextCursor = null; // Cursor của trang tiếp theo (null = hết dữ liệu)
+let loadedSessions = [];
 
 document.addEventListener('DOMContentLoaded', function() {
     loadStudySessions();
@@ -20,11 +22,22 @@ function setupEventListeners() {
         currentSubjectFilter = this.value;
         loadStudySessions();
     });
+
+    // Tải thêm trang tiếp theo
+    const loadMoreBtn = document.getElementById('load-more-sessions');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', function() {
+            loadStudySessions(true);
+        });
+    }
 }
 
-function loadStudySessions() {
+function loadStudySessions(append = false) {
     // SỬA URL Ở ĐÂY:
-    const url = `/visualization/api/sessions/?filter=${currentTimeFilter}&subject=${currentSubjectFilter}`;
+    let url = `/visualization/api/sessions/?filter=${currentTimeFilter}&subject=${encodeURIComponent(currentSubjectFilter)}`;
+    if (append && nextCursor) {
+        url += `&cursor=${encodeURIComponent(nextCursor)}`;
+    }
     
     console.log('Loading sessions from:', url);
     
@@ -33,9 +46,15 @@ function loadStudySessions() {
         .then(data => {
             console.log('Sessions API response:', data);
             if (data.status === 'success') {
-                availableSubjects = data.subjects;
-                renderSessions(data.sessions);
-                updateSubjectFilterOptions();
+                // Danh sách môn học chỉ có ở trang đầu
+                if (data.subjects) {
+                    availableSubjects = data.subjects;
+                    updateSubjectFilterOptions();
+                }
+                loadedSessions = append ? loadedSessions.concat(data.sessions) : data.sessions;
+                nextCursor = data.next_cursor;
+                renderSessions(loadedSessions);
+                updateLoadMoreButton();
             } else {
                 console.error('Sessions API error:', data);
                 showSessionsError('Failed to load study sessions');
@@ -47,6 +66,13 @@ function loadStudySessions() {
         });
 }
 
+function updateLoadMoreButton() {
+    const loadMoreBtn = document.getElementById('load-more-sessions');
+    if (loadMoreBtn) {
+        loadMoreBtn.hidden = !nextCursor;
+    }
+}
+
 function renderSessions(sessions) {
     const container = document.getElementById('sessions-container');
     
@@ -6,8 +6,7 @@ document.addEventListener('DOMContentLoaded', function() {
 function loadStudyStats() {
     console.log('Loading study stats...');
     
-    fetch('/visualization/api/stats/')
-        .then(response => response.json())
+    fetchJSONWithETag('/visualization/api/stats/')
         .then(data => {
             console.log('API Response:', data);
             if (data.status === 'success') {
@@ -30,8 +30,7 @@ const DEFAULT_COLORS = [
 function loadSubjectBreakdown() {
     console.log('Loading subject breakdown data...');
     
-    fetch('/visualization/api/subjects/')
-        .then(response => response.json())
+    fetchJSONWithETag('/visualization/api/subjects/')
         .then(data => {
             console.log('API response:', data);
             
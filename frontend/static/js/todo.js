@@ -112,22 +112,48 @@ function predictTaskDuration() {
     priority: priority,
   };
 
-  fetch("/todo/api/predict-duration/", {
+  predictTaskDurations([taskData])
+    .then((data) => {
+      if (data.status === "success") {
+        showPredictionResult({ ...data.predictions[0], confidence: data.confidence });
+      }
+    })
+    .catch((error) => {
+      console.error("Prediction error:", error);
+    });
+}
+
+// Dự đoán nhiều task nháp trong 1 request; kết quả của draft đã hỏi được nhớ lại
+const predictionMemo = new Map();
+
+function predictTaskDurations(drafts) {
+  const keys = drafts.map((draft) => JSON.stringify(draft));
+  if (keys.every((key) => predictionMemo.has(key))) {
+    const cached = keys.map((key) => predictionMemo.get(key));
+    return Promise.resolve({
+      status: "success",
+      predictions: cached.map((item) => item.prediction),
+      total_minutes: cached.reduce((sum, item) => sum + item.prediction.predicted_minutes, 0),
+      confidence: cached[0]?.confidence,
+    });
+  }
+
+  return fetch("/todo/api/predict-durations/", {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
       "X-CSRFToken": getCookie("csrftoken"),
     },
-    body: JSON.stringify(taskData),
+    body: JSON.stringify({ tasks: drafts }),
   })
     .then((response) => response.json())
     .then((data) => {
       if (data.status === "success") {
-        showPredictionResult(data);
+        data.predictions.forEach((prediction, i) =>
+          predictionMemo.set(keys[i], { prediction, confidence: data.confidence })
+        );
       }
-    })
-    .catch((error) => {
-      console.error("Prediction error:", error);
+      return data;
     });
 }
 
@@ -190,14 +216,11 @@ function getPredictionTip(minutes) {
   }
 }
 
-function trainAIModel() {
-  const trainBtn = document.getElementById("train-ai-btn");
-  const originalText = trainBtn.innerHTML;
+// Gửi yêu cầu train (chạy nền trên server) rồi poll trạng thái job đến khi xong
+const TRAINING_POLL_INTERVAL = 1000;
 
-  trainBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Training AI...';
-  trainBtn.disabled = true;
-
-  fetch("/todo/api/train-model/", {
+function submitTrainingJob() {
+  return fetch("/todo/api/train-model/", {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
@@ -205,6 +228,31 @@ function trainAIModel() {
     },
   })
     .then((response) => response.json())
+    .then((data) => (data.status === "success" ? pollTrainingJob(data) : data));
+}
+
+function pollTrainingJob(job) {
+  if (job.finished) {
+    // Model mới → các dự đoán đã nhớ không còn đúng
+    predictionMemo.clear();
+    return Promise.resolve(
+      job.state === "failed" ? { ...job, status: "error" } : job
+    );
+  }
+  return new Promise((resolve) => setTimeout(resolve, TRAINING_POLL_INTERVAL))
+    .then(() => fetch(`/todo/api/train-model/${job.job_id}/`))
+    .then((response) => response.json())
+    .then((data) => (data.status === "success" ? pollTrainingJob(data) : data));
+}
+
+function trainAIModel() {
+  const trainBtn = document.getElementById("train-ai-btn");
+  const originalText = trainBtn.innerHTML;
+
+  trainBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Training AI...';
+  trainBtn.disabled = true;
+
+  submitTrainingJob()
     .then((data) => {
       if (data.status === "success") {
         showNotification(data.message, data.trained ? "success" : "info");
@@ -475,14 +523,7 @@ function trainAIModelFromList() {
       '<i class="fas fa-sync fa-spin"></i> AI is learning from your completed tasks...';
   }
 
-  fetch("/todo/api/train-model/", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-      "X-CSRFToken": getCookie("csrftoken"),
-    },
-  })
-    .then((response) => response.json())
+  submitTrainingJob()
     .then((data) => {
       if (resultDiv) {
         if (data.status === "success") {
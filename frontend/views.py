@@ -1,11 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
 from django.utils import timezone
-from study.models import StudySession
+from study.models import DailyStudyRollup
 from todo.models import ToDoItem
 from emotion.models import EmotionEntry
-from datetime import timedelta
+from visualization.streaks import get_study_streak
 
 
 def index(request):
@@ -27,33 +26,17 @@ def index(request):
     
     # Nếu đã đăng nhập → xử lý dữ liệu thật
     profile = request.user.profile
-    today = timezone.now().date()
+    today = timezone.localdate()
 
-    # 1. Tính thời gian học hôm nay
-    total_seconds = StudySession.objects.filter(
-        profile=profile,
-        start_time__date=today
-    ).aggregate(total=Sum("duration_seconds"))["total"] or 0
+    # 1. Tính thời gian học hôm nay (đọc từ bảng rollup)
+    total_seconds = DailyStudyRollup.seconds_on(profile, today)
 
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
     today_study_time = f"{hours}h {minutes}m"
 
-    # 2. Tính streak
-    streak = 0
-    check_day = today
-
-    while True:
-        studied = StudySession.objects.filter(
-            profile=profile,
-            start_time__date=check_day
-        ).exists()
-
-        if studied:
-            streak += 1
-            check_day -= timedelta(days=1)
-        else:
-            break
+    # 2. Tính streak (đọc từ bảng StudyStreak)
+    streak = get_study_streak(request.user)["current_streak"]
 
     # 3. Tính task completion
     tasks_total = ToDoItem.objects.filter(profile=profile).count()
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import threading
+import time
+
+from .models import Character
+
+# Character mặc định được unlock khi tạo tài khoản
+DEFAULT_CHARACTER_ID = 1
+
+# Catalog được giữ trong bộ nhớ process; signal xóa khi Character thay đổi.
+# TTL để các worker khác (không nhận được signal) cũng tự làm mới.
+CATALOG_TTL = 5 * 60
+
+_catalog = None
+_catalog_version = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _serialize(character):
+    return {
+        'id': character.id,
+        'name': character.name,
+        'image_url': character.image_idle.url if character.image_idle else '',
+        'description': character.description,
+        'price': character.price,
+        'rarity': character.rarity,
+        'emoji': character.emoji,
+    }
+
+
+def _load():
+    global _catalog, _catalog_version, _loaded_at
+    catalog = [_serialize(c) for c in Character.objects.all()]
+    _catalog = catalog
+    _catalog_version = hashlib.md5(json.dumps(catalog, sort_keys=True).encode()).hexdigest()[:12]
+    _loaded_at = time.monotonic()
+
+
+def get_catalog():
+    '''Danh sách nhân vật (list dict, sắp theo giá) - chỉ query database khi cache trống/hết hạn'''
+    with _lock:
+        if _catalog is None or time.monotonic() - _loaded_at > CATALOG_TTL:
+            _load()
+        return _catalog
+
+
+def get_catalog_version():
+    '''Hash nội dung catalog - dùng làm một phần của cache key / ETag'''
+    with _lock:
+        if _catalog is None or time.monotonic() - _loaded_at > CATALOG_TTL:
+            _load()
+        return _catalog_version
+
+
+def invalidate_catalog(**kwargs):
+    '''Xóa catalog đã cache (nối vào signal post_save/post_delete của Character)'''
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def grant_default_character_to_all():
+    '''Unlock nhân vật mặc định cho các profile chưa có (dùng sau khi seed nhân vật).
+    Nhân vật chỉ được kích hoạt nếu profile chưa có nhân vật nào đang active.'''
+    from accounts.models import Profile
+    from .models import Inventory
+
+    if not Character.objects.filter(id=DEFAULT_CHARACTER_ID).exists():
+        return 0
+
+    missing = Profile.objects.exclude(inventory__character_id=DEFAULT_CHARACTER_ID)
+    has_active = set(
+        Inventory.objects.filter(is_active=True).values_list('profile_id', flat=True)
+    )
+    items = [
+        Inventory(profile_id=pid, character_id=DEFAULT_CHARACTER_ID, is_active=pid not in has_active)
+        for pid in missing.values_list('id', flat=True)
+    ]
+    Inventory.objects.bulk_create(items, batch_size=1000)
+    return len(items)
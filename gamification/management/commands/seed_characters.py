@@ -4,6 +4,7 @@ from django.core.files import File
 from django.core.management.base import BaseCommand
 
 from gamification.models import Character
+from gamification.catalog import grant_default_character_to_all
 
 # Danh sách nhân vật mặc định
 CHARACTERS = [
@@ -139,4 +140,9 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"{'Created' if created else 'Updated'}: {char_obj.name}")
             )
 
+        # Tài khoản tạo trước khi có nhân vật mặc định → unlock bù
+        granted = grant_default_character_to_all()
+        if granted:
+            self.stdout.write(self.style.SUCCESS(f"Granted default character to {granted} profiles"))
+
         self.stdout.write(self.style.SUCCESS("🎉 Done seeding characters!"))
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+DEFAULT_CHARACTER_ID = 1
+
+
+def grant_default_character(apps, schema_editor):
+    """Unlock nhân vật mặc định cho các profile đã tồn tại (trước đây làm trong API GET)."""
+    Character = apps.get_model("gamification", "Character")
+    Inventory = apps.get_model("gamification", "Inventory")
+    Profile = apps.get_model("accounts", "Profile")
+
+    if not Character.objects.filter(id=DEFAULT_CHARACTER_ID).exists():
+        return
+
+    has_active = set(
+        Inventory.objects.filter(is_active=True).values_list("profile_id", flat=True)
+    )
+    missing = Profile.objects.exclude(inventory__character_id=DEFAULT_CHARACTER_ID)
+    Inventory.objects.bulk_create(
+        [
+            Inventory(
+                profile_id=profile_id,
+                character_id=DEFAULT_CHARACTER_ID,
+                is_active=profile_id not in has_active,
+            )
+            for profile_id in missing.values_list("id", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("gamification", "0002_character_emoji"),
+    ]
+
+    operations = [
+        migrations.RunPython(grant_default_character, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 import random
 
@@ -116,11 +116,16 @@ class Achievement(models.Model):
         '''Nhận phần thưởng (claim).
         - Nếu chưa claim → cộng xu vào tài khoản người dùng.
         - Đánh dấu thành tích là đã nhận.'''
-        if not self.is_claimed:
-            self.profile.coins += self.reward_coins
-            self.profile.save()
+        if self.is_claimed:
+            return False
+        with transaction.atomic():
+            # Đánh dấu đã nhận bằng UPDATE có điều kiện để không cộng xu 2 lần
+            updated = Achievement.objects.filter(pk=self.pk, is_claimed=False).update(is_claimed=True)
             self.is_claimed = True
-            self.save()
+            if not updated:
+                return False
+            self.profile.add_coins(self.reward_coins, description=f"Thành tích: {self.title}"[:255])
+        return True
 
     class Meta:
         # Cấu hình hiển thị trong Django Admin
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from .models import Character, Inventory
+from .catalog import DEFAULT_CHARACTER_ID, invalidate_catalog
+
+# Catalog nhân vật trong bộ nhớ phải được làm mới khi admin sửa/xóa nhân vật
+post_save.connect(invalidate_catalog, sender=Character, dispatch_uid='character_catalog_save')
+post_delete.connect(invalidate_catalog, sender=Character, dispatch_uid='character_catalog_delete')
+
+
+# Khi tạo Profile mới → unlock sẵn nhân vật mặc định và kích hoạt nó
+@receiver(post_save, sender=Profile)
+def grant_default_character(sender, instance, created, **kwargs):
+    if created and Character.objects.filter(id=DEFAULT_CHARACTER_ID).exists():
+        Inventory.objects.get_or_create(
+            profile=instance,
+            character_id=DEFAULT_CHARACTER_ID,
+            defaults={'is_active': True},
+        )
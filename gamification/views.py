@@ -1,10 +1,13 @@
 from django.shortcuts import render
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from .models import Character, Inventory
+from .catalog import get_catalog, get_catalog_version
 from accounts.models import Profile
+from accounts.cache import cached_api
 
 # =======================
 # DASHBOARD
@@ -51,8 +54,10 @@ def my_characters(request):
 # API - DÙNG DATABASE THẬT
 @login_required
 @require_http_methods(["GET"])
+@cached_api('characters', extra_key=get_catalog_version)
 def api_characters(request):
-    """API lấy danh sách characters từ Inventory"""
+    """API lấy danh sách characters từ Inventory.
+    Catalog lấy từ cache trong process, inventory của user lấy bằng 1 query; không ghi gì vào DB."""
     try:
         user = request.user
         profile = user.profile
@@ -60,34 +65,21 @@ def api_characters(request):
         characters_data = []
         active_character_data = None
         
-        # Lấy tất cả characters
-        all_characters = Character.objects.all()
+        # {character_id: is_active} cho các nhân vật user đã sở hữu
+        owned = dict(Inventory.objects.filter(profile=profile).values_list('character_id', 'is_active'))
         
-        for character in all_characters:
-            # Kiểm tra trong inventory
-            inventory_item = Inventory.objects.filter(profile=profile, character=character).first()
-            
-            is_unlocked = inventory_item is not None
-            is_active = inventory_item.is_active if inventory_item else False
-            
-            # Character đầu tiên unlock mặc định
-            if character.id == 1 and not is_unlocked:
-                inventory_item = Inventory.objects.create(
-                    profile=profile,
-                    character=character,
-                    is_active=True
-                )
-                is_unlocked = True
-                is_active = True
+        for character in get_catalog():
+            is_unlocked = character['id'] in owned
+            is_active = owned.get(character['id'], False)
             
             character_data = {
-                'id': character.id,
-                'name': character.name,
-                'image_path': character.image_idle.url if character.image_idle else '/static/assets/images/char1.png',
-                'bio': character.description,
-                'price': character.price,
-                'rarity': character.rarity,
-                'emoji': character.emoji,
+                'id': character['id'],
+                'name': character['name'],
+                'image_path': character['image_url'] or '/static/assets/images/char1.png',
+                'bio': character['description'],
+                'price': character['price'],
+                'rarity': character['rarity'],
+                'emoji': character['emoji'],
                 'is_unlocked': is_unlocked,
                 'is_active': is_active,
             }
@@ -120,6 +112,7 @@ def api_set_active_character(request, character_id):
         
         # Kích hoạt nhân vật
         inventory_item.activate()
+        profile.bump_data_version()
         
         return JsonResponse({
             'status': 'success', 
@@ -147,19 +140,22 @@ def api_unlock_character(request, character_id):
         if Inventory.objects.filter(profile=profile, character=character).exists():
             return JsonResponse({'status': 'error', 'message': 'Character already unlocked'})
         
-        # Kiểm tra đủ coins
-        if profile.coins < character.price:
-            return JsonResponse({'status': 'error', 'message': 'Not enough coins'})
-        
-        # Trừ coins và tạo inventory
-        profile.coins -= character.price
-        profile.save()
-        
-        Inventory.objects.create(
-            profile=profile,
-            character=character,
-            is_active=False
-        )
+        # Trừ coins (có điều kiện đủ xu) và tạo inventory trong cùng 1 transaction
+        try:
+            with transaction.atomic():
+                if not profile.spend_coins(character.price, description=f"Mua nhân vật {character.name}"):
+                    return JsonResponse({'status': 'error', 'message': 'Not enough coins'})
+                
+                Inventory.objects.create(
+                    profile=profile,
+                    character=character,
+                    is_active=False
+                )
+        except IntegrityError:
+            # Request song song đã mua nhân vật này → transaction bị rollback, không mất xu
+            profile.refresh_coins()
+            return JsonResponse({'status': 'error', 'message': 'Character already unlocked'})
+        profile.bump_data_version()
         
         return JsonResponse({
             'status': 'success',
@@ -179,26 +175,25 @@ def api_unlock_character(request, character_id):
         return JsonResponse({'status': 'error', 'message': str(e)})
     
 @login_required
+@cached_api('shop_items', extra_key=get_catalog_version)
 def api_shop_items(request):
     """API trả về danh sách item trong shop."""
     profile = request.user.profile
 
     items = []
-    characters = Character.objects.all()
-
-    for char in characters:
-        owned = Inventory.objects.filter(profile=profile, character=char).exists()
+    owned_ids = set(Inventory.objects.filter(profile=profile).values_list('character_id', flat=True))
 
+    for char in get_catalog():
         items.append({
-            "id": char.id,
+            "id": char['id'],
             "category": "characters",
-            "name": char.name,
-            "description": char.description,
-            "price": char.price,
-            "is_owned": owned,
-            "emoji": char.emoji,
-            "rarity": char.rarity,
-            "image": f"<img src='{char.image_idle.url}' class='shop-img' />" if char.image_idle else "<div class='shop-img-fallback'>?</div>"
+            "name": char['name'],
+            "description": char['description'],
+            "price": char['price'],
+            "is_owned": char['id'] in owned_ids,
+            "emoji": char['emoji'],
+            "rarity": char['rarity'],
+            "image": f"<img src='{char['image_url']}' class='shop-img' />" if char['image_url'] else "<div class='shop-img-fallback'>?</div>"
         })
 
     return JsonResponse({"status": "success", "items": items})
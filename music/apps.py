@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MusicConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "music"
+
+    def ready(self):
+        # Import signals để kết nối tín hiệu khi ứng dụng sẵn sàng
+        import music.signals
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+import time
+
+from .models import MusicTrack
+
+# Danh sách track được giữ trong bộ nhớ process; signal xóa khi MusicTrack thay đổi.
+# TTL để các worker khác (không nhận được signal) cũng tự làm mới.
+TRACKS_TTL = 5 * 60
+
+_tracks = None
+_tracks_version = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _serialize(track):
+    return {
+        'id': track.id,
+        'title': track.title,
+        'description': track.description,
+        'category': track.category,
+        'audio_url': track.get_audio_url,
+        'cover_color': track.cover_color,
+        'cover_image_url': track.cover_image.url if track.cover_image else '',
+        'is_default': track.is_default,
+    }
+
+
+def _load():
+    global _tracks, _tracks_version, _loaded_at
+    tracks = [_serialize(t) for t in MusicTrack.objects.filter(is_active=True).order_by('id')]
+    _tracks = tracks
+    _tracks_version = hashlib.md5(json.dumps(tracks, sort_keys=True).encode()).hexdigest()[:12]
+    _loaded_at = time.monotonic()
+
+
+def _ensure_loaded():
+    if _tracks is None or time.monotonic() - _loaded_at > TRACKS_TTL:
+        _load()
+
+
+def get_tracks():
+    '''Danh sách track đang bật (list dict, theo id) - chỉ query database khi cache trống/hết hạn'''
+    with _lock:
+        _ensure_loaded()
+        return _tracks
+
+
+def get_tracks_version():
+    '''Hash nội dung danh sách track - dùng làm ETag của API'''
+    with _lock:
+        _ensure_loaded()
+        return _tracks_version
+
+
+def invalidate_tracks(**kwargs):
+    '''Xóa danh sách track đã cache (nối vào signal post_save/post_delete của MusicTrack)'''
+    global _tracks
+    with _lock:
+        _tracks = None
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Track mặc định (trước đây được get_or_create lại trong mỗi request của trang Music)
+DEFAULT_TRACKS = [
+    {
+        "title": "Head Nod",
+        "description": "Lo-fi beats for focus",
+        "category": "lofi",
+        "static_audio_path": "music/default/head-nod.mp3",
+        "cover_color": "#6C63FF",
+        "is_default": True,
+    },
+    {
+        "title": "Hẹn Hò Nhưng Không Yêu",
+        "description": "Chill Vietnamese lo-fi",
+        "category": "lofi",
+        "static_audio_path": "music/default/hen-ho-nhung-khong-yeu.mp3",
+        "cover_color": "#FF6B6B",
+        "is_default": True,
+    },
+    {
+        "title": "Home",
+        "description": "Ambient home sounds",
+        "category": "ambient",
+        "static_audio_path": "music/default/home.mp3",
+        "cover_color": "#4ECDC4",
+        "is_default": True,
+    },
+    {
+        "title": "Sad Beat",
+        "description": "Melancholic focus beats",
+        "category": "lofi",
+        "static_audio_path": "music/default/sad-beat.mp3",
+        "cover_color": "#45B7D1",
+        "is_default": True,
+    },
+]
+
+
+def seed_default_tracks(apps, schema_editor):
+    """Thêm các track mặc định còn thiếu (theo title) trong 1 lần bulk_create; chạy lại không tạo trùng
+    và không ghi đè track đã được sửa trong admin."""
+    MusicTrack = apps.get_model("music", "MusicTrack")
+
+    existing = set(
+        MusicTrack.objects.filter(
+            title__in=[track["title"] for track in DEFAULT_TRACKS]
+        ).values_list("title", flat=True)
+    )
+    MusicTrack.objects.bulk_create(
+        [MusicTrack(**track) for track in DEFAULT_TRACKS if track["title"] not in existing]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("music", "0003_musictrack_is_default_musictrack_static_audio_path_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_default_tracks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,8 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import MusicTrack
+from .catalog import invalidate_tracks
+
+# Danh sách track trong bộ nhớ phải được làm mới khi admin thêm/sửa/xóa track
+post_save.connect(invalidate_tracks, sender=MusicTrack, dispatch_uid='music_tracks_save')
+post_delete.connect(invalidate_tracks, sender=MusicTrack, dispatch_uid='music_tracks_delete')
@@ -1,3 +1,66 @@
+import importlib
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .catalog import invalidate_tracks
+from .models import MusicTrack
+
+seed_migration = importlib.import_module('music.migrations.0004_seed_default_tracks')
+
+
+class MusicTracksTest(TestCase):
+    '''Track mặc định seed bằng migration; API đọc từ cache trong process kèm ETag'''
+
+    def setUp(self):
+        invalidate_tracks()
+        self.user = User.objects.create_user(username='listener', password='secret')
+        self.client.login(username='listener', password='secret')
+
+    def music_queries(self, queries):
+        return [q['sql'] for q in queries if 'music_musictrack' in q['sql']]
+
+    def test_default_tracks_are_seeded_once(self):
+        titles = [track['title'] for track in seed_migration.DEFAULT_TRACKS]
+        self.assertEqual(MusicTrack.objects.filter(title__in=titles, is_default=True).count(), len(titles))
+
+        # Chạy lại không tạo trùng
+        seed_migration.seed_default_tracks(apps, None)
+        self.assertEqual(MusicTrack.objects.filter(title__in=titles).count(), len(titles))
+
+    def test_music_page_does_not_touch_tracks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('music:music_player'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.music_queries(queries), [])
+
+    def test_api_tracks_served_from_cache_with_etag(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(reverse('music:api_tracks'))
+        self.assertEqual(len(self.music_queries(queries)), 1)
+        self.assertEqual(first.json()['status'], 'success')
+        self.assertEqual(len(first.json()['tracks']), MusicTrack.objects.filter(is_active=True).count())
+        etag = first['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(reverse('music:api_tracks'))
+            not_modified = self.client.get(reverse('music:api_tracks'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(self.music_queries(queries), [])
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_track_changes_invalidate_cache(self):
+        etag = self.client.get(reverse('music:api_tracks'))['ETag']
+
+        track = MusicTrack.objects.create(title='Rain', static_audio_path='music/rain.mp3')
+        response = self.client.get(reverse('music:api_tracks'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Rain', [t['title'] for t in response.json()['tracks']])
 
-# Create your tests here.
+        track.delete()
+        titles = [t['title'] for t in self.client.get(reverse('music:api_tracks')).json()['tracks']]
+        self.assertNotIn('Rain', titles)
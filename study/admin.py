@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Subject, StudySession, BreakSession
+from .models import Subject, StudySession, BreakSession, DailyStudyRollup
 
 admin.site.register(Subject)
 admin.site.register(StudySession)
 admin.site.register(BreakSession)
+admin.site.register(DailyStudyRollup)
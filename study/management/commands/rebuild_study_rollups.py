@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Profile
+from study.models import StudySession, DailyStudyRollup
+from visualization.streaks import rebuild_study_streak
+
+
+class Command(BaseCommand):
+    help = "Backfill hoặc kiểm tra bảng DailyStudyRollup từ các StudySession đã kết thúc"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Chỉ so sánh rollup với dữ liệu session thô, không ghi gì vào database",
+        )
+        parser.add_argument(
+            "--profile",
+            type=int,
+            help="Chỉ xử lý một profile (theo id)",
+        )
+
+    def handle(self, *args, **options):
+        profile = None
+        if options["profile"] is not None:
+            try:
+                profile = Profile.objects.get(id=options["profile"])
+            except Profile.DoesNotExist:
+                raise CommandError(f"Profile {options['profile']} không tồn tại")
+
+        if options["verify"]:
+            self.verify(profile)
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Rebuilding study rollups..."))
+        created = DailyStudyRollup.rebuild(profile)
+
+        # Streak được suy ra từ rollup nên tính lại luôn sau khi backfill
+        profiles = [profile] if profile is not None else Profile.objects.select_related("user")
+        for p in profiles:
+            rebuild_study_streak(p.user)
+        # Response cache giữa lúc rebuild rollup và lúc tính lại streak có thể mang streak cũ
+        Profile.bump_data_versions([profile.pk] if profile is not None else None)
+
+        self.stdout.write(self.style.SUCCESS(f"🎉 Done! {created} rollup rows written."))
+
+    def verify(self, profile):
+        sessions = StudySession.objects.filter(end_time__isnull=False)
+        rollups = DailyStudyRollup.objects.all()
+        if profile is not None:
+            sessions = sessions.filter(profile=profile)
+            rollups = rollups.filter(profile=profile)
+
+        expected = DailyStudyRollup.aggregate_sessions(sessions)
+        actual = {
+            (r.profile_id, r.day, r.subject_id): {
+                "total_seconds": r.total_seconds,
+                "session_count": r.session_count,
+                "points": r.points,
+            }
+            for r in rollups
+            # Dòng rollup rỗng (sau khi xóa hết session trong ngày) coi như không có
+            if r.session_count
+        }
+
+        mismatches = 0
+        for key in sorted(set(expected) | set(actual), key=str):
+            if expected.get(key) != actual.get(key):
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ Mismatch {key}: expected {expected.get(key)}, found {actual.get(key)}"
+                ))
+
+        if mismatches:
+            raise CommandError(f"{mismatches} rollup rows are out of sync, run rebuild_study_rollups")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(expected)} rollup rows verified."))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_alter_profile_timezone"),
+        ("study", "0006_studysession_total_pause_seconds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyStudyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("total_seconds", models.PositiveIntegerField(default=0)),
+                ("session_count", models.PositiveIntegerField(default=0)),
+                ("points", models.IntegerField(default=0)),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="study_rollups",
+                        to="accounts.profile",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="study_rollups",
+                        to="study.subject",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["profile", "day"], name="study_daily_profile_f3ad89_idx"
+                    )
+                ],
+                "unique_together": {("profile", "day", "subject")},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_alter_profile_timezone"),
+        ("study", "0007_dailystudyrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="studysession",
+            index=models.Index(
+                fields=["profile", "-start_time", "-id"],
+                name="study_study_profile_00e669_idx",
+            ),
+        ),
+    ]
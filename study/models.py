@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
 from accounts.models import Profile # Import model Profile để liên kết người dùng
 from datetime import datetime, timedelta 
 from django.utils import timezone
@@ -65,6 +66,10 @@ class StudySession(models.Model):
     # Trạng thái buổi học (đang học hay đã dừng)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        # Index phục vụ phân trang lịch sử theo cursor (start_time, id)
+        indexes = [models.Index(fields=['profile', '-start_time', '-id'])]
+
     def __str__(self):
         # Hiển thị tên khi in object
         return f"{self.subject.name} - {self.start_time.strftime('%Y-%m-%d %H:%M')}"
@@ -91,9 +96,12 @@ class StudySession(models.Model):
             self.is_active = True
             self.save(update_fields=['start_time', 'pause_time', 'is_active'])
 
-    def stop(self):
-        '''Kết thúc ca học'''
-        self.end_time = timezone.now()
+    @transaction.atomic
+    def stop(self, end_time=None):
+        '''Kết thúc ca học. end_time: thời điểm dừng thực tế (vd. lúc đồng hồ phía client dừng),
+        bị kẹp trong [start_time, hiện tại] nên chỉ có thể làm ca học ngắn lại.'''
+        now = timezone.now()
+        self.end_time = min(max(end_time, self.start_time), now) if end_time else now
         self.is_active = False
         
         # Tính tổng thời gian trôi qua từ start đến end
@@ -106,11 +114,34 @@ class StudySession(models.Model):
         # Tính điểm thưởng dựa trên thời gian học
         self.points_awarded = self.calculate_points()
 
-        # Cập nhật xu vào hồ sơ người dùng
-        self.profile.add_coins(self.points_awarded)
-        #self.profile.save(update_fields=['coins'])
-        
-        self.save(update_fields=['end_time', 'is_active', 'duration_seconds', 'points_awarded'])
+        # Chỉ request đầu tiên kết thúc được session (end_time còn trống) mới cộng xu,
+        # tránh 2 request stop song song cộng xu 2 lần
+        updated = StudySession.objects.filter(pk=self.pk, end_time__isnull=True).update(
+            end_time=self.end_time,
+            is_active=False,
+            duration_seconds=self.duration_seconds,
+            points_awarded=self.points_awarded,
+        )
+        if not updated:
+            return False
+
+        # Cập nhật xu vào hồ sơ người dùng (ghi sổ CoinTransaction)
+        self.profile.add_coins(self.points_awarded, description=f"Buổi học #{self.pk}")
+
+        # Cộng dồn vào bảng tổng hợp theo ngày (cùng transaction với session)
+        DailyStudyRollup.record_session(self)
+
+        # Cập nhật streak học tập tăng dần
+        from visualization.streaks import record_study_day
+        record_study_day(self.profile.user, DailyStudyRollup.local_day(self))
+
+        # Cập nhật thời lượng ca học trung bình cho model dự đoán thời gian task
+        from todo.features import record_session
+        record_session(self)
+
+        # Làm mới cache các API thống kê của user
+        self.profile.bump_data_version()
+        return True
     
     def calculate_points(self):
         '''Tính điểm thưởng dựa trên thời gian học thực tế (1 giờ = 30 xu)'''
@@ -144,3 +175,108 @@ class BreakSession(models.Model):
     def __str__(self):
         # Hiển thị break session dưới dạng thời gian
         return f"Nghỉ {self.duration_seconds // 60} phút ({self.study_session.subject.name})"
+
+# Model 4: DailyStudyRollup
+class DailyStudyRollup(models.Model):
+    '''Tổng hợp thời gian học theo profile / ngày (giờ địa phương) / môn học.
+    Được cập nhật mỗi khi StudySession.stop() để các trang thống kê không
+    phải quét lại toàn bộ lịch sử session.'''
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='study_rollups')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='study_rollups')
+    # Ngày học theo múi giờ hiện tại (TIME_ZONE)
+    day = models.DateField()
+    # Tổng số giây học thực tế trong ngày
+    total_seconds = models.PositiveIntegerField(default=0)
+    # Số session đã kết thúc trong ngày
+    session_count = models.PositiveIntegerField(default=0)
+    # Tổng xu thưởng trong ngày
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('profile', 'day', 'subject')
+        indexes = [models.Index(fields=['profile', 'day'])]
+
+    def __str__(self):
+        return f"{self.profile.user.username} - {self.day} - {self.subject.name}: {self.total_seconds}s"
+
+    @classmethod
+    def seconds_on(cls, profile, day):
+        '''Tổng số giây học của profile trong một ngày'''
+        return cls.objects.filter(profile=profile, day=day).aggregate(
+            total=Sum('total_seconds'))['total'] or 0
+
+    @staticmethod
+    def local_day(session):
+        '''Ngày địa phương của session (dựa trên start_time)'''
+        return timezone.localdate(session.start_time)
+
+    @classmethod
+    def _apply(cls, session, sign):
+        rollup, _ = cls.objects.get_or_create(
+            profile_id=session.profile_id,
+            subject_id=session.subject_id,
+            day=cls.local_day(session),
+        )
+        cls.objects.filter(pk=rollup.pk).update(
+            total_seconds=F('total_seconds') + sign * session.duration_seconds,
+            session_count=F('session_count') + sign,
+            points=F('points') + sign * session.points_awarded,
+        )
+        if sign < 0:
+            # Không còn session nào trong ngày/môn đó: xóa dòng để các trang thống kê không hiện môn 0 phút
+            cls.objects.filter(pk=rollup.pk, session_count__lte=0).delete()
+
+    @classmethod
+    def record_session(cls, session):
+        '''Cộng một session đã kết thúc vào rollup'''
+        with transaction.atomic():
+            cls._apply(session, 1)
+
+    @classmethod
+    def discard_session(cls, session):
+        '''Trừ một session đã kết thúc khỏi rollup (khi session bị xóa)'''
+        if not session.end_time:
+            return
+        with transaction.atomic():
+            cls._apply(session, -1)
+
+    @classmethod
+    def rebuild(cls, profile=None):
+        '''Tính lại toàn bộ rollup từ bảng StudySession.
+        Tăng data_version của các profile bị ảnh hưởng để cache API không trả số liệu cũ.
+        Trả về số dòng rollup được tạo.'''
+        sessions = StudySession.objects.filter(end_time__isnull=False)
+        rollups = cls.objects.all()
+        if profile is not None:
+            sessions = sessions.filter(profile=profile)
+            rollups = rollups.filter(profile=profile)
+
+        totals = cls.aggregate_sessions(sessions)
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create([
+                cls(profile_id=profile_id, subject_id=subject_id, day=day,
+                    total_seconds=data['total_seconds'],
+                    session_count=data['session_count'],
+                    points=data['points'])
+                for (profile_id, day, subject_id), data in totals.items()
+            ], batch_size=1000)
+            if profile is not None:
+                profile.bump_data_version()
+            else:
+                Profile.bump_data_versions()
+        return len(totals)
+
+    @classmethod
+    def aggregate_sessions(cls, sessions):
+        '''Gom nhóm session thô theo (profile, ngày, môn) - dùng cho backfill/kiểm tra'''
+        totals = {}
+        rows = sessions.values_list('profile_id', 'subject_id', 'start_time',
+                                    'duration_seconds', 'points_awarded')
+        for profile_id, subject_id, start_time, seconds, points in rows.iterator():
+            key = (profile_id, timezone.localdate(start_time), subject_id)
+            data = totals.setdefault(key, {'total_seconds': 0, 'session_count': 0, 'points': 0})
+            data['total_seconds'] += seconds
+            data['session_count'] += 1
+            data['points'] += points
+        return totals
@@ -0,0 +1,57 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+# Số session mặc định / tối đa trên một trang lịch sử
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(session):
+    '''Mã hóa vị trí (start_time, id) của session cuối trang thành chuỗi an toàn cho URL'''
+    raw = f"{session.start_time.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    '''Giải mã cursor → (start_time, id). Raise ValueError nếu cursor không hợp lệ'''
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_time, session_id = raw.rsplit('|', 1)
+        start_time, session_id = datetime.fromisoformat(start_time), int(session_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    # Cursor do encode_cursor tạo luôn có múi giờ và id nằm trong khoảng của cột khóa chính
+    if timezone.is_naive(start_time) or not 0 < session_id < 2 ** 63:
+        raise ValueError("Invalid cursor")
+    return start_time, session_id
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    '''Đọc page size từ query string, giới hạn trong [1, MAX_PAGE_SIZE]'''
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(MAX_PAGE_SIZE, size))
+
+
+def paginate_sessions(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    '''Phân trang keyset theo (start_time, id) giảm dần.
+    Trả về (danh sách session của trang, cursor trang sau hoặc None).'''
+    queryset = queryset.order_by('-start_time', '-id')
+    if cursor:
+        start_time, session_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=session_id)
+        )
+
+    # Lấy dư 1 phần tử để biết còn trang sau hay không
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1])
+    return items, next_cursor
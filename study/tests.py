@@ -1,3 +1,228 @@
+import base64
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.cache import get_api_cache
+from emotion.models import EmotionEntry, EmotionSnapshot
+from study.models import StudySession, Subject
+from study.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate_sessions, parse_page_size,
+)
+
+
+class StopWithMoodApiTest(TestCase):
+    '''Kết thúc ca học và lưu cảm xúc trong một request'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='timer', password='secret')
+        self.profile = self.user.profile
+        self.subject = Subject.objects.create(profile=self.profile, name='Math')
+        self.client.login(username='timer', password='secret')
+
+    def start(self, minutes_ago):
+        return StudySession.objects.create(
+            profile=self.profile, subject=self.subject, is_active=True,
+            start_time=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def post(self, payload):
+        return self.client.post(reverse('study:api_stop_with_mood'), data=payload, content_type='application/json')
+
+    def test_stops_session_awards_coins_and_logs_emotion(self):
+        session = self.start(minutes_ago=120)
+        coins = self.profile.coins
+
+        data = self.post({'emotion': 'happy', 'notes': 'good focus'}).json()
+
+        self.assertEqual(data['status'], 'stopped')
+        self.assertEqual(data['session_id'], session.pk)
+        self.assertAlmostEqual(data['duration_seconds'], 7200, delta=5)
+        self.assertEqual(data['points_awarded'], 60)
+        self.assertEqual(data['today_minutes'], data['duration_seconds'] // 60)
+        self.assertEqual((data['current_streak'], data['longest_streak']), (1, 1))
+
+        session.refresh_from_db()
+        self.assertFalse(session.is_active)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.coins, coins + 60)
+        entry = EmotionEntry.objects.get(study_session=session)
+        self.assertEqual((entry.emotion, entry.notes), ('happy', 'good focus'))
+        self.assertEqual(EmotionSnapshot.objects.get(profile=self.profile).counts, {'happy': 1})
+
+    def test_skip_emotion_and_exclude_time_spent_in_modal(self):
+        session = self.start(minutes_ago=60)
+
+        data = self.post({'seconds_since_stop': 30 * 60}).json()
+
+        self.assertAlmostEqual(data['duration_seconds'], 30 * 60, delta=5)
+        self.assertEqual(data['points_awarded'], 15)
+        self.assertIsNone(data['emotion'])
+        self.assertFalse(EmotionEntry.objects.filter(study_session=session).exists())
+
+    def test_huge_seconds_since_stop_is_clamped_to_session(self):
+        session = self.start(minutes_ago=10)
+
+        data = self.post({'seconds_since_stop': 10 ** 30}).json()
+
+        self.assertEqual((data['status'], data['duration_seconds']), ('stopped', 0))
+        session.refresh_from_db()
+        self.assertLess(session.end_time - session.start_time, timedelta(seconds=1))
+
+    def test_unparseable_seconds_since_stop_is_bad_request(self):
+        session = self.start(minutes_ago=10)
+
+        for raw in ('{"seconds_since_stop": 1e400}', '{"seconds_since_stop": "soon"}'):
+            response = self.client.post(reverse('study:api_stop_with_mood'), data=raw, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        session.refresh_from_db()
+        self.assertTrue(session.is_active)
+
+    def test_rejects_unknown_emotion_without_stopping(self):
+        session = self.start(minutes_ago=10)
+
+        response = self.post({'emotion': 'bored'})
+
+        self.assertEqual(response.status_code, 400)
+        session.refresh_from_db()
+        self.assertTrue(session.is_active)
+
+    def test_second_stop_has_no_active_session(self):
+        self.start(minutes_ago=10)
+        self.post({'emotion': 'calm'})
+
+        response = self.post({'emotion': 'calm'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'no_active_session')
+        self.assertEqual(EmotionEntry.objects.count(), 1)
+
+    def test_stop_right_away_then_attach_emotion(self):
+        # Client stop ngay khi hết giờ, cảm xúc gửi sau kèm session_id
+        session = self.start(minutes_ago=30)
+        stopped = self.post({}).json()
+        session.refresh_from_db()
+        self.assertFalse(session.is_active)
+        version = session.profile.data_version
+        coins = session.profile.coins
+
+        data = self.post({'session_id': session.pk, 'emotion': 'tired', 'notes': 'late'}).json()
+
+        self.assertEqual(data['status'], 'stopped')
+        self.assertEqual(data['duration_seconds'], stopped['duration_seconds'])
+        self.assertEqual(EmotionEntry.objects.get(study_session=session).emotion, 'tired')
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.coins, coins)  # không cộng xu lần 2
+        self.assertGreater(self.profile.data_version, version)
+
+    def test_attach_emotion_to_other_users_session_is_not_found(self):
+        other = User.objects.create_user(username='other', password='secret').profile
+        session = StudySession.objects.create(
+            profile=other, subject=Subject.objects.create(profile=other, name='Art'),
+            start_time=timezone.now() - timedelta(minutes=5),
+        )
+        session.stop()
+
+        response = self.post({'session_id': session.pk, 'emotion': 'happy'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(EmotionEntry.objects.exists())
+
+
+class SessionHistoryPaginationTest(TestCase):
+    '''Lịch sử ca học phân trang keyset theo (start_time, id)'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='history', password='secret')
+        self.profile = self.user.profile
+        self.subject = Subject.objects.create(profile=self.profile, name='Math')
+        self.client.login(username='history', password='secret')
+
+    def make_sessions(self, count, tied_start=None):
+        '''Tạo session mới nhất trước (cách nhau 1 giờ), hoặc cùng một start_time nếu có tied_start'''
+        now = timezone.now() - timedelta(days=1)
+        starts = [tied_start or now - timedelta(hours=i) for i in range(count)]
+        return StudySession.objects.bulk_create([
+            StudySession(
+                profile=self.profile, subject=self.subject, is_active=False, start_time=start,
+                end_time=start + timedelta(minutes=30), duration_seconds=1800, points_awarded=15,
+            )
+            for start in starts
+        ])
+
+    def walk(self, page_size):
+        '''Đi hết các trang, trả về id theo thứ tự đã đọc'''
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_sessions(StudySession.objects.filter(profile=self.profile), cursor, page_size)
+            seen.extend(session.pk for session in page)
+            if cursor is None:
+                return seen
+
+    def test_cursor_round_trip(self):
+        session = self.make_sessions(1)[0]
+        session.refresh_from_db()
+
+        self.assertEqual(decode_cursor(encode_cursor(session)), (session.start_time, session.pk))
+
+    def test_ties_on_start_time_are_ordered_by_id(self):
+        # Cùng start_time: id làm tiêu chí phụ nên không trang nào lặp hay bỏ sót session
+        tied = timezone.now().replace(microsecond=0) - timedelta(hours=3)
+        sessions = self.make_sessions(7, tied_start=tied)
+        sessions += self.make_sessions(3, tied_start=tied - timedelta(hours=1))
+        ids = [s.pk for s in sessions]
+        expected = sorted(ids[:7], reverse=True) + sorted(ids[7:], reverse=True)
+
+        for page_size in (1, 2, 3, 10):
+            self.assertEqual(self.walk(page_size), expected)
+
+    def test_invalid_cursors_are_bad_request(self):
+        self.make_sessions(3)
+        garbage = ['not-a-cursor', '!!!', 'é', base64.urlsafe_b64encode(b'\xff\xfe').decode()] + [
+            base64.urlsafe_b64encode(raw.encode()).decode()
+            for raw in ('no separator', 'yesterday|1', '2024-01-01T00:00:00+00:00|x',
+                        '2024-01-01T00:00:00|1', '2024-01-01T00:00:00+00:00|' + '9' * 30)
+        ]
+        urls = [reverse('study:history'), reverse('visualization:api_study_sessions')]
+
+        for cursor in garbage:
+            with self.subTest(cursor=cursor):
+                self.assertRaises(ValueError, decode_cursor, cursor)
+                for url in urls:
+                    self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400)
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(parse_page_size(None), DEFAULT_PAGE_SIZE)
+        self.assertEqual(parse_page_size('abc'), DEFAULT_PAGE_SIZE)
+        self.assertEqual(parse_page_size('0'), 1)
+        self.assertEqual(parse_page_size(str(MAX_PAGE_SIZE * 10)), MAX_PAGE_SIZE)
+
+        self.make_sessions(MAX_PAGE_SIZE + 5)
+        data = self.client.get(reverse('visualization:api_study_sessions'), {'limit': 10_000}).json()
+        self.assertEqual(len(data['sessions']), MAX_PAGE_SIZE)
+        self.assertTrue(data['has_more'])
+
+    def test_partial_history_renders_next_page_fragment(self):
+        sessions = self.make_sessions(5)
+        url = reverse('study:history')
+
+        first = self.client.get(url, {'limit': 2})
+        self.assertTemplateUsed(first, 'study/history.html')
+        cursor = first.context['next_cursor']
+
+        response = self.client.get(url, {'partial': 1, 'cursor': cursor, 'limit': 2})
+
+        self.assertTemplateUsed(response, 'study/_history_days.html')
+        self.assertTemplateNotUsed(response, 'study/history.html')
+        shown = [row['id'] for day in response.context['history'] for row in day['sessions']]
+        self.assertEqual(shown, [sessions[2].pk, sessions[3].pk])
+        self.assertContains(response, f'data-next-cursor="{response.context["next_cursor"]}"')
 
-# Create your tests here.
+        last = self.client.get(url, {'partial': 1, 'cursor': response.context['next_cursor'], 'limit': 2})
+        self.assertIsNone(last.context['next_cursor'])
+        self.assertContains(last, 'class="history-page-meta" data-next-cursor=""')
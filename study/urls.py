@@ -16,6 +16,9 @@ urlpatterns = [
     # API: stop session hiện tại và LƯU kết quả (Dùng khi học xong hoặc Reset > 1 phút)
     path('api/stop/', views.api_stop_session, name='api_stop_session'),
 
+    # API: stop session + lưu cảm xúc trong một request (pomodoro.js dùng khi kết thúc ca học)
+    path('api/stop-with-mood/', views.api_stop_with_mood, name='api_stop_with_mood'),
+
     # Hủy session và XÓA khỏi DB (Dùng khi Reset < 1 phút)
     path('api/cancel/', views.api_cancel_session, name='api_cancel_session'),
 
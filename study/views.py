@@ -1,16 +1,21 @@
 import json
+from datetime import timedelta
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.views.decorators.http import require_POST
-from django.db.models import Sum
+from django.db import transaction
 
-from .models import StudySession, Subject
+from .models import StudySession, Subject, DailyStudyRollup
+from .pagination import paginate_sessions, parse_page_size
 from accounts.models import Profile
 from collections import defaultdict
 from emotion.models import EmotionEntry
+from emotion.snapshot import invalidate as invalidate_emotion_snapshot
 from gamification.models import Inventory
+from visualization.streaks import get_study_streak, rebuild_study_streak
+from todo.features import rebuild as rebuild_prediction_features
 
 
 @login_required
@@ -26,12 +31,9 @@ def pomodoro_view(request):
     # Lấy danh sách môn của user để chọn (nếu chưa có, frontend có thể xử lý)
     subjects = Subject.objects.filter(profile=profile)
 
-    # Lấy tổng thời gian học hôm nay
-    today = timezone.now().date()
-    total_seconds = StudySession.objects.filter(
-        profile=profile,
-        start_time__date=today
-    ).aggregate(duration=Sum('duration_seconds'))['duration'] or 0
+    # Lấy tổng thời gian học hôm nay (từ bảng rollup)
+    today = timezone.localdate()
+    total_seconds = DailyStudyRollup.seconds_on(profile, today)
 
     study_minutes = total_seconds // 60
     inv = Inventory.objects.filter(profile=profile, is_active=True).select_related("character").first()
@@ -59,6 +61,7 @@ def api_add_subject(request):
 
     profile = get_object_or_404(Profile, user=request.user)
     subject = Subject.objects.create(profile=profile, name=name)
+    profile.bump_data_version()
 
     return JsonResponse({"status": "ok", "id": subject.id, "name": subject.name })
 
@@ -100,6 +103,7 @@ def api_start_session(request):
         #start_time=timezone.now(),
         #is_active=True
     )
+    profile.bump_data_version()
 
     # Trả về JSON success, kèm session id
     return JsonResponse({'status': 'started', 'session_id': session.id, 'start_time': session.start_time.isoformat()})
@@ -164,6 +168,62 @@ def api_stop_session(request):
         'points_awarded': session.points_awarded
     })
 
+@require_POST
+@login_required
+def api_stop_with_mood(request):
+    """
+    API POST: /study/api/stop-with-mood/
+    Gộp stop + lưu cảm xúc vào một request (và một transaction):
+    - Body JSON: emotion (bỏ trống nếu người dùng bấm Skip), notes,
+      seconds_since_stop (số giây từ lúc đồng hồ client dừng tới lúc gửi, để không tính thời gian chọn cảm xúc),
+      session_id (tùy chọn): ca học cần stop; nếu đã được stop trước đó (lúc client đóng trang) thì chỉ gắn thêm cảm xúc
+    - Trả về duration, xu thưởng, tổng phút học hôm nay và streak sau khi cập nhật
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8') or '{}')
+        seconds_since_stop = max(0, int(data.get('seconds_since_stop') or 0))
+    except (json.JSONDecodeError, TypeError, ValueError, OverflowError):
+        return HttpResponseBadRequest("Invalid JSON")
+
+    emotion = data.get('emotion') or None
+    if emotion is not None and emotion not in dict(EmotionEntry.EMOTION_CHOICES):
+        return JsonResponse({'status': 'error', 'message': 'invalid_emotion'}, status=400)
+
+    profile = request.user.profile
+    with transaction.atomic():
+        sessions = StudySession.objects.select_for_update().filter(profile=profile)
+        if data.get('session_id'):
+            session = get_object_or_404(sessions, id=data['session_id'])
+        else:
+            session = sessions.filter(is_active=True).order_by('-start_time').first()
+
+        if session and session.end_time is None:
+            # Kẹp trong thời gian đã trôi qua của ca học: số quá lớn sẽ làm timedelta bị tràn
+            now = timezone.now()
+            elapsed = max(0, int((now - session.start_time).total_seconds()))
+            stopped = session.stop(end_time=now - timedelta(seconds=min(seconds_since_stop, elapsed)))
+        else:
+            # Ca học đã được stop từ trước (client gửi lại sau khi đóng trang): chỉ còn gắn cảm xúc
+            stopped = session is not None and bool(data.get('session_id'))
+            if stopped and emotion:
+                profile.bump_data_version()
+        if not stopped:
+            return JsonResponse({'status': 'error', 'message': 'no_active_session'}, status=400)
+        if emotion:
+            EmotionEntry.record(session, emotion, data.get('notes', ''))
+
+    streak = get_study_streak(request.user)
+    return JsonResponse({
+        'status': 'stopped',
+        'session_id': session.id,
+        'duration_seconds': session.duration_seconds,
+        'points_awarded': session.points_awarded,
+        'emotion': emotion,
+        'today_minutes': DailyStudyRollup.seconds_on(profile, timezone.localdate()) // 60,
+        'current_streak': streak['current_streak'],
+        'longest_streak': streak['longest_streak'],
+    })
+
 @require_POST
 @login_required
 def api_pause_session(request):
@@ -213,7 +273,17 @@ def api_cancel_session(request):
     session = StudySession.objects.filter(id=session_id, profile=profile).first()
     
     if session:
-        session.delete()
+        with transaction.atomic():
+            # Session đã kết thúc thì phải trừ khỏi rollup trước khi xóa
+            DailyStudyRollup.discard_session(session)
+            session.delete()
+            # Cảm xúc của ca học (nếu có) bị xóa theo: snapshot cảm xúc sẽ tính lại khi đọc
+            invalidate_emotion_snapshot(profile.pk)
+            if session.end_time:
+                rebuild_study_streak(request.user)
+                # Ca học và cảm xúc đi kèm đã bị xóa: tính lại feature dự đoán
+                rebuild_prediction_features([profile.pk])
+            profile.bump_data_version()
         return JsonResponse({'status': 'cancelled', 'message': 'Session deleted'})
     
     # Nếu không tìm thấy (có thể đã xóa rồi), vẫn trả về ok để frontend reset
@@ -260,23 +330,24 @@ def study_history(request):
     sessions = (
         StudySession.objects.filter(profile=profile)
         .filter(duration_seconds__gte=60)
-        .select_related("subject")
-        .order_by("-start_time")
+        .select_related("subject", "emotion")
     )
 
+    # Phân trang theo cursor (start_time, id): mỗi lần chỉ render một trang
+    cursor = request.GET.get("cursor")
+    page_size = parse_page_size(request.GET.get("limit"))
+    try:
+        page, next_cursor = paginate_sessions(sessions, cursor, page_size)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor")
+
     # nhóm theo ngày nhưng tạo cấu trúc dễ render: list of dicts
     history = defaultdict(list)
 
-    for s in sessions:
-        day = s.start_time.date()
-        # đảm bảo có end_time/duration_seconds xử lý an toàn
-       
-        # SỬ DỤNG actual_study_seconds THAY VÌ duration_seconds
-        #actual_seconds = getattr(s, "actual_study_seconds", 0)
-        #if actual_seconds == 0:
-            # Fallback: nếu chưa có actual_study_seconds, dùng duration_seconds
-         #   actual_seconds = getattr(s, "duration_seconds", 0)
-        
+    for s in page:
+        day = timezone.localdate(s.start_time)
+
+        # emotion đã được select_related nên không phát sinh query mới
         emotion_entry = getattr(s, "emotion", None)
         if emotion_entry:
             mood_display = emotion_entry.get_emotion_display_icon()
@@ -290,8 +361,6 @@ def study_history(request):
             "end_time": s.end_time,
             "duration_seconds": s.duration_seconds,
             "duration_text": _format_duration(s.duration_seconds),
-            #"duration_seconds": actual_seconds, # duration_seconds,
-            #"duration_text": _format_duration(actual_seconds), # _format_duration(duration_seconds),
             "points": s.points_awarded,
             "emotion": mood_display,
         })
@@ -306,7 +375,12 @@ def study_history(request):
 
     context = {
         "history": history_list,
+        "next_cursor": next_cursor,
         "active_page": "timer",
     }
 
+    # Các trang tiếp theo được JS tải thêm và nối vào cuối danh sách
+    if request.GET.get("partial"):
+        return render(request, "study/_history_days.html", context)
+
     return render(request, "study/history.html", context)
@@ -99,6 +99,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'studyhabit-default',
+    },
+    # Cache dạng file, dùng chung giữa các worker trên cùng một máy
+    'filecache': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'api',
+    },
+}
+
+# Alias cache dùng cho các API JSON chỉ đọc ('default' = locmem, 'filecache' = file-based)
+API_CACHE_ALIAS = 'default'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,5 +1,5 @@
 from django.contrib import admin #import module admin của Django để đăng ký/ tuỳ chỉnh model trên Django Admin site
-from .models import ToDoItem, ReminderLog #2 model đã định nghĩa trong models.py
+from .models import ToDoItem, ReminderLog, TrainingJob #các model đã định nghĩa trong models.py
 
 @admin.register(ToDoItem) #Đăng kí model ToDoItem vào trang admin của Django
 class ToDoItemAdmin(admin.ModelAdmin): #Lớp tuỳ chỉnh cho trang quản lí
@@ -18,3 +18,9 @@ class ReminderLogAdmin(admin.ModelAdmin): #Tuỳ chỉnh
     list_display = ('todo_item', 'sent_at', 'status')
     # Vì chỉ có 1 phần tử, cần thêm dấu `,` để django không hiểu nhầm thành chuỗi
     list_filter = ('status',)
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'profile', 'status', 'trained', 'training_samples', 'created_at', 'finished_at')
+    list_filter = ('status', 'trained')
+    readonly_fields = ('started_at', 'finished_at')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TodoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo'
+
+    def ready(self):
+        # Import signals để kết nối tín hiệu khi ứng dụng sẵn sàng
+        import todo.signals
@@ -0,0 +1,123 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+
+from accounts.cache import get_api_cache
+from accounts.models import Profile
+
+from .models import ProfileFeatures, ToDoItem
+
+# Feature nằm trong cache tối đa 1 giờ; key gắn data_version nên không bao giờ bị cũ
+FEATURE_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(profile):
+    return f"todo:features:{profile.pk}:v{profile.data_version}"
+
+
+def get_features(profile):
+    '''Feature của một profile cho lúc dự đoán: 0 query khi có trong cache, 1 query khi không'''
+    cache = get_api_cache()
+    key = _cache_key(profile)
+    features = cache.get(key)
+    if features is None:
+        features = load_features([profile.pk])[profile.pk]
+        cache.set(key, features, FEATURE_CACHE_TIMEOUT)
+    return features
+
+
+def load_features(profile_ids):
+    '''{profile_id: feature dict} cho nhiều profile trong 1 query (tự tính lại profile còn thiếu)'''
+    profile_ids = set(profile_ids)
+    rows = {row.profile_id: row for row in ProfileFeatures.objects.filter(profile_id__in=profile_ids)}
+    missing = profile_ids - rows.keys()
+    if missing:
+        rows.update(rebuild(missing))
+    return {pk: row.as_features() for pk, row in rows.items()}
+
+
+def rebuild(profile_ids=None):
+    '''Tính lại feature từ dữ liệu gốc (session, cảm xúc, task) trong 1 query rồi upsert.
+    profile_ids=None → tất cả profile. Trả về {profile_id: ProfileFeatures}.'''
+    from emotion.models import EmotionEntry, MOOD_SCORES, NEUTRAL_MOOD_SCORE
+    from study.models import StudySession
+
+    def per_profile(queryset, **aggregate):
+        # Subquery aggregate theo profile (trả về đúng 1 cột)
+        name = next(iter(aggregate))
+        return Subquery(
+            queryset.filter(profile=OuterRef('pk')).values('profile').annotate(**aggregate).values(name)
+        )
+
+    sessions = StudySession.objects.filter(end_time__isnull=False)
+    latest_emotion = EmotionEntry.objects.filter(profile=OuterRef('pk')).order_by('-created_at')
+
+    profiles = Profile.objects.all()
+    if profile_ids is not None:
+        profiles = profiles.filter(pk__in=profile_ids)
+    rows = profiles.annotate(
+        session_count=per_profile(sessions, n=Count('id')),
+        total_session_seconds=per_profile(sessions, s=Sum('duration_seconds')),
+        latest_emotion=Subquery(latest_emotion.values('emotion')[:1]),
+        latest_emotion_at=Subquery(latest_emotion.values('created_at')[:1]),
+        tasks_total=per_profile(ToDoItem.objects.all(), n=Count('id')),
+        tasks_completed=per_profile(ToDoItem.objects.filter(is_completed=True), n=Count('id')),
+    ).values_list(
+        'pk', 'session_count', 'total_session_seconds', 'latest_emotion', 'latest_emotion_at',
+        'tasks_total', 'tasks_completed',
+    )
+
+    features = [
+        ProfileFeatures(
+            profile_id=pk,
+            session_count=session_count or 0,
+            total_session_seconds=total_seconds or 0,
+            mood_score=MOOD_SCORES.get(emotion, NEUTRAL_MOOD_SCORE),
+            mood_at=emotion_at,
+            tasks_total=tasks_total or 0,
+            tasks_completed=tasks_completed or 0,
+        )
+        for pk, session_count, total_seconds, emotion, emotion_at, tasks_total, tasks_completed in rows
+    ]
+    ProfileFeatures.objects.bulk_create(
+        features,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=[
+            'session_count', 'total_session_seconds', 'mood_score', 'mood_at',
+            'tasks_total', 'tasks_completed', 'updated_at',
+        ],
+    )
+    return {row.profile_id: row for row in features}
+
+
+def record_session(session, sign=1):
+    '''Cộng (sign=1) hoặc trừ (sign=-1) một ca học đã kết thúc vào thời lượng trung bình'''
+    updated = ProfileFeatures.objects.filter(profile_id=session.profile_id).update(
+        session_count=F('session_count') + sign,
+        total_session_seconds=F('total_session_seconds') + sign * session.duration_seconds,
+    )
+    if not updated:
+        rebuild([session.profile_id])
+
+
+def record_mood(entry):
+    '''Ghi nhận cảm xúc mới lưu nếu nó là cảm xúc gần nhất của profile'''
+    from emotion.models import MOOD_SCORES, NEUTRAL_MOOD_SCORE
+
+    updated = ProfileFeatures.objects.filter(
+        Q(mood_at__isnull=True) | Q(mood_at__lte=entry.created_at),
+        profile_id=entry.profile_id,
+    ).update(mood_score=MOOD_SCORES.get(entry.emotion, NEUTRAL_MOOD_SCORE), mood_at=entry.created_at)
+    if not updated and not ProfileFeatures.objects.filter(profile_id=entry.profile_id).exists():
+        rebuild([entry.profile_id])
+
+
+def refresh_task_stats(profile_id):
+    '''Đếm lại tổng số task và số task đã hoàn thành của profile (1 aggregate)'''
+    counts = ToDoItem.objects.filter(profile_id=profile_id).aggregate(
+        total=Count('id'), completed=Count('id', filter=Q(is_completed=True))
+    )
+    updated = ProfileFeatures.objects.filter(profile_id=profile_id).update(
+        tasks_total=counts['total'], tasks_completed=counts['completed']
+    )
+    if not updated:
+        rebuild([profile_id])
@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import tempfile
+
+# Phiên bản định dạng file model (tăng khi đổi cấu trúc JSON)
+ARTIFACT_VERSION = 1
+
+# Các feature dạng chữ, được mã hóa bằng vị trí trong từ điển (giống LabelEncoder)
+CATEGORICAL_FEATURES = ('category', 'time_of_day')
+
+
+def _encode(features, feature_names, vocabulary_index):
+    vector = []
+    for name in feature_names:
+        value = features.get(name)
+        if name in CATEGORICAL_FEATURES:
+            vector.append(vocabulary_index.get(name, {}).get(str(value), 0))
+        else:
+            vector.append(float(value or 0))
+    return vector
+
+
+def encode_features(features, feature_names, vocabularies):
+    '''Mã hóa dict feature với từ điển dạng {feature: [giá trị, ...]}'''
+    index = {name: {value: i for i, value in enumerate(values)} for name, values in vocabularies.items()}
+    return _encode(features, feature_names, index)
+
+
+class LinearDurationModel:
+    '''Model hồi quy tuyến tính rút gọn: hệ số + intercept + từ điển feature dạng chữ.
+    Dự đoán chỉ là một phép nhân vô hướng thuần Python, không cần sklearn/numpy.'''
+
+    def __init__(self, feature_names, coef, intercept, vocabularies):
+        self.feature_names = list(feature_names)
+        self.coef = [float(c) for c in coef]
+        if len(self.coef) != len(self.feature_names):
+            # zip() khi dự đoán sẽ cắt bớt âm thầm, phải báo lỗi ngay lúc load
+            raise ValueError(
+                f"Model has {len(self.coef)} coefficients for {len(self.feature_names)} features"
+            )
+        self.intercept = float(intercept)
+        # {feature: {giá trị: mã số}}
+        self.vocabularies = {
+            name: {value: index for index, value in enumerate(values)}
+            for name, values in vocabularies.items()
+        }
+
+    @classmethod
+    def from_sklearn(cls, model, label_encoders, feature_names):
+        '''Trích hệ số từ LinearRegression + LabelEncoder đã fit'''
+        return cls(
+            feature_names,
+            model.coef_,
+            model.intercept_,
+            {name: [str(v) for v in encoder.classes_] for name, encoder in label_encoders.items()},
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported model artifact version: {data.get('version')}")
+        return cls(data['features'], data['coef'], data['intercept'], data['vocabularies'])
+
+    def to_dict(self):
+        return {
+            'version': ARTIFACT_VERSION,
+            'features': self.feature_names,
+            'coef': self.coef,
+            'intercept': self.intercept,
+            'vocabularies': {
+                name: sorted(vocab, key=vocab.get) for name, vocab in self.vocabularies.items()
+            },
+        }
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        '''Ghi ra file tạm cùng thư mục rồi rename: người đọc không bao giờ thấy file ghi dở'''
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def memory_bytes(self):
+        '''Ước lượng bộ nhớ model chiếm (hệ số + từ điển), dùng cho thống kê registry'''
+        size = sys.getsizeof(self) + sys.getsizeof(self.feature_names) + sys.getsizeof(self.coef)
+        size += sum(sys.getsizeof(c) for c in self.coef)
+        for vocab in self.vocabularies.values():
+            size += sys.getsizeof(vocab) + sum(sys.getsizeof(value) for value in vocab)
+        return size
+
+    def encode(self, features):
+        '''dict feature → vector số theo đúng thứ tự lúc train (giá trị lạ → 0)'''
+        return _encode(features, self.feature_names, self.vocabularies)
+
+    def predict_many(self, features_list):
+        '''Dự đoán cho nhiều task trong một lần gọi (hệ số chỉ đọc một lần)'''
+        coef, intercept = self.coef, self.intercept
+        feature_names, vocabularies = self.feature_names, self.vocabularies
+        return [
+            intercept + sum(c * x for c, x in zip(coef, _encode(features, feature_names, vocabularies)))
+            for features in features_list
+        ]
+
+    def predict_one(self, features):
+        vector = self.encode(features)
+        return self.intercept + sum(c * x for c, x in zip(self.coef, vector))
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from todo.models import FEATURE_NAMES, VOCABULARIES
+from todo.online import RunningLeastSquares
+
+
+class Command(BaseCommand):
+    help = "So sánh học tăng dần (thống kê đủ) với train lại toàn bộ: độ chính xác và chi phí mỗi lần cập nhật"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=2000, help="Số task tổng hợp dùng để train")
+        parser.add_argument("--holdout", type=int, default=500, help="Số task dùng để đo sai số")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def synthetic_rows(self, count, rng):
+        '''Task giả lập: thời gian thực tế = tổ hợp tuyến tính của feature + nhiễu'''
+        true_coef = [4.0, 12.0, 0.15, -6.0, 3.0, 0.4, -2.5, -20.0]
+        rows, targets = [], []
+        for _ in range(count):
+            x = [
+                rng.randrange(len(VOCABULARIES['category'])),
+                rng.randint(1, 3),
+                rng.randint(0, 300),
+                rng.randint(0, 1),
+                rng.randrange(len(VOCABULARIES['time_of_day'])),
+                rng.uniform(20, 120),
+                rng.randint(2, 9),
+                rng.random(),
+            ]
+            y = 20 + sum(c * v for c, v in zip(true_coef, x)) + rng.gauss(0, 10)
+            rows.append(x)
+            targets.append(y)
+        return rows, targets
+
+    def handle(self, *args, **options):
+        import numpy as np
+        from sklearn.linear_model import LinearRegression
+
+        rng = random.Random(options["seed"])
+        X, y = self.synthetic_rows(options["samples"], rng)
+        X_test, y_test = self.synthetic_rows(options["holdout"], rng)
+
+        # Học tăng dần: mỗi task hoàn thành = 1 lần update + giải lại hệ số
+        stats = RunningLeastSquares(len(FEATURE_NAMES))
+        start = time.perf_counter()
+        for row, target in zip(X, y):
+            stats.update(row, target)
+            intercept, coef = stats.solve()
+        online_update_ms = (time.perf_counter() - start) / len(X) * 1000
+
+        # Train lại toàn bộ: chi phí một lần fit trên toàn bộ lịch sử (đo trung bình vài lần)
+        repeats = 20
+        start = time.perf_counter()
+        for _ in range(repeats):
+            regression = LinearRegression().fit(np.asarray(X), np.asarray(y))
+        full_retrain_ms = (time.perf_counter() - start) / repeats * 1000
+
+        online_pred = [intercept + sum(c * v for c, v in zip(coef, row)) for row in X_test]
+        full_pred = regression.predict(np.asarray(X_test))
+        online_mae = float(np.mean(np.abs(np.asarray(online_pred) - y_test)))
+        full_mae = float(np.mean(np.abs(full_pred - y_test)))
+
+        self.stdout.write(f"Samples: {len(X)} train / {len(X_test)} holdout")
+        self.stdout.write(f"MAE (phút)        online: {online_mae:.3f}   full retrain: {full_mae:.3f}")
+        self.stdout.write(
+            f"Cập nhật (ms/task) online: {online_update_ms:.3f}   full retrain: {full_retrain_ms:.3f}"
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from todo.training import run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Chạy các TrainingJob còn chờ hoặc kẹt ở running (vd. sau khi worker khởi động lại)"
+
+    def handle(self, *args, **options):
+        ran = run_queued_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Đã chạy {ran} training job"))
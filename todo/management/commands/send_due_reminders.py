@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from todo.reminders import DEFAULT_BATCH_SIZE, send_due_reminders
+
+
+class Command(BaseCommand):
+    help = "Gửi email nhắc cho các task sắp tới deadline (chạy định kỳ bằng cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help="Số task xử lý mỗi lượt (1 query lấy task, 1 lần ghi cờ và log)",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Chỉ đếm số task cần nhắc, không gửi email",
+        )
+
+    def handle(self, *args, **options):
+        result = send_due_reminders(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{result['due']} task cần nhắc")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã gửi {result['sent']}/{result['due']} email nhắc ({result['failed']} lỗi)"
+        ))
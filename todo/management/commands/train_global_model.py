@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from todo.training import train_global_model
+
+
+class Command(BaseCommand):
+    help = "Train model dự đoán thời gian chung cho mọi người (dùng khi profile chưa có model riêng)"
+
+    def handle(self, *args, **options):
+        if train_global_model():
+            self.stdout.write(self.style.SUCCESS("Đã train model chung"))
+        else:
+            self.stdout.write(self.style.WARNING("Chưa đủ task đã hoàn thành để train model chung"))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("todo", "0003_trainingjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OnlineModelState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sample_count", models.PositiveIntegerField(default=0)),
+                ("xtx", models.JSONField(default=list)),
+                ("xty", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "profile",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="online_model_state",
+                        to="accounts.profile",
+                    ),
+                ),
+            ],
+        ),
+    ]
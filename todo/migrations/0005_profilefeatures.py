@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("todo", "0004_onlinemodelstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileFeatures",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("session_count", models.PositiveIntegerField(default=0)),
+                ("total_session_seconds", models.PositiveIntegerField(default=0)),
+                ("mood_score", models.PositiveSmallIntegerField(default=5)),
+                ("mood_at", models.DateTimeField(blank=True, null=True)),
+                ("tasks_total", models.PositiveIntegerField(default=0)),
+                ("tasks_completed", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "profile",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prediction_features",
+                        to="accounts.profile",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("todo", "0005_profilefeatures"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="todoitem",
+            index=models.Index(
+                fields=["profile", "is_completed", "deadline"],
+                name="todo_todoit_profile_fce90f_idx",
+            ),
+        ),
+    ]
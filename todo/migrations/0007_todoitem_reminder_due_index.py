@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_profile_data_version"),
+        ("todo", "0006_todoitem_status_deadline_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="todoitem",
+            index=models.Index(
+                condition=models.Q(("is_completed", False), ("reminder_sent", False)),
+                fields=["deadline"],
+                name="todo_reminder_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Số model cá nhân tối đa giữ trong bộ nhớ mỗi process
+DEFAULT_MAX_MODELS = 256
+
+
+class PredictorRegistry:
+    '''Giữ các TaskPredictor dùng chung cho cả process: 1 model chung + model riêng của từng profile.
+    - Model riêng nằm trong LRU có giới hạn, model ít dùng nhất bị loại khi đầy.
+    - Profile chưa có model riêng thì dùng model chung (train trên dữ liệu mọi người).
+    - Chỉ load model một lần, load lại khi file model thay đổi (theo mtime).
+    - Thread-safe: nhiều request cùng lúc chỉ load một lần.
+    - Đếm hit/miss/eviction, số lần load/predict, độ trễ và bộ nhớ model đang giữ.'''
+
+    def __init__(self, factory, path_for, max_models=DEFAULT_MAX_MODELS):
+        # factory(profile_id): tạo TaskPredictor đã load model từ đĩa (profile_id=None → model chung)
+        # path_for(profile_id): đường dẫn file model tương ứng
+        self._factory = factory
+        self._path_for = path_for
+        self.max_models = max_models
+        self._global = None  # (predictor, mtime)
+        self._models = OrderedDict()  # profile_id -> (predictor, mtime)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'fallbacks': 0,
+            'evictions': 0,
+            'loads': 0,
+            'load_seconds': 0.0,
+            'predictions': 0,
+            'predict_seconds': 0.0,
+        }
+
+    @staticmethod
+    def _mtime(path):
+        '''mtime của file model (None nếu chưa có file)'''
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, profile_id, mtime):
+        start = time.perf_counter()
+        predictor = self._factory(profile_id)
+        self._stats['loads'] += 1
+        self._stats['load_seconds'] += time.perf_counter() - start
+        return predictor, mtime
+
+    def get_global(self):
+        '''Model chung, load lại nếu file đã đổi'''
+        mtime = self._mtime(self._path_for(None))
+        entry = self._global
+        if entry is not None and entry[1] == mtime:
+            return entry[0]
+
+        with self._lock:
+            # Kiểm tra lại sau khi lấy lock (thread khác có thể đã load xong)
+            if self._global is None or self._global[1] != mtime:
+                self._global = self._load(None, mtime)
+            return self._global[0]
+
+    def get(self, profile_id=None):
+        '''Model riêng của profile nếu có, ngược lại là model chung'''
+        if profile_id is None:
+            return self.get_global()
+
+        mtime = self._mtime(self._path_for(profile_id))
+        if mtime is None:
+            # Chưa train model riêng: không chiếm chỗ trong LRU
+            with self._lock:
+                self._stats['fallbacks'] += 1
+                self._models.pop(profile_id, None)
+            return self.get_global()
+
+        with self._lock:
+            entry = self._models.get(profile_id)
+            if entry is not None and entry[1] == mtime:
+                self._models.move_to_end(profile_id)
+                self._stats['hits'] += 1
+                return entry[0]
+
+            self._stats['misses'] += 1
+            entry = self._load(profile_id, mtime)
+            self._models[profile_id] = entry
+            self._models.move_to_end(profile_id)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self._stats['evictions'] += 1
+            return entry[0]
+
+    def predict_duration(self, task, user_profile):
+        '''Dự đoán bằng predictor phù hợp với profile và ghi nhận độ trễ'''
+        predictor = self.get(user_profile.pk if user_profile else None)
+        start = time.perf_counter()
+        try:
+            return predictor.predict_duration(task, user_profile)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['predictions'] += 1
+                self._stats['predict_seconds'] += elapsed
+
+    def predict_durations(self, tasks, user_profile):
+        '''Dự đoán theo lô cho các task của cùng profile (mỗi task tính là một lần predict)'''
+        predictor = self.get(user_profile.pk if user_profile else None)
+        start = time.perf_counter()
+        try:
+            return predictor.predict_durations(tasks, user_profile)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['predictions'] += len(tasks)
+                self._stats['predict_seconds'] += elapsed
+
+    def invalidate(self, profile_id=None):
+        '''Buộc lần gọi tiếp theo load lại model của profile (None → model chung)'''
+        with self._lock:
+            if profile_id is None:
+                self._global = None
+            else:
+                self._models.pop(profile_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._global = None
+            self._models.clear()
+
+    def stats(self):
+        '''Bộ đếm hit/miss, độ trễ trung bình (ms) và bộ nhớ ước tính của các model đang giữ'''
+        with self._lock:
+            stats = dict(self._stats)
+            predictors = [predictor for predictor, _ in self._models.values()]
+            if self._global is not None:
+                predictors.append(self._global[0])
+            stats['cached_models'] = len(self._models)
+            stats['max_models'] = self.max_models
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['memory_bytes'] = sum(p.model.memory_bytes() for p in predictors if p.model is not None)
+        stats['avg_load_ms'] = stats['load_seconds'] / stats['loads'] * 1000 if stats['loads'] else 0.0
+        stats['avg_predict_ms'] = (
+            stats['predict_seconds'] / stats['predictions'] * 1000 if stats['predictions'] else 0.0
+        )
+        return stats
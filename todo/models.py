@@ -1,16 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Length
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import Profile
-from django.core.mail import send_mail
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
-import joblib
+from django.core.mail import EmailMessage
+import logging
 import os
 import json
 from django.conf import settings
 
+from .inference import LinearDurationModel
+from .ml_registry import PredictorRegistry
+
+logger = logging.getLogger(__name__)
+
+# Nhắc khi deadline còn trong khoảng này
+REMINDER_WINDOW = timedelta(days=1)
+REMINDER_FROM_EMAIL = 'no-reply@studyhabit.com'
+
 class ToDoItem(models.Model):
     PRIORITY_CHOICES = [
         ('low', '🔵 Low'),
@@ -40,37 +47,133 @@ class ToDoItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Lọc task theo trạng thái / quá hạn của từng profile ngay trong DB
+            models.Index(fields=['profile', 'is_completed', 'deadline']),
+            # Index một phần: chỉ chứa task còn chờ nhắc, phục vụ lệnh send_due_reminders
+            models.Index(
+                fields=['deadline'],
+                condition=models.Q(is_completed=False, reminder_sent=False),
+                name='todo_reminder_due_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.get_priority_display()})"
+
+    @staticmethod
+    def overdue_q(now=None):
+        """Điều kiện quá hạn (giống is_overdue) dạng Q để lọc/đếm trong SQL"""
+        return models.Q(is_completed=False, deadline__lt=now or timezone.now())
     
-    def save(self, *args, **kwargs):
+    def assign_default_reward(self):
         # Tự động tính reward coins dựa trên độ khó
         if not self.reward_coins:
             reward_map = {'low': 10, 'medium': 25, 'high': 50}
             self.reward_coins = reward_map.get(self.priority, 25)
+
+    def save(self, *args, **kwargs):
+        self.assign_default_reward()
         
         # Dự đoán thời gian nếu chưa có
         if not self.predicted_duration and self.title:
             self.predicted_duration = self.predict_duration()
             
         super().save(*args, **kwargs)
+
+        # Cập nhật tỉ lệ hoàn thành task trong feature store
+        from .features import refresh_task_stats
+        refresh_task_stats(self.profile_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .features import refresh_task_stats
+        refresh_task_stats(self.profile_id)
+        return result
     
     def mark_completed(self):
-        if not self.is_completed:
+        if self.is_completed:
+            return False
+
+        self.measure_actual_duration()
+
+        with transaction.atomic():
+            # Chỉ request đầu tiên chuyển được is_completed False → True mới được cộng xu
+            updated = ToDoItem.objects.filter(pk=self.pk, is_completed=False).update(
+                is_completed=True, actual_duration=self.actual_duration, updated_at=timezone.now()
+            )
+            if not updated:
+                self.is_completed = True
+                return False
             self.is_completed = True
-            # Tính thời gian thực tế
-            if self.created_at and self.updated_at:
-                duration = (self.updated_at - self.created_at).total_seconds() / 60
-                self.actual_duration = int(duration)
-            
-            self.profile.coins += self.reward_coins
-            self.profile.save(update_fields=['coins'])
-            self.save(update_fields=['is_completed', 'actual_duration'])
+            self.profile.add_coins(self.reward_coins, description=f"Hoàn thành task {self.title}"[:255])
+
+        from .features import refresh_task_stats
+        refresh_task_stats(self.profile_id)
+        # Feature trong cache gắn với data_version: tăng trước khi học online để đọc tỉ lệ hoàn thành mới
+        self.profile.bump_data_version()
+
+        # Học tiếp ngay từ thời gian thực tế (O(1) mỗi task, không train lại toàn bộ)
+        try:
+            from .online import observe_completion
+
+            observe_completion(self)
+        except Exception:
+            logger.exception("Online update failed for task %s", self.pk)
+        return True
     
+    def measure_actual_duration(self):
+        # Tính thời gian thực tế
+        if self.created_at and self.updated_at:
+            duration = (self.updated_at - self.created_at).total_seconds() / 60
+            self.actual_duration = int(duration)
+        return self.actual_duration
+
+    @classmethod
+    def complete_many(cls, profile, task_ids):
+        """Hoàn thành nhiều task trong 1 transaction: 1 bulk_update, 1 lần cộng xu.
+        Trả về ({task_id: 'completed' | 'already_completed' | 'not_found'}, tổng xu được cộng)."""
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                cls.objects.select_for_update()
+                .filter(profile=profile, pk__in=task_ids)
+                .only('id', 'profile_id', 'title', 'description', 'category', 'priority', 'deadline',
+                      'is_completed', 'reward_coins', 'actual_duration', 'created_at', 'updated_at')
+            )
+            pending = [task for task in tasks if not task.is_completed]
+            for task in pending:
+                task.measure_actual_duration()
+                task.is_completed = True
+                task.updated_at = now
+            cls.objects.bulk_update(pending, ['is_completed', 'actual_duration', 'updated_at'])
+
+            coins = sum(task.reward_coins for task in pending)
+            if coins:
+                profile.add_coins(coins, description=f"Hoàn thành {len(pending)} task")
+
+        results = {task_id: 'not_found' for task_id in task_ids}
+        results.update({task.pk: 'already_completed' for task in tasks})
+        results.update({task.pk: 'completed' for task in pending})
+
+        if pending:
+            from .features import refresh_task_stats
+            refresh_task_stats(profile.pk)
+            profile.bump_data_version()
+            try:
+                from .online import observe_completions
+
+                for task in pending:
+                    task.profile = profile
+                observe_completions(pending)
+            except Exception:
+                logger.exception("Online update failed for profile %s", profile.pk)
+        return results, coins
+
     def predict_duration(self):
-        """Dự đoán thời gian hoàn thành bằng ML"""
-        predictor = TaskPredictor()
-        return predictor.predict_duration(self, self.profile)
+        """Dự đoán thời gian hoàn thành bằng ML (dùng predictor chung của process)"""
+        return predictor_registry.predict_duration(self, self.profile)
     
     def time_left(self):
         if not self.deadline:
@@ -88,20 +191,30 @@ class ToDoItem(models.Model):
             return False
         return timezone.now() > self.deadline and not self.is_completed
     
+    @staticmethod
+    def reminder_due_q(now=None):
+        '''Điều kiện cần nhắc (giống should_send_reminder) dạng Q, kèm profile bật nhắc và có email'''
+        now = now or timezone.now()
+        return models.Q(
+            is_completed=False,
+            reminder_sent=False,
+            deadline__gt=now,
+            deadline__lte=now + REMINDER_WINDOW,
+            profile__email_reminder=True,
+        ) & ~models.Q(profile__user__email='')
+
     def should_send_reminder(self):
         now = timezone.now()
         return (
             not self.is_completed
             and not self.reminder_sent
             and self.deadline
-            and (self.deadline - now) <= timedelta(days=1)
+            and (self.deadline - now) <= REMINDER_WINDOW
             and (self.deadline > now)
         )
     
-    def send_reminder_email(self):
-        if not self.profile.user.email:
-            return
-
+    def build_reminder_email(self, connection=None):
+        '''EmailMessage nhắc deadline (chưa gửi)'''
         subject = f"🔔 Reminder: '{self.title}' deadline approaching"
         message = f"""
         Hello {self.profile.user.username},
@@ -116,17 +229,18 @@ class ToDoItem(models.Model):
         Best regards,
         Study Habit Tracker Team
         """
+        return EmailMessage(
+            subject, message, REMINDER_FROM_EMAIL, [self.profile.user.email], connection=connection
+        )
+
+    def send_reminder_email(self):
+        if not self.profile.user.email:
+            return
 
         try:
-            send_mail(
-                subject,
-                message,
-                'no-reply@studyhabit.com',
-                [self.profile.user.email],
-                fail_silently=False,
-            )
+            self.build_reminder_email().send(fail_silently=False)
             self.reminder_sent = True
-            self.save()
+            ToDoItem.objects.filter(pk=self.pk).update(reminder_sent=True)
             ReminderLog.objects.create(
                 todo_item=self,
                 sent_at=timezone.now(),
@@ -141,13 +255,29 @@ class ToDoItem(models.Model):
     
     def get_duration_display(self):
         if self.predicted_duration:
-            hours = self.predicted_duration // 60
-            minutes = self.predicted_duration % 60
-            if hours > 0:
-                return f"{hours}h {minutes}m"
-            return f"{minutes}m"
+            return format_minutes(self.predicted_duration)
         return "Not predicted"
 
+    @classmethod
+    def predict_missing_durations(cls, tasks):
+        """Dự đoán theo lô cho các task chưa có predicted_duration (dùng trước bulk_create/save hàng loạt)"""
+        pending = {}
+        for task in tasks:
+            if not task.predicted_duration and task.title:
+                pending.setdefault(task.profile_id, []).append(task)
+        for group in pending.values():
+            profile = group[0].profile
+            for task, minutes in zip(group, predictor_registry.predict_durations(group, profile)):
+                task.predicted_duration = minutes
+        return tasks
+
+def format_minutes(total_minutes):
+    hours, minutes = divmod(total_minutes, 60)
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
 class ReminderLog(models.Model):
     todo_item = models.ForeignKey(ToDoItem, on_delete=models.CASCADE, related_name='reminder_logs')
     sent_at = models.DateTimeField()
@@ -156,117 +286,251 @@ class ReminderLog(models.Model):
     def __str__(self):
         return f"Reminder for '{self.todo_item.title}' - {self.status}"
 
+
+class ProfileFeatures(models.Model):
+    '''Feature theo profile cho model dự đoán, cập nhật khi kết thúc ca học / lưu cảm xúc / đổi task
+    để lúc dự đoán không phải aggregate lại (xem todo.features)'''
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='prediction_features')
+    session_count = models.PositiveIntegerField(default=0)
+    total_session_seconds = models.PositiveIntegerField(default=0)
+    mood_score = models.PositiveSmallIntegerField(default=5)
+    mood_at = models.DateTimeField(null=True, blank=True)
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Prediction features of {self.profile}"
+
+    @property
+    def avg_study_duration(self):
+        '''Thời lượng trung bình một ca học (phút)'''
+        if not self.session_count or not self.total_session_seconds:
+            return DEFAULT_STUDY_MINUTES
+        return self.total_session_seconds / self.session_count / 60
+
+    @property
+    def completion_rate(self):
+        return self.tasks_completed / self.tasks_total if self.tasks_total else 0.0
+
+    def as_features(self):
+        return {
+            'avg_study_duration': self.avg_study_duration,
+            'mood_score': self.mood_score,
+            'completion_rate': self.completion_rate,
+        }
+
+
+class OnlineModelState(models.Model):
+    '''Thống kê đủ (XᵀX, Xᵀy) của model riêng mỗi profile để học tiếp khi hoàn thành task'''
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='online_model_state')
+    sample_count = models.PositiveIntegerField(default=0)
+    xtx = models.JSONField(default=list)
+    xty = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Online model of {self.profile} ({self.sample_count} samples)"
+
+
+class TrainingJob(models.Model):
+    '''Một lần huấn luyện model dự đoán thời gian, chạy nền bởi todo.training'''
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    # Mỗi profile chỉ có tối đa 1 job đang chờ/đang chạy
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='training_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    trained = models.BooleanField(default=False)
+    training_samples = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='todo_one_active_training_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Training #{self.pk} for {self.profile} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status not in self.ACTIVE_STATUSES
+
+    def as_dict(self):
+        return {
+            'job_id': self.pk,
+            'state': self.status,
+            'finished': self.is_finished,
+            'trained': self.trained,
+            'training_samples': self.training_samples,
+            'message': self.message,
+        }
+
 # MACHINE LEARNING MODEL
+# Thứ tự feature khi đưa vào model (khớp với extract_features)
+FEATURE_NAMES = (
+    'category', 'priority_score', 'desc_length', 'has_deadline',
+    'time_of_day', 'avg_study_duration', 'mood_score', 'completion_rate',
+)
+# Feature của model pickle cũ (trước khi có completion_rate), chỉ dùng khi chuyển đổi sang JSON
+LEGACY_FEATURE_NAMES = (
+    'category', 'priority_score', 'desc_length', 'has_deadline',
+    'time_of_day', 'avg_study_duration', 'mood_score',
+)
+PRIORITY_SCORES = {'low': 1, 'medium': 2, 'high': 3}
+# Từ điển cố định cho feature dạng chữ (mã = vị trí trong danh sách)
+VOCABULARIES = {
+    'category': [value for value, _ in ToDoItem.CATEGORY_CHOICES],
+    'time_of_day': ['morning', 'afternoon', 'evening'],
+}
+DEFAULT_STUDY_MINUTES = 60
+# Số mẫu phải nhiều hơn số tham số (hệ số + intercept), giống todo.online.has_enough_samples:
+# model riêng thiếu mẫu sẽ được ưu tiên hơn model chung dù chỉ là nhiễu
+MIN_TRAINING_SAMPLES = len(FEATURE_NAMES) + 2
+
+
+def time_of_day(hour):
+    if 6 <= hour < 12:
+        return 'morning'
+    if 12 <= hour < 18:
+        return 'afternoon'
+    return 'evening'
+
+
 class TaskPredictor:
-    def __init__(self):
+    def __init__(self, profile_id=None):
+        # profile_id=None → model chung train trên dữ liệu của mọi người
+        self.profile_id = profile_id
         self.model = None
-        self.label_encoders = {}
-        self.model_path = os.path.join(settings.BASE_DIR, 'todo', 'ml_model', 'task_predictor.pkl')
-        self.encoder_path = os.path.join(settings.BASE_DIR, 'todo', 'ml_model', 'label_encoders.pkl')
+        model_dir = self.model_dir()
+        self.model_path = self.artifact_path(profile_id)
+        # File pickle cũ (sklearn), chỉ dùng để chuyển đổi sang định dạng JSON
+        self.legacy_model_path = os.path.join(model_dir, 'task_predictor.pkl')
+        self.legacy_encoder_path = os.path.join(model_dir, 'label_encoders.pkl')
         self.load_model()
+
+    @staticmethod
+    def model_dir():
+        return getattr(settings, 'TODO_MODEL_DIR', os.path.join(settings.BASE_DIR, 'todo', 'ml_model'))
+
+    @classmethod
+    def artifact_path(cls, profile_id=None):
+        """File model chung hoặc file model riêng của profile"""
+        if profile_id is None:
+            return os.path.join(cls.model_dir(), 'task_predictor.json')
+        return os.path.join(cls.model_dir(), 'profiles', f'{profile_id}.json')
     
     def load_model(self):
-        """Load model đã train"""
+        """Load model đã train (file JSON hệ số, không cần sklearn)"""
         try:
             if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-                self.label_encoders = joblib.load(self.encoder_path)
-        except:
+                self.model = LinearDurationModel.load(self.model_path)
+            elif self.profile_id is None and os.path.exists(self.legacy_model_path):
+                self._convert_legacy_model()
+        except Exception:
             self.model = None
+
+    def _convert_legacy_model(self):
+        """Chuyển model pickle cũ sang JSON một lần duy nhất"""
+        import joblib
+
+        model = joblib.load(self.legacy_model_path)
+        encoders = joblib.load(self.legacy_encoder_path)
+        # Pickle cũ được train trên 7 feature, không phải FEATURE_NAMES hiện tại
+        self.model = LinearDurationModel.from_sklearn(model, encoders, LEGACY_FEATURE_NAMES)
+        self.model.save(self.model_path)
     
-    def extract_features(self, task, user_profile):
-        """Trích xuất features cho ML"""
-        # 1. Category
-        category = task.category
-        
-        # 2. Priority (chuyển thành số)
-        priority_map = {'low': 1, 'medium': 2, 'high': 3}
-        priority_score = priority_map.get(task.priority, 2)
-        
-        # 3. Độ dài description
-        desc_length = len(task.description or '')
-        
-        # 4. Có deadline không
-        has_deadline = 1 if task.deadline else 0
-        
-        # 5. Thời gian trong ngày
-        hour = task.created_at.hour
-        if 6 <= hour < 12:
-            time_of_day = 'morning'
-        elif 12 <= hour < 18:
-            time_of_day = 'afternoon'
-        else:
-            time_of_day = 'evening'
-        
-        # 6. Thói quen học tập (lấy từ study sessions)
-        try:
-            from study.models import StudySession
-            avg_duration = StudySession.objects.filter(
-                profile=user_profile
-            ).aggregate(avg_duration=models.Avg('duration'))['avg_duration'] or 60
-        except:
-            avg_duration = 60
-        
-        # 7. Cảm xúc gần đây
-        try:
-            recent_mood = user_profile.emotion_entries.order_by('-created_at').first()
-            mood_score = recent_mood.mood_score if recent_mood else 5
-        except:
-            mood_score = 5
+    @staticmethod
+    def profile_context(profile_ids):
+        """Feature theo profile (thói quen học, cảm xúc gần nhất, tỉ lệ hoàn thành) đọc từ feature store"""
+        from .features import load_features
 
+        return load_features(profile_ids)
+
+    @classmethod
+    def extract_features(cls, task, user_profile, profile_features=None):
+        """Trích xuất features cho ML (không cần model đã load, feature profile lấy từ cache)"""
+        from .features import get_features
+
+        if profile_features is None:
+            profile_features = get_features(user_profile)
+        created_at = task.created_at or timezone.now()  # task chưa lưu thì chưa có created_at
         return {
-            'category': category,
-            'priority_score': priority_score,
-            'desc_length': desc_length,
-            'has_deadline': has_deadline,
-            'time_of_day': time_of_day,
-            'avg_study_duration': avg_duration,
-            'mood_score': mood_score
+            'category': task.category,
+            'priority_score': PRIORITY_SCORES.get(task.priority, 2),
+            'desc_length': len(task.description or ''),
+            'has_deadline': 1 if task.deadline else 0,
+            'time_of_day': time_of_day(created_at.hour),
+            **profile_features,
         }
-    
+
+    def build_training_matrix(self, completed_tasks):
+        """Lấy toàn bộ cột cần thiết trong 2 query và dựng ma trận NumPy (X, y)"""
+        import numpy as np
+
+        rows = list(
+            completed_tasks.filter(actual_duration__gte=5, actual_duration__lte=480)
+            .annotate(desc_length=Length('description'))
+            .values_list('profile_id', 'category', 'priority', 'desc_length',
+                         'deadline', 'created_at', 'actual_duration')
+        )
+        if not rows:
+            return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+
+        profile_ids, categories, priorities, desc_lengths, deadlines, created, targets = zip(*rows)
+        context = self.profile_context(set(profile_ids))
+        category_codes = {value: i for i, value in enumerate(VOCABULARIES['category'])}
+        time_codes = {value: i for i, value in enumerate(VOCABULARIES['time_of_day'])}
+
+        columns = {
+            'category': [category_codes.get(c, 0) for c in categories],
+            'priority_score': [PRIORITY_SCORES.get(p, 2) for p in priorities],
+            'desc_length': np.asarray(desc_lengths, dtype=float),
+            'has_deadline': [d is not None for d in deadlines],
+            'time_of_day': [time_codes[time_of_day(c.hour)] for c in created],
+            'avg_study_duration': [context[p]['avg_study_duration'] for p in profile_ids],
+            'mood_score': [context[p]['mood_score'] for p in profile_ids],
+            'completion_rate': [context[p]['completion_rate'] for p in profile_ids],
+        }
+        X = np.column_stack([np.asarray(columns[name], dtype=float) for name in FEATURE_NAMES])
+        return X, np.asarray(targets, dtype=float)
+
     def train_model(self, completed_tasks):
-        """Huấn luyện model với tasks đã hoàn thành"""
-        if len(completed_tasks) < 5:
+        """Huấn luyện model với queryset tasks đã hoàn thành (sklearn chỉ dùng ở bước này)"""
+        X, y = self.build_training_matrix(completed_tasks)
+        if len(y) < MIN_TRAINING_SAMPLES:
             return False
-            
-        features_list = []
-        targets = []
-        
-        for task in completed_tasks:
-            if task.actual_duration and 5 <= task.actual_duration <= 480:
-                features = self.extract_features(task, task.profile)
-                features_list.append(features)
-                targets.append(task.actual_duration)
-        
-        if len(features_list) < 3:
-            return False
-            
-        # Encode features
-        X = []
-        for features in features_list:
-            encoded = []
-            for key, value in features.items():
-                if key in ['category', 'time_of_day']:
-                    if key not in self.label_encoders:
-                        self.label_encoders[key] = LabelEncoder()
-                    try:
-                        encoded_val = self.label_encoders[key].fit_transform([value])[0]
-                        encoded.append(encoded_val)
-                    except:
-                        encoded.append(0)
-                else:
-                    encoded.append(float(value))
-            X.append(encoded)
-        
-        # Train model
-        self.model = LinearRegression()
-        self.model.fit(X, targets)
-        
-        # Save model
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.label_encoders, self.encoder_path)
-        
+
+        # Import muộn để khởi động Django/manage.py không phải nạp numpy/sklearn
+        from sklearn.linear_model import LinearRegression
+
+        regression = LinearRegression()
+        regression.fit(X, y)
+
+        if self.profile_id is not None:
+            # Các lần hoàn thành task sau đó cập nhật tiếp từ dữ liệu này
+            from .online import seed_profile_model
+
+            seed_profile_model(self.profile_id, X, y)
+
+        # Lưu hệ số ra file JSON, lúc dự đoán không cần sklearn
+        self.model = LinearDurationModel(FEATURE_NAMES, regression.coef_, regression.intercept_, VOCABULARIES)
+        self.model.save(self.model_path)
+
         return True
     
     def predict_duration(self, task, user_profile):
@@ -277,28 +541,36 @@ class TaskPredictor:
         
         features = self.extract_features(task, user_profile)
         
-        # Encode features để predict
-        encoded_features = []
-        for key, value in features.items():
-            if key in ['category', 'time_of_day']:
-                if key in self.label_encoders:
-                    try:
-                        encoded_val = self.label_encoders[key].transform([value])[0]
-                        encoded_features.append(encoded_val)
-                    except:
-                        encoded_features.append(0)
-                else:
-                    encoded_features.append(0)
-            else:
-                encoded_features.append(float(value))
-        
         try:
-            prediction = self.model.predict([encoded_features])[0]
+            prediction = self.model.predict_one(features)
             return int(max(15, min(480, prediction)))  # Giới hạn 15-480 phút
-        except:
+        except Exception:
             return self._get_default_prediction(task)
     
+    def predict_durations(self, tasks, user_profile):
+        """Dự đoán cho nhiều task của cùng một profile: đọc feature profile một lần, gọi model một lần"""
+        if self.model is None:
+            return [self._get_default_prediction(task) for task in tasks]
+
+        from .features import get_features
+
+        profile_features = get_features(user_profile)
+        features_list = [self.extract_features(task, user_profile, profile_features) for task in tasks]
+        try:
+            predictions = self.model.predict_many(features_list)
+        except Exception:
+            return [self._get_default_prediction(task) for task in tasks]
+        return [int(max(15, min(480, prediction))) for prediction in predictions]
+
     def _get_default_prediction(self, task):
         """Dự đoán mặc định khi không có model"""
         base_times = {'low': 30, 'medium': 60, 'high': 90}
-        return base_times.get(task.priority, 60)
\ No newline at end of file
+        return base_times.get(task.priority, 60)
+
+
+# Predictor dùng chung cho cả process: model chung + LRU các model riêng theo profile
+predictor_registry = PredictorRegistry(
+    TaskPredictor,
+    TaskPredictor.artifact_path,
+    max_models=getattr(settings, 'TODO_MODEL_CACHE_SIZE', 256),
+)
@@ -0,0 +1,148 @@
+from django.db import transaction
+
+# Hệ số ridge nhỏ để hệ phương trình luôn giải được khi còn ít mẫu (không phạt intercept)
+RIDGE = 1e-3
+
+
+class RunningLeastSquares:
+    '''Thống kê đủ của hồi quy tuyến tính: XᵀX, Xᵀy và số mẫu (X có thêm cột 1 cho intercept).
+    Thêm một mẫu tốn O(d²), giải lại hệ số tốn O(d³) với d = số feature (cố định) → O(1) theo số task.'''
+
+    def __init__(self, dim, xtx=None, xty=None, count=0):
+        size = dim + 1
+        self.dim = dim
+        self.xtx = xtx or [[0.0] * size for _ in range(size)]
+        self.xty = xty or [0.0] * size
+        self.count = count
+
+    @classmethod
+    def from_matrix(cls, X, y):
+        '''Khởi tạo từ toàn bộ dữ liệu train (chỉ dùng ở bước train nên được phép dùng NumPy)'''
+        import numpy as np
+
+        X = np.asarray(X, dtype=float)
+        augmented = np.column_stack([np.ones(len(X)), X])
+        return cls(
+            X.shape[1],
+            (augmented.T @ augmented).tolist(),
+            (augmented.T @ np.asarray(y, dtype=float)).tolist(),
+            len(X),
+        )
+
+    def update(self, x, y):
+        row = [1.0] + [float(v) for v in x]
+        y = float(y)
+        for i, xi in enumerate(row):
+            if xi:
+                xtx_i = self.xtx[i]
+                for j, xj in enumerate(row):
+                    xtx_i[j] += xi * xj
+                self.xty[i] += xi * y
+        self.count += 1
+
+    def solve(self, ridge=RIDGE):
+        '''Giải (XᵀX + λI)w = Xᵀy bằng khử Gauss. Trả về (intercept, coef)'''
+        size = self.dim + 1
+        # Ma trận mở rộng [A | b]
+        a = [list(self.xtx[i]) + [self.xty[i]] for i in range(size)]
+        for i in range(1, size):
+            a[i][i] += ridge
+
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(a[r][col]))
+            if abs(a[pivot][col]) < 1e-12:
+                continue
+            a[col], a[pivot] = a[pivot], a[col]
+            for r in range(size):
+                if r != col and a[r][col]:
+                    factor = a[r][col] / a[col][col]
+                    a[r] = [v - factor * p for v, p in zip(a[r], a[col])]
+
+        weights = [a[i][size] / a[i][i] if abs(a[i][i]) >= 1e-12 else 0.0 for i in range(size)]
+        return weights[0], weights[1:]
+
+
+def _load_stats(state, dim):
+    if state.sample_count and len(state.xty) == dim + 1:
+        return RunningLeastSquares(dim, state.xtx, state.xty, state.sample_count)
+    # Chưa có dữ liệu hoặc bộ feature đã đổi: bắt đầu lại
+    return RunningLeastSquares(dim)
+
+
+def _save_stats(state, stats):
+    state.xtx = stats.xtx
+    state.xty = stats.xty
+    state.sample_count = stats.count
+    state.save(update_fields=['xtx', 'xty', 'sample_count', 'updated_at'])
+
+
+def has_enough_samples(stats):
+    '''Chỉ công bố model riêng khi số mẫu nhiều hơn số tham số (hệ số + intercept), cùng ngưỡng với
+    MIN_TRAINING_SAMPLES khi train toàn bộ. Ít hơn thì hệ thiếu điều kiện, model nhiễu sẽ thay thế model chung tốt hơn.'''
+    return stats.count > stats.dim + 1
+
+
+def _publish(profile_id):
+    '''Giải hệ số từ thống kê đã commit mới nhất, ghi artifact của profile và báo registry load lại.
+    Chạy sau commit (ngoài khóa) nên ghi file không giữ dòng thống kê bị khóa;
+    nếu hai lần ghi đan xen, lần hoàn thành task kế tiếp sẽ ghi lại bản mới nhất.'''
+    from .inference import LinearDurationModel
+    from .models import FEATURE_NAMES, VOCABULARIES, OnlineModelState, TaskPredictor, predictor_registry
+
+    state = OnlineModelState.objects.filter(profile_id=profile_id).first()
+    if state is None:
+        return None
+    stats = _load_stats(state, len(FEATURE_NAMES))
+    if not has_enough_samples(stats):
+        return None
+    intercept, coef = stats.solve()
+    model = LinearDurationModel(FEATURE_NAMES, coef, intercept, VOCABULARIES)
+    model.save(TaskPredictor.artifact_path(profile_id))
+    predictor_registry.invalidate(profile_id)
+    return model
+
+
+def seed_profile_model(profile_id, X, y):
+    '''Ghi đè thống kê đủ của profile sau một lần train toàn bộ'''
+    from .models import OnlineModelState
+
+    stats = RunningLeastSquares.from_matrix(X, y)
+    state, _ = OnlineModelState.objects.get_or_create(profile_id=profile_id)
+    _save_stats(state, stats)
+
+
+def observe_completion(task):
+    '''Cập nhật model của profile bằng thời gian thực tế của một task vừa hoàn thành.
+    Artifact được ghi lại sau khi transaction commit (khi đã đủ mẫu, xem has_enough_samples).
+    Trả về thống kê mới (None nếu thời gian không hợp lệ).'''
+    return observe_completions([task])
+
+
+def observe_completions(tasks):
+    '''Như observe_completion cho nhiều task của cùng một profile: ghi thống kê và artifact một lần'''
+    from .features import get_features
+    from .inference import encode_features
+    from .models import FEATURE_NAMES, VOCABULARIES, OnlineModelState, TaskPredictor
+
+    samples = [task for task in tasks if task.actual_duration and 5 <= task.actual_duration <= 480]
+    if not samples:
+        return None
+
+    profile = samples[0].profile
+    profile_features = get_features(profile)
+    rows = [
+        encode_features(TaskPredictor.extract_features(task, profile, profile_features), FEATURE_NAMES, VOCABULARIES)
+        for task in samples
+    ]
+
+    with transaction.atomic():
+        # Khóa dòng thống kê: các lần hoàn thành đồng thời của cùng profile được cộng lần lượt
+        state, _ = OnlineModelState.objects.select_for_update().get_or_create(profile_id=profile.pk)
+        stats = _load_stats(state, len(FEATURE_NAMES))
+        for x, task in zip(rows, samples):
+            stats.update(x, task.actual_duration)
+        _save_stats(state, stats)
+        # Ghi artifact (có fsync) sau khi nhả khóa, không bắt các lần hoàn thành khác phải chờ I/O
+        profile_id = profile.pk
+        transaction.on_commit(lambda: _publish(profile_id))
+    return stats
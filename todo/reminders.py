@@ -0,0 +1,74 @@
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from .models import ReminderLog, ToDoItem
+
+# Số task xử lý mỗi lượt: 1 query lấy task, 1 update + 1 bulk_create (email vẫn gửi từng cái qua 1 kết nối)
+DEFAULT_BATCH_SIZE = 500
+
+
+def due_reminders(now=None):
+    '''Task cần nhắc (dùng index một phần todo_reminder_due_idx), kèm user để dựng email không tốn thêm query'''
+    return (
+        ToDoItem.objects.filter(ToDoItem.reminder_due_q(now))
+        .select_related('profile__user')
+        .only(
+            'id', 'title', 'deadline', 'predicted_duration', 'reward_coins',
+            'profile__id', 'profile__user__username', 'profile__user__email',
+        )
+        .order_by('pk')
+    )
+
+
+def _failed_status(error):
+    return f"failed: {error}"[:ReminderLog._meta.get_field('status').max_length]
+
+
+def send_due_reminders(now=None, batch_size=DEFAULT_BATCH_SIZE, connection=None, dry_run=False):
+    '''Gửi email nhắc cho mọi task sắp tới deadline qua một kết nối mail duy nhất.
+    Đi theo từng lô (keyset theo pk) nên bộ nhớ không phụ thuộc số task.
+    Mỗi email được gửi riêng (cùng kết nối) để một địa chỉ lỗi không kéo theo cả lô: task gửi lỗi được
+    ghi ReminderLog "failed: ..." và giữ reminder_sent=False để lần chạy sau gửi lại, task đã gửi thì không.
+    Trả về {'due', 'sent', 'failed'}.'''
+    now = now or timezone.now()
+    queryset = due_reminders(now)
+    result = {'due': 0, 'sent': 0, 'failed': 0}
+
+    connection = connection or get_connection(fail_silently=False)
+    if not dry_run:
+        # Mở một lần cho cả lượt chạy (SMTP: một lần bắt tay/đăng nhập)
+        connection.open()
+    try:
+        last_pk = 0
+        while True:
+            tasks = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not tasks:
+                break
+            last_pk = tasks[-1].pk
+            result['due'] += len(tasks)
+            if dry_run:
+                continue
+
+            logs = []
+            sent_ids = []
+            for task in tasks:
+                try:
+                    delivered = connection.send_messages([task.build_reminder_email(connection=connection)])
+                except Exception as e:
+                    status = _failed_status(e)
+                else:
+                    status = 'success' if delivered else _failed_status('not sent')
+                if status == 'success':
+                    sent_ids.append(task.pk)
+                logs.append(ReminderLog(todo_item_id=task.pk, sent_at=timezone.now(), status=status))
+            result['sent'] += len(sent_ids)
+            result['failed'] += len(tasks) - len(sent_ids)
+
+            if sent_ids:
+                # reminder_sent=False trong điều kiện: không ghi đè nếu lượt chạy khác đã đánh dấu
+                ToDoItem.objects.filter(pk__in=sent_ids, reminder_sent=False).update(reminder_sent=True)
+            ReminderLog.objects.bulk_create(logs)
+    finally:
+        if not dry_run:
+            connection.close()
+    return result
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from emotion.models import EmotionEntry
+from .features import record_mood
+
+
+# Lưu cảm xúc → cập nhật điểm tâm trạng gần nhất trong feature store dự đoán
+@receiver(post_save, sender=EmotionEntry, dispatch_uid='todo_features_mood')
+def update_mood_feature(sender, instance, **kwargs):
+    record_mood(instance)
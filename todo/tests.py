@@ -1,3 +1,787 @@
-from django.test import TestCase
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.cache import get_api_cache
+
+from .features import get_features, rebuild as rebuild_features
+from .inference import LinearDurationModel
+from .ml_registry import PredictorRegistry
+from .models import (
+    FEATURE_NAMES, LEGACY_FEATURE_NAMES, MIN_TRAINING_SAMPLES, VOCABULARIES,
+    OnlineModelState, ReminderLog, TaskPredictor, ToDoItem, TrainingJob,
+)
+from .online import RunningLeastSquares
+from .reminders import send_due_reminders
+from .training import run_queued_jobs, run_training_job, submit_training, train_global_model
+
+# Kiểm tra thời gian chạy chỉ bật khi cần (TIMING_TESTS=1), máy CI bận sẽ làm test đo thời gian chập chờn
+RUN_TIMING_TESTS = os.environ.get('TIMING_TESTS') == '1'
+# Ngân sách thời gian cho django.setup() (giây), có thể nới qua biến môi trường trên máy chậm
+DJANGO_SETUP_BUDGET = float(os.environ.get('DJANGO_SETUP_BUDGET', '1.0'))
+
+# Các thư viện nặng chỉ được nạp khi thực sự dự đoán/huấn luyện
+HEAVY_MODULES = ('numpy', 'scipy', 'sklearn', 'joblib')
+
+SETUP_SCRIPT = '''
+import time
+t0 = time.perf_counter()
+import django
+django.setup()
+print("setup_seconds=%f" % (time.perf_counter() - t0))
+'''
+
+
+class TodoTestCase(TestCase):
+    '''Mỗi test có cache API trống và thư mục model riêng (TODO_MODEL_DIR), không đụng tới model thật'''
+
+    def setUp(self):
+        super().setUp()
+        get_api_cache().clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(TODO_MODEL_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class StartupImportTimeTest(SimpleTestCase):
+    '''Khởi động Django (manage.py, worker gunicorn, cron) không được nạp stack ML'''
+
+    def run_setup(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'studyhabit.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SETUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        return result
+
+    def test_django_setup_skips_ml_stack(self):
+        result = self.run_setup()
+
+        # Mỗi dòng stderr: "import time: self [us] | cumulative | module"
+        imported = {
+            line.rsplit('|', 1)[-1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith('import time:')
+        }
+        heavy = sorted(m for m in imported if m.split('.')[0] in HEAVY_MODULES)
+        self.assertEqual(heavy, [], 'ML libraries imported during django.setup()')
+
+    @skipUnless(RUN_TIMING_TESTS, 'set TIMING_TESTS=1 to check the django.setup() time budget')
+    def test_django_setup_fits_budget(self):
+        result = self.run_setup()
+
+        seconds = float(re.search(r'setup_seconds=([\d.]+)', result.stdout).group(1))
+        self.assertLess(
+            seconds, DJANGO_SETUP_BUDGET,
+            f'django.setup() took {seconds:.2f}s (budget {DJANGO_SETUP_BUDGET:.2f}s)',
+        )
+
+
+class LinearDurationModelTest(TodoTestCase):
+    '''Model JSON phải dự đoán giống hệt LinearRegression của sklearn'''
+
+    def setUp(self):
+        super().setUp()
+        self.profile = User.objects.create_user(username='ml', password='secret').profile
+        categories = ['study', 'homework', 'project', 'review']
+        priorities = ['low', 'medium', 'high']
+        for i in range(12):
+            ToDoItem.objects.create(
+                profile=self.profile,
+                title=f'Task {i}',
+                description='x' * (i * 7),
+                category=categories[i % len(categories)],
+                priority=priorities[i % len(priorities)],
+                is_completed=True,
+                actual_duration=20 + i * 9,
+            )
+
+    def make_predictor(self):
+        predictor = TaskPredictor()
+        predictor.model = None
+        return predictor
+
+    def test_json_artifact_matches_sklearn(self):
+        from sklearn.linear_model import LinearRegression
+
+        predictor = self.make_predictor()
+        tasks = ToDoItem.objects.filter(profile=self.profile)
+        self.assertTrue(predictor.train_model(tasks))
+
+        model = LinearDurationModel.load(predictor.model_path)
+        self.assertEqual(model.feature_names, list(FEATURE_NAMES))
+
+        # Fit lại bằng sklearn trên cùng vector đã mã hóa và so sánh kết quả
+        rows = [model.encode(predictor.extract_features(t, self.profile)) for t in tasks]
+        regression = LinearRegression().fit(rows, [t.actual_duration for t in tasks])
+        for row, task in zip(rows, tasks):
+            features = predictor.extract_features(task, self.profile)
+            self.assertAlmostEqual(model.predict_one(features), regression.predict([row])[0], places=6)
+
+    def test_batch_matrix_matches_single_task_features(self):
+        from emotion.models import EmotionEntry
+        from study.models import StudySession, Subject
+
+        subject = Subject.objects.create(profile=self.profile, name='Math')
+        now = timezone.now()
+        session = StudySession.objects.create(
+            profile=self.profile, subject=subject, start_time=now - timedelta(minutes=45),
+        )
+        session.stop()
+        EmotionEntry.objects.create(profile=self.profile, study_session=session, emotion='stressed')
+
+        predictor = self.make_predictor()
+        tasks = ToDoItem.objects.filter(profile=self.profile).order_by('id')
+        with self.assertNumQueries(2):
+            X, y = predictor.build_training_matrix(tasks)
+
+        model = LinearDurationModel(FEATURE_NAMES, [0] * len(FEATURE_NAMES), 0, VOCABULARIES)
+        expected = [model.encode(predictor.extract_features(t, self.profile)) for t in tasks]
+        self.assertEqual(X.tolist(), expected)
+        self.assertEqual(y.tolist(), [t.actual_duration for t in tasks])
+        self.assertAlmostEqual(X[0, FEATURE_NAMES.index('avg_study_duration')], 45, delta=0.1)
+        self.assertEqual(X[0, FEATURE_NAMES.index('mood_score')], 3)
+
+    def test_legacy_pickle_converts_with_its_own_features(self):
+        import joblib
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import LabelEncoder
+
+        # Pickle cũ: 7 feature (chưa có completion_rate)
+        encoders = {
+            'category': LabelEncoder().fit(VOCABULARIES['category']),
+            'time_of_day': LabelEncoder().fit(VOCABULARIES['time_of_day']),
+        }
+        rows = [[i % 4, i % 3 + 1, i * 5, i % 2, i % 3, 60, 5] for i in range(10)]
+        regression = LinearRegression().fit(rows, [30 + 10 * r[1] for r in rows])
+        joblib.dump(regression, os.path.join(TaskPredictor.model_dir(), 'task_predictor.pkl'))
+        joblib.dump(encoders, os.path.join(TaskPredictor.model_dir(), 'label_encoders.pkl'))
+
+        predictor = TaskPredictor()
+        model = LinearDurationModel.load(TaskPredictor.artifact_path())
+
+        self.assertEqual(model.feature_names, list(LEGACY_FEATURE_NAMES))
+        self.assertEqual(len(model.coef), len(model.feature_names))
+        self.assertEqual(predictor.model.feature_names, model.feature_names)
+
+        # Artifact có số hệ số khác số feature bị từ chối khi load
+        data = model.to_dict()
+        data['features'] = list(FEATURE_NAMES)
+        with self.assertRaises(ValueError):
+            LinearDurationModel.from_dict(data)
+
+    def test_unknown_category_and_default_prediction(self):
+        predictor = self.make_predictor()
+        task = ToDoItem(profile=self.profile, title='New', priority='high')
+        self.assertEqual(predictor.predict_duration(task, self.profile), 90)
+
+        predictor.train_model(ToDoItem.objects.filter(profile=self.profile))
+        task = ToDoItem.objects.create(profile=self.profile, title='Other', category='other')
+        minutes = predictor.predict_duration(task, self.profile)
+        self.assertTrue(15 <= minutes <= 480)
+
+
+class TrainingJobTest(TodoTestCase):
+    '''Train chạy nền: mỗi profile chỉ 1 job đang chờ, client poll trạng thái'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='trainer', password='secret')
+        self.profile = self.user.profile
+        for i in range(MIN_TRAINING_SAMPLES):
+            ToDoItem.objects.create(
+                profile=self.profile, title=f'Done {i}', is_completed=True, actual_duration=30 + i * 10,
+            )
+        self.client.login(username='trainer', password='secret')
+
+    def test_requests_are_deduplicated_per_profile(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            first, created = submit_training(self.profile)
+            second, created_again = submit_training(self.profile)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(TrainingJob.objects.filter(profile=self.profile).count(), 1)
+
+        self.assertTrue(run_training_job(first.pk))
+        self.assertFalse(run_training_job(first.pk))  # job đã được nhận thì không chạy lại
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'succeeded')
+        self.assertTrue(first.trained)
+        self.assertEqual(first.training_samples, MIN_TRAINING_SAMPLES)
+
+        # Job cũ đã xong thì được phép tạo job mới
+        with self.captureOnCommitCallbacks():
+            third, created = submit_training(self.profile)
+        self.assertTrue(created)
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_stale_running_job_is_requeued(self):
+        # Worker chết giữa chừng: job kẹt ở running từ 2 giờ trước
+        job = TrainingJob.objects.create(
+            profile=self.profile, status='running', started_at=timezone.now() - timedelta(hours=2),
+        )
+
+        with self.captureOnCommitCallbacks() as callbacks, self.assertLogs('todo.training', 'WARNING'):
+            again, created = submit_training(self.profile)
+        self.assertFalse(created)
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(again.status, 'queued')
+        self.assertEqual(len(callbacks), 1)
+
+        # Worker sweep cũng nhận lại job kẹt
+        TrainingJob.objects.filter(pk=job.pk).update(
+            status='running', started_at=timezone.now() - timedelta(hours=2),
+        )
+        with self.assertLogs('todo.training', 'WARNING'):
+            self.assertEqual(run_queued_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertTrue(job.trained)
+
+    def test_recent_running_job_is_left_alone(self):
+        job = TrainingJob.objects.create(profile=self.profile, status='running', started_at=timezone.now())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            again, created = submit_training(self.profile)
+
+        self.assertEqual((again.pk, created, again.status), (job.pk, False, 'running'))
+        self.assertEqual(callbacks, [])
+        self.assertEqual(run_queued_jobs(), 0)
+
+    @override_settings(TODO_TRAINING_EAGER=True)
+    def test_submit_then_poll(self):
+        response = self.client.post(reverse('todo:api_train_model'))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+
+        data = self.client.get(reverse('todo:api_training_status', args=[job_id])).json()
+        self.assertEqual(data['state'], 'succeeded')
+        self.assertTrue(data['finished'])
+        self.assertTrue(data['trained'])
+        self.assertTrue(os.path.exists(TaskPredictor.artifact_path(self.profile.pk)))
+        self.assertFalse(os.path.exists(TaskPredictor.artifact_path(None)))
+
+        other = User.objects.create_user(username='other', password='secret')
+        self.client.force_login(other)
+        response = self.client.get(reverse('todo:api_training_status', args=[job_id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PredictorRegistryTest(TodoTestCase):
+    '''Model riêng theo profile nằm trong LRU có giới hạn, thiếu thì dùng model chung'''
+
+    def setUp(self):
+        super().setUp()
+        self.profiles = []
+        for i in range(3):
+            profile = User.objects.create_user(username=f'lru{i}', password='secret').profile
+            for j in range(MIN_TRAINING_SAMPLES):
+                ToDoItem.objects.create(
+                    profile=profile, title=f'T{j}', is_completed=True, actual_duration=(i + 1) * 20 + j,
+                )
+            self.profiles.append(profile)
+        self.registry = PredictorRegistry(TaskPredictor, TaskPredictor.artifact_path, max_models=2)
+
+    def train(self, profile):
+        completed = ToDoItem.objects.filter(profile=profile, is_completed=True)
+        self.assertTrue(TaskPredictor(profile.pk).train_model(completed))
+
+    def test_fallback_to_global_model(self):
+        self.assertIsNone(self.registry.get(self.profiles[0].pk).model)
+        self.assertTrue(train_global_model())
+
+        predictor = self.registry.get(self.profiles[0].pk)
+        self.assertIsNone(predictor.profile_id)
+        self.assertIsNotNone(predictor.model)
+        self.assertEqual(self.registry.stats()['fallbacks'], 2)
+
+    def test_lru_eviction_and_hit_ratio(self):
+        for profile in self.profiles:
+            self.train(profile)
+
+        first, second, third = (p.pk for p in self.profiles)
+        self.assertEqual(self.registry.get(first).profile_id, first)   # miss
+        self.registry.get(second)                                       # miss
+        self.registry.get(first)                                        # hit, first thành mới nhất
+        self.registry.get(third)                                        # miss, loại second
+        self.registry.get(first)                                        # hit
+
+        stats = self.registry.stats()
+        self.assertEqual(stats['cached_models'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+        self.assertAlmostEqual(stats['hit_ratio'], 0.4)
+        self.assertGreater(stats['memory_bytes'], 0)
+
+        self.registry.get(second)                                       # miss, phải load lại
+        self.assertEqual(self.registry.stats()['loads'], 4)
+
+    def test_reload_when_artifact_changes(self):
+        profile = self.profiles[0]
+        self.train(profile)
+        before = self.registry.get(profile.pk)
+
+        self.train(profile)
+        path = TaskPredictor.artifact_path(profile.pk)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertIsNot(self.registry.get(profile.pk), before)
+
+
+class OnlineLearningTest(TodoTestCase):
+    '''Hoàn thành task cập nhật model riêng của profile mà không train lại toàn bộ'''
+
+    def setUp(self):
+        super().setUp()
+        self.profile = User.objects.create_user(username='online', password='secret').profile
+
+    def test_running_statistics_match_least_squares(self):
+        from sklearn.linear_model import LinearRegression
+
+        rows = [[i % 5, i % 3 + 1, i * 7 % 50, i % 2, i % 3, 60, 5 + i % 4, i % 7 / 7] for i in range(40)]
+        targets = [30 + 5 * r[0] + 10 * r[1] + 0.5 * r[2] - 3 * r[6] for r in rows]
+
+        stats = RunningLeastSquares(len(FEATURE_NAMES))
+        for row, target in zip(rows, targets):
+            stats.update(row, target)
+        intercept, coef = stats.solve()
+
+        # Feature avg_study_duration là hằng số nên chỉ so sánh dự đoán, không so từng hệ số
+        expected = LinearRegression().fit(rows, targets).predict(rows)
+        for row, value in zip(rows, expected):
+            self.assertAlmostEqual(intercept + sum(c * x for c, x in zip(coef, row)), value, places=2)
+
+        seeded = RunningLeastSquares.from_matrix(rows, targets)
+        self.assertEqual(seeded.count, stats.count)
+        for a, b in zip(seeded.xty, stats.xty):
+            self.assertAlmostEqual(a, b)
+
+    def test_mark_completed_updates_profile_model(self):
+        path = TaskPredictor.artifact_path(self.profile.pk)
+        # Model riêng chỉ được công bố khi số mẫu > số tham số (hệ số + intercept)
+        needed = len(FEATURE_NAMES) + 2
+        for i in range(needed):
+            task = ToDoItem.objects.create(profile=self.profile, title=f'Essay {i}', priority='high')
+            ToDoItem.objects.filter(pk=task.pk).update(
+                created_at=timezone.now() - timedelta(minutes=40 + i % 3 * 10)
+            )
+            task.refresh_from_db()
+            task.updated_at = timezone.now()
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.assertTrue(task.mark_completed())
+            # Artifact chỉ được ghi sau commit, ngoài khóa dòng thống kê
+            self.assertFalse(os.path.exists(path))
+            for callback in callbacks:
+                callback()
+            self.assertEqual(os.path.exists(path), i == needed - 1)
+
+        state = OnlineModelState.objects.get(profile=self.profile)
+        self.assertEqual(state.sample_count, needed)
+        model = LinearDurationModel.load(path)
+        new_task = ToDoItem(profile=self.profile, title='Essay', priority='high')
+        self.assertAlmostEqual(
+            model.predict_one(TaskPredictor.extract_features(new_task, self.profile)), 50, delta=15
+        )
+
+    def test_online_update_reads_fresh_completion_rate(self):
+        tasks = [ToDoItem.objects.create(profile=self.profile, title=f'T{i}') for i in range(4)]
+        ToDoItem.objects.filter(pk__in=[t.pk for t in tasks]).update(created_at=timezone.now() - timedelta(minutes=40))
+        # Feature đã nằm trong cache với tỉ lệ hoàn thành cũ
+        self.assertEqual(get_features(self.profile)['completion_rate'], 0)
+        rate = FEATURE_NAMES.index('completion_rate') + 1
+
+        task = ToDoItem.objects.get(pk=tasks[0].pk)
+        task.updated_at = timezone.now()
+        task.mark_completed()
+        self.assertAlmostEqual(OnlineModelState.objects.get(profile=self.profile).xtx[0][rate], 0.25)
+
+        self.profile.refresh_from_db()
+        ToDoItem.complete_many(self.profile, [tasks[1].pk])
+        self.assertAlmostEqual(OnlineModelState.objects.get(profile=self.profile).xtx[0][rate], 0.25 + 0.5)
+
+    def test_full_training_seeds_online_state(self):
+        for i in range(MIN_TRAINING_SAMPLES):
+            ToDoItem.objects.create(profile=self.profile, title=f'T{i}', is_completed=True, actual_duration=30 + i)
+        completed = ToDoItem.objects.filter(profile=self.profile)
+        self.assertTrue(TaskPredictor(self.profile.pk).train_model(completed))
+        self.assertEqual(OnlineModelState.objects.get(profile=self.profile).sample_count, MIN_TRAINING_SAMPLES)
+
+    def test_full_training_needs_more_samples_than_parameters(self):
+        # Cùng ngưỡng với học online: ít mẫu hơn số tham số thì không ghi model riêng
+        for i in range(len(FEATURE_NAMES) + 1):
+            ToDoItem.objects.create(profile=self.profile, title=f'T{i}', is_completed=True, actual_duration=30 + i)
+        completed = ToDoItem.objects.filter(profile=self.profile)
+
+        self.assertFalse(TaskPredictor(self.profile.pk).train_model(completed))
+        self.assertFalse(os.path.exists(TaskPredictor.artifact_path(self.profile.pk)))
+        self.assertFalse(OnlineModelState.objects.filter(profile=self.profile).exists())
+
+
+class FeatureStoreTest(TodoTestCase):
+    '''Feature theo profile được cập nhật khi ghi dữ liệu, lúc dự đoán không phải aggregate lại'''
+
+    def setUp(self):
+        from study.models import Subject
+
+        super().setUp()
+        self.profile = User.objects.create_user(username='features', password='secret').profile
+        self.subject = Subject.objects.create(profile=self.profile, name='Math')
+
+    def study(self, minutes):
+        from study.models import StudySession
+
+        session = StudySession.objects.create(
+            profile=self.profile, subject=self.subject,
+            start_time=timezone.now() - timedelta(minutes=minutes),
+        )
+        session.stop()
+        return session
+
+    def test_writes_update_features_incrementally(self):
+        from emotion.models import EmotionEntry
+
+        self.study(30)
+        session = self.study(60)
+        EmotionEntry.objects.create(profile=self.profile, study_session=session, emotion='happy')
+        tasks = [ToDoItem.objects.create(profile=self.profile, title=f'T{i}') for i in range(4)]
+        tasks[0].mark_completed()
+
+        self.profile.refresh_from_db()
+        features = get_features(self.profile)
+        self.assertAlmostEqual(features['avg_study_duration'], 45, delta=0.1)
+        self.assertEqual(features['mood_score'], 8)
+        self.assertEqual(features['completion_rate'], 0.25)
+
+        # Kết quả cập nhật tăng dần phải khớp với tính lại từ đầu
+        rebuilt = rebuild_features([self.profile.pk])[self.profile.pk].as_features()
+        self.assertEqual(rebuilt.keys(), features.keys())
+        for name, value in rebuilt.items():
+            self.assertAlmostEqual(value, features[name], places=6)
+
+    def test_prediction_hot_path_is_query_free(self):
+        task = ToDoItem(profile=self.profile, title='Read', priority='low')
+        TaskPredictor.extract_features(task, self.profile)  # lần đầu: nạp vào cache
+        with self.assertNumQueries(0):
+            features = TaskPredictor.extract_features(task, self.profile)
+        self.assertEqual(features['avg_study_duration'], 60)
+
+        # Dữ liệu đổi (data_version tăng) thì đọc lại feature mới
+        self.study(20)
+        self.profile.refresh_from_db()
+        self.assertAlmostEqual(
+            TaskPredictor.extract_features(task, self.profile)['avg_study_duration'], 20, delta=0.1
+        )
+
+
+class BatchPredictionTest(TodoTestCase):
+    '''Dự đoán nhiều task nháp trong một request, kết quả giống dự đoán từng task'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='planner', password='secret')
+        self.profile = self.user.profile
+        for i in range(MIN_TRAINING_SAMPLES):
+            ToDoItem.objects.create(
+                profile=self.profile, title=f'Done {i}', description='x' * i * 20,
+                priority=['low', 'medium', 'high'][i % 3], is_completed=True, actual_duration=25 + i * 15,
+            )
+        TaskPredictor(self.profile.pk).train_model(ToDoItem.objects.filter(profile=self.profile))
+        self.client.login(username='planner', password='secret')
+        self.drafts = [
+            {'title': f'Plan {i}', 'description': 'y' * i * 30, 'priority': ['low', 'medium', 'high'][i % 3]}
+            for i in range(7)
+        ]
+
+    def test_batch_matches_single_predictions(self):
+        single = [
+            self.client.post(reverse('todo:api_predict_duration'), data=draft, content_type='application/json')
+            .json()['predicted_minutes']
+            for draft in self.drafts
+        ]
+        response = self.client.post(
+            reverse('todo:api_predict_durations'), data={'tasks': self.drafts}, content_type='application/json'
+        ).json()
+
+        self.assertEqual(response['status'], 'success')
+        self.assertEqual([p['predicted_minutes'] for p in response['predictions']], single)
+        self.assertEqual(response['total_minutes'], sum(single))
+        self.assertEqual(response['confidence'], 'high')
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        url = reverse('todo:api_predict_durations')
+        self.client.post(url, data={'tasks': self.drafts[:1]}, content_type='application/json')
+        with CaptureQueriesContext(connection) as one:
+            self.client.post(url, data={'tasks': self.drafts[:1]}, content_type='application/json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(url, data={'tasks': self.drafts}, content_type='application/json')
+        self.assertEqual(len(one), len(many))
+
+    def test_predict_missing_durations_for_bulk_create(self):
+        tasks = [ToDoItem(profile=self.profile, title=d['title'], priority=d['priority']) for d in self.drafts]
+        ToDoItem.predict_missing_durations(tasks)
+        self.assertTrue(all(15 <= task.predicted_duration <= 480 for task in tasks))
+
+    def test_rejects_invalid_payload(self):
+        url = reverse('todo:api_predict_durations')
+        response = self.client.post(url, data={'tasks': 'nope'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, data={'tasks': [{}] * 101}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkTaskApiTest(TodoTestCase):
+    '''Tạo/hoàn thành/xóa nhiều task trong 1 request, cộng xu 1 lần'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='bulk', password='secret')
+        self.profile = self.user.profile
+        self.client.login(username='bulk', password='secret')
+
+    def post(self, name, payload):
+        return self.client.post(reverse(f'todo:{name}'), data=payload, content_type='application/json')
+
+    def create(self, count):
+        response = self.post('api_bulk_create_tasks', {
+            'tasks': [{'title': f'Task {i}', 'priority': ['low', 'medium', 'high'][i % 3]} for i in range(count)]
+        }).json()
+        return [r['task_id'] for r in response['results']]
+
+    def test_bulk_create_reports_per_item_results(self):
+        response = self.post('api_bulk_create_tasks', {'tasks': [
+            {'title': 'Read chapter 1', 'priority': 'low'},
+            {'title': ''},
+            {'title': 'Lab report', 'priority': 'urgent'},
+            {'title': 'Essay', 'priority': 'high', 'due_date': '2030-01-01T10:00:00Z'},
+        ]}).json()
+
+        self.assertEqual(response['created'], 2)
+        self.assertEqual([r['status'] for r in response['results']], ['created', 'error', 'error', 'created'])
+        essay = ToDoItem.objects.get(pk=response['results'][3]['task_id'])
+        self.assertEqual(essay.reward_coins, 50)
+        self.assertEqual(essay.predicted_duration, 90)
+        self.assertIsNotNone(essay.deadline)
+        self.assertEqual(get_features(self.profile)['completion_rate'], 0.0)
+
+    def test_bulk_complete_awards_coins_once(self):
+        task_ids = self.create(50)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post('api_bulk_complete_tasks', {'task_ids': task_ids + [999999]}).json()
+
+        expected_coins = sum(ToDoItem.objects.filter(pk__in=task_ids).values_list('reward_coins', flat=True))
+        self.assertEqual(response['completed'], 50)
+        self.assertEqual(response['coins_awarded'], expected_coins)
+        self.assertEqual(response['results'][-1], {'task_id': 999999, 'status': 'not_found'})
+        self.assertLess(len(ctx), 30)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.coins, expected_coins)
+        self.assertEqual(self.profile.transactions.count(), 1)
+        self.assertEqual(ToDoItem.objects.filter(profile=self.profile, is_completed=True).count(), 50)
+
+        # Gửi lại không được cộng xu lần nữa
+        again = self.post('api_bulk_complete_tasks', {'task_ids': task_ids[:3]}).json()
+        self.assertEqual(again['coins_awarded'], 0)
+        self.assertEqual({r['status'] for r in again['results']}, {'already_completed'})
+
+    def test_bulk_delete_only_own_tasks(self):
+        task_ids = self.create(5)
+        other = User.objects.create_user(username='other', password='secret').profile
+        foreign = ToDoItem.objects.create(profile=other, title='Not yours')
+
+        response = self.post('api_bulk_delete_tasks', {'task_ids': task_ids[:3] + [foreign.pk]}).json()
+        self.assertEqual(response['deleted'], 3)
+        self.assertEqual(response['results'][-1]['status'], 'not_found')
+        self.assertTrue(ToDoItem.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(ToDoItem.objects.filter(profile=self.profile).count(), 2)
+
+    def test_rejects_invalid_ids(self):
+        self.assertEqual(self.post('api_bulk_complete_tasks', {'task_ids': []}).status_code, 400)
+        self.assertEqual(self.post('api_bulk_delete_tasks', {'task_ids': ['x']}).status_code, 400)
+        self.assertEqual(self.post('api_bulk_delete_tasks', {'task_ids': list(range(101))}).status_code, 400)
+
+
+class TaskListQueryTest(TodoTestCase):
+    '''Danh sách task: lọc quá hạn và thống kê chạy trong SQL, số query không đổi theo số task'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='lister', password='secret')
+        self.profile = self.user.profile
+        self.client.login(username='lister', password='secret')
+
+    def add_tasks(self, count):
+        now = timezone.now()
+        tasks = []
+        for i in range(count):
+            task = ToDoItem(
+                profile=self.profile, title=f'T{i}', predicted_duration=30,
+                is_completed=i % 4 == 0,
+                deadline=now + timedelta(days=1 if i % 2 else -1) if i % 3 else None,
+            )
+            task.assign_default_reward()
+            tasks.append(task)
+        ToDoItem.objects.bulk_create(tasks)
+
+    def get(self, status):
+        get_api_cache().clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('todo:api_get_tasks'), {'status': status})
+        return response.json(), len(ctx)
+
+    def test_overdue_filter_and_stats(self):
+        self.add_tasks(24)
+        all_tasks = list(ToDoItem.objects.filter(profile=self.profile))
+
+        data, _ = self.get('overdue')
+        expected = {t.pk for t in all_tasks if t.is_overdue()}
+        self.assertEqual({t['id'] for t in data['tasks']}, expected)
+        self.assertTrue(all(t['is_overdue'] for t in data['tasks']))
+        self.assertEqual(data['stats'], {
+            'total': 24,
+            'completed': sum(t.is_completed for t in all_tasks),
+            'pending': sum(not t.is_completed for t in all_tasks),
+            'overdue': len(expected),
+        })
+
+    def test_query_count_constant(self):
+        self.add_tasks(5)
+        small = {status: self.get(status)[1] for status in ('all', 'overdue')}
+        self.add_tasks(200)
+        large = {status: self.get(status)[1] for status in ('all', 'overdue')}
+        self.assertEqual(small, large)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class SendDueRemindersTest(TodoTestCase):
+    '''Lệnh send_due_reminders: 1 kết nối mail, gửi từng email, ghi cờ và log hàng loạt theo lô'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='remind', password='secret', email='remind@example.com')
+        self.profile = self.user.profile
+        now = timezone.now()
+        self.due = [
+            ToDoItem.objects.create(profile=self.profile, title=f'Due {i}', deadline=now + timedelta(hours=i + 1))
+            for i in range(5)
+        ]
+        # Không cần nhắc: còn xa, đã quá hạn, đã xong, đã nhắc
+        ToDoItem.objects.create(profile=self.profile, title='Later', deadline=now + timedelta(days=3))
+        ToDoItem.objects.create(profile=self.profile, title='Overdue', deadline=now - timedelta(hours=1))
+        ToDoItem.objects.create(
+            profile=self.profile, title='Done', deadline=now + timedelta(hours=2), is_completed=True
+        )
+        ToDoItem.objects.create(
+            profile=self.profile, title='Sent', deadline=now + timedelta(hours=2), reminder_sent=True
+        )
+        # Người dùng tắt nhắc hoặc không có email
+        opted_out = User.objects.create_user(username='quiet', password='secret', email='quiet@example.com')
+        opted_out.profile.email_reminder = False
+        opted_out.profile.save()
+        ToDoItem.objects.create(profile=opted_out.profile, title='Quiet', deadline=now + timedelta(hours=2))
+        no_email = User.objects.create_user(username='noemail', password='secret')
+        ToDoItem.objects.create(profile=no_email.profile, title='No email', deadline=now + timedelta(hours=2))
+
+    def test_sends_each_due_task_once(self):
+        call_command('send_due_reminders', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(sorted(m.subject for m in mail.outbox), sorted(
+            f"🔔 Reminder: '{task.title}' deadline approaching" for task in self.due
+        ))
+        self.assertTrue(all(m.to == ['remind@example.com'] for m in mail.outbox))
+        self.assertEqual(
+            set(ToDoItem.objects.filter(reminder_sent=True).values_list('title', flat=True)),
+            {task.title for task in self.due} | {'Sent'},
+        )
+        self.assertEqual(ReminderLog.objects.filter(status='success').count(), 5)
+
+        # Lần chạy sau không gửi lại
+        call_command('send_due_reminders', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        # Mỗi lô: 1 select + 1 update + 1 bulk insert log; thêm 1 select rỗng để kết thúc
+        with CaptureQueriesContext(connection) as queries:
+            result = send_due_reminders(batch_size=10)
+        self.assertEqual(result, {'due': 5, 'sent': 5, 'failed': 0})
+        self.assertEqual(len(queries), 4)
+
+    def test_dry_run_sends_nothing(self):
+        result = send_due_reminders(dry_run=True)
+        self.assertEqual(result['due'], 5)
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(ToDoItem.objects.filter(title__startswith='Due', reminder_sent=True).exists())
+
+    def test_failed_batch_is_logged_and_retried(self):
+        class BrokenBackend:
+            def open(self):
+                pass
+
+            def close(self):
+                pass
+
+            def send_messages(self, messages):
+                raise OSError('smtp down')
+
+        result = send_due_reminders(connection=BrokenBackend())
+        self.assertEqual(result['failed'], 5)
+        self.assertEqual(ReminderLog.objects.filter(status='failed: smtp down').count(), 5)
+        self.assertFalse(ToDoItem.objects.filter(title__startswith='Due', reminder_sent=True).exists())
+
+        self.assertEqual(send_due_reminders()['sent'], 5)
+
+    def test_one_bad_message_does_not_fail_the_batch(self):
+        class FlakyBackend:
+            '''Lỗi giữa lô: email của task "Due 2" bị từ chối, các email khác vẫn đi'''
+            def __init__(self):
+                self.sent = []
+
+            def open(self):
+                pass
+
+            def close(self):
+                pass
+
+            def send_messages(self, messages):
+                for message in messages:
+                    if 'Due 2' in message.subject:
+                        raise OSError('mailbox unavailable')
+                    self.sent.append(message.subject)
+                return len(messages)
+
+        backend = FlakyBackend()
+        result = send_due_reminders(connection=backend)
+
+        self.assertEqual(result, {'due': 5, 'sent': 4, 'failed': 1})
+        self.assertEqual(len(backend.sent), 4)
+        self.assertEqual(
+            list(ToDoItem.objects.filter(title__startswith='Due', reminder_sent=False).values_list('title', flat=True)),
+            ['Due 2'],
+        )
+        self.assertEqual(ReminderLog.objects.get(status__startswith='failed').status, 'failed: mailbox unavailable')
+
+        # Lần chạy sau chỉ gửi lại email bị lỗi
+        self.assertEqual(send_due_reminders(), {'due': 1, 'sent': 1, 'failed': 0})
+        self.assertEqual([m.subject for m in mail.outbox], ["🔔 Reminder: 'Due 2' deadline approaching"])
@@ -0,0 +1,148 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ToDoItem, TrainingJob, TaskPredictor, predictor_registry
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Job 'running' quá thời gian này coi như worker đã chết giữa chừng (crash/khởi động lại)
+DEFAULT_STALE_AFTER = timedelta(minutes=30)
+
+
+def _get_executor():
+    '''Thread pool dùng chung cho cả process (mặc định 1 worker để các lần train ghi file lần lượt)'''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TODO_TRAINING_WORKERS', 1),
+                thread_name_prefix='todo-training',
+            )
+        return _executor
+
+
+def _is_eager():
+    # Chạy ngay trong request (dùng cho test/dev), giống CELERY_TASK_ALWAYS_EAGER
+    return getattr(settings, 'TODO_TRAINING_EAGER', False)
+
+
+def _stale_after():
+    return getattr(settings, 'TODO_TRAINING_STALE_AFTER', DEFAULT_STALE_AFTER)
+
+
+def requeue_stale_jobs(profile=None, now=None):
+    '''Đưa các job kẹt ở 'running' (started_at cũ hơn TODO_TRAINING_STALE_AFTER) về 'queued'
+    để được nhận lại. Trả về số job đã đưa lại hàng đợi.'''
+    now = now or timezone.now()
+    stale = TrainingJob.objects.filter(status='running', started_at__lt=now - _stale_after())
+    if profile is not None:
+        stale = stale.filter(profile=profile)
+    requeued = stale.update(status='queued', started_at=None)
+    if requeued:
+        logger.warning("Requeued %s stale training job(s)", requeued)
+    return requeued
+
+
+def _dispatch(job):
+    if _is_eager():
+        run_training_job(job.pk)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job.pk))
+
+
+def submit_training(profile):
+    '''Đưa yêu cầu train của profile vào hàng đợi.
+    Nếu profile đã có job đang chờ/đang chạy thì trả về job đó (không tạo trùng);
+    job 'running' đã kẹt quá lâu thì được đưa lại hàng đợi và chạy lại.
+    Trả về (job, created).'''
+    if requeue_stale_jobs(profile=profile):
+        job = TrainingJob.objects.get(profile=profile, status='queued')
+        _dispatch(job)
+        return job, False
+
+    active = TrainingJob.objects.filter(profile=profile, status__in=TrainingJob.ACTIVE_STATUSES).first()
+    if active:
+        return active, False
+
+    try:
+        with transaction.atomic():
+            job = TrainingJob.objects.create(profile=profile)
+    except IntegrityError:
+        # Request khác vừa tạo job cho cùng profile
+        job = TrainingJob.objects.filter(profile=profile).first()
+        return job, False
+
+    _dispatch(job)
+    return job, True
+
+
+def _run_in_worker(job_id):
+    try:
+        run_training_job(job_id)
+    finally:
+        # Thread worker tự mở kết nối DB riêng, phải đóng khi xong
+        close_old_connections()
+
+
+def run_training_job(job_id):
+    '''Chạy một job đang ở trạng thái queued. Trả về False nếu job đã được worker khác nhận'''
+    claimed = TrainingJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = TrainingJob.objects.select_related('profile').get(pk=job_id)
+    try:
+        completed_tasks = ToDoItem.objects.filter(
+            profile=job.profile,
+            is_completed=True,
+            actual_duration__isnull=False,
+        )
+        # Model riêng của profile, không ghi đè model của người khác
+        trained = TaskPredictor(job.profile_id).train_model(completed_tasks)
+        if trained:
+            # Các request sau dùng ngay model mới
+            predictor_registry.invalidate(job.profile_id)
+
+        job.status = 'succeeded'
+        job.trained = trained
+        job.training_samples = completed_tasks.count()
+        job.message = 'AI model trained successfully!' if trained else 'Need more completed tasks to train AI'
+    except Exception as e:
+        logger.exception("Training job %s failed", job_id)
+        job.status = 'failed'
+        job.message = str(e)[:255]
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'trained', 'training_samples', 'message', 'finished_at'])
+    return True
+
+
+def run_queued_jobs():
+    '''Chạy tuần tự các job còn chờ (vd. bị bỏ dở khi process khởi động lại),
+    kể cả job 'running' đã kẹt quá lâu (worker chết giữa chừng)'''
+    requeue_stale_jobs()
+    ran = 0
+    for job_id in TrainingJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True):
+        ran += run_training_job(job_id)
+    return ran
+
+
+def train_global_model():
+    '''Train model chung trên task đã hoàn thành của mọi người (dùng khi profile chưa có model riêng)'''
+    completed_tasks = ToDoItem.objects.filter(is_completed=True, actual_duration__isnull=False)
+    trained = TaskPredictor().train_model(completed_tasks)
+    if trained:
+        predictor_registry.invalidate()
+    return trained
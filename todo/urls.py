@@ -13,7 +13,12 @@ urlpatterns = [
     path('api/get-tasks/', views.api_get_tasks, name='api_get_tasks'),
     path('api/update-task-status/<int:task_id>/', views.api_update_task_status, name='api_update_task_status'),
     path('api/delete-task/<int:task_id>/', views.api_delete_task, name='api_delete_task'),
+    path('api/bulk/create-tasks/', views.api_bulk_create_tasks, name='api_bulk_create_tasks'),
+    path('api/bulk/complete-tasks/', views.api_bulk_complete_tasks, name='api_bulk_complete_tasks'),
+    path('api/bulk/delete-tasks/', views.api_bulk_delete_tasks, name='api_bulk_delete_tasks'),
     path('api/home-tasks/', views.api_home_tasks, name='api_home_tasks'),
     path('api/predict-duration/', views.api_predict_duration, name='api_predict_duration'),
+    path('api/predict-durations/', views.api_predict_durations, name='api_predict_durations'),
     path('api/train-model/', views.api_train_model, name='api_train_model'),
+    path('api/train-model/<int:job_id>/', views.api_training_status, name='api_training_status'),
 ]
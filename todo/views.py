@@ -4,8 +4,17 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from django.db.models import Count, Q
 import json
-from .models import ToDoItem, ReminderLog, TaskPredictor
+from .models import ToDoItem, ReminderLog, TrainingJob, format_minutes, predictor_registry
+from .features import refresh_task_stats
+from .training import submit_training
+from accounts.cache import cached_api
+
+# Số task tối đa trong một request theo lô
+MAX_BATCH_SIZE = 100
 
 @login_required
 def add_todo(request):
@@ -37,6 +46,7 @@ def api_create_task(request):
             task.deadline = timezone.datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
         
         task.save()
+        user.profile.bump_data_version()
         
         return JsonResponse({
             'status': 'success',
@@ -51,10 +61,12 @@ def api_create_task(request):
 
 @login_required
 @require_http_methods(["GET"])
+@cached_api('tasks', timeout=60)  # time_left/is_overdue thay đổi theo thời gian nên giữ TTL ngắn
 def api_get_tasks(request):
     try:
         user = request.user
         status_filter = request.GET.get('status', 'all')
+        now = timezone.now()
         
         tasks = ToDoItem.objects.filter(profile=user.profile)
         
@@ -64,7 +76,7 @@ def api_get_tasks(request):
         elif status_filter == 'completed':
             tasks = tasks.filter(is_completed=True)
         elif status_filter == 'overdue':
-            tasks = [task for task in tasks if task.is_overdue()]
+            tasks = tasks.filter(ToDoItem.overdue_q(now))
         
         tasks_data = []
         for task in tasks:
@@ -83,21 +95,18 @@ def api_get_tasks(request):
                 'status': 'completed' if task.is_completed else 'pending'
             })
         
-        # Tính statistics
-        total_tasks = ToDoItem.objects.filter(profile=user.profile).count()
-        completed_tasks = ToDoItem.objects.filter(profile=user.profile, is_completed=True).count()
-        pending_tasks = total_tasks - completed_tasks
-        overdue_tasks = len([task for task in ToDoItem.objects.filter(profile=user.profile) if task.is_overdue()])
+        # Tính statistics (1 query, đếm có điều kiện)
+        stats = ToDoItem.objects.filter(profile=user.profile).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(is_completed=True)),
+            pending=Count('id', filter=Q(is_completed=False)),
+            overdue=Count('id', filter=ToDoItem.overdue_q(now)),
+        )
         
         return JsonResponse({
             'status': 'success',
             'tasks': tasks_data,
-            'stats': {
-                'total': total_tasks,
-                'completed': completed_tasks,
-                'pending': pending_tasks,
-                'overdue': overdue_tasks
-            }
+            'stats': stats
         })
         
     except Exception as e:
@@ -120,6 +129,7 @@ def api_update_task_status(request, task_id):
             task.is_completed = False
             task.save()
             new_status = 'pending'
+        user.profile.bump_data_version()
         
         return JsonResponse({
             'status': 'success',
@@ -140,6 +150,7 @@ def api_delete_task(request, task_id):
         user = request.user
         task = ToDoItem.objects.get(id=task_id, profile=user.profile)
         task.delete()
+        user.profile.bump_data_version()
         
         return JsonResponse({
             'status': 'success',
@@ -151,7 +162,140 @@ def api_delete_task(request, task_id):
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
 
+def _parse_task_ids(data):
+    """Danh sách id (không trùng, giữ thứ tự) từ body; raise ValueError nếu không hợp lệ"""
+    task_ids = data.get('task_ids')
+    if not isinstance(task_ids, list) or not task_ids:
+        raise ValueError('task_ids must be a non-empty list')
+    if len(task_ids) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} tasks per request')
+    return list(dict.fromkeys(int(task_id) for task_id in task_ids))
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+def api_bulk_create_tasks(request):
+    """Tạo nhiều task trong 1 transaction: dự đoán thời gian theo lô rồi bulk_create"""
+    try:
+        data = json.loads(request.body)
+        items = data.get('tasks')
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'status': 'error', 'message': 'tasks must be a non-empty list'}, status=400)
+        if len(items) > MAX_BATCH_SIZE:
+            return JsonResponse(
+                {'status': 'error', 'message': f'At most {MAX_BATCH_SIZE} tasks per request'}, status=400
+            )
+
+        profile = request.user.profile
+        categories = dict(ToDoItem.CATEGORY_CHOICES)
+        priorities = dict(ToDoItem.PRIORITY_CHOICES)
+        results = [None] * len(items)
+        tasks = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not str(item.get('title') or '').strip():
+                results[index] = {'index': index, 'status': 'error', 'message': 'Title is required'}
+                continue
+            task = ToDoItem(
+                profile=profile,
+                title=str(item['title']).strip()[:200],
+                description=item.get('description', ''),
+                category=item.get('category', 'study'),
+                priority=item.get('priority', 'medium'),
+            )
+            if task.category not in categories or task.priority not in priorities:
+                results[index] = {'index': index, 'status': 'error', 'message': 'Invalid category or priority'}
+                continue
+            if item.get('due_date'):
+                try:
+                    task.deadline = timezone.datetime.fromisoformat(item['due_date'].replace('Z', '+00:00'))
+                except (TypeError, ValueError, AttributeError):
+                    results[index] = {'index': index, 'status': 'error', 'message': 'Invalid due_date'}
+                    continue
+            task.assign_default_reward()
+            tasks.append((index, task))
+
+        if tasks:
+            # Một lần gọi model cho cả lô thay vì dự đoán trong từng save()
+            ToDoItem.predict_missing_durations([task for _, task in tasks])
+            with transaction.atomic():
+                ToDoItem.objects.bulk_create([task for _, task in tasks])
+            refresh_task_stats(profile.pk)
+            profile.bump_data_version()
+
+        for index, task in tasks:
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'task_id': task.id,
+                'reward_coins': task.reward_coins,
+                'predicted_duration': task.get_duration_display(),
+            }
+
+        return JsonResponse({'status': 'success', 'created': len(tasks), 'results': results})
+
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
 @login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+def api_bulk_complete_tasks(request):
+    """Hoàn thành nhiều task: 1 bulk_update và 1 lần cộng xu cho cả lô"""
+    try:
+        task_ids = _parse_task_ids(json.loads(request.body))
+        profile = request.user.profile
+        outcome, coins = ToDoItem.complete_many(profile, task_ids)
+        completed = sum(1 for status in outcome.values() if status == 'completed')
+        if completed:
+            profile.bump_data_version()
+
+        return JsonResponse({
+            'status': 'success',
+            'completed': completed,
+            'coins_awarded': coins,
+            'results': [{'task_id': task_id, 'status': outcome[task_id]} for task_id in task_ids],
+        })
+
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+def api_bulk_delete_tasks(request):
+    """Xóa nhiều task bằng 1 queryset delete"""
+    try:
+        task_ids = _parse_task_ids(json.loads(request.body))
+        profile = request.user.profile
+        with transaction.atomic():
+            tasks = ToDoItem.objects.filter(profile=profile, pk__in=task_ids)
+            found = set(tasks.values_list('pk', flat=True))
+            if found:
+                tasks.delete()
+        if found:
+            refresh_task_stats(profile.pk)
+            profile.bump_data_version()
+
+        return JsonResponse({
+            'status': 'success',
+            'deleted': len(found),
+            'results': [
+                {'task_id': task_id, 'status': 'deleted' if task_id in found else 'not_found'}
+                for task_id in task_ids
+            ],
+        })
+
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+@login_required
+@cached_api('home_tasks')
 def api_home_tasks(request):
     user = request.user
 
@@ -168,6 +312,22 @@ def api_home_tasks(request):
         ]
     })
 
+def _draft_task(profile, data):
+    """Task tạm (không lưu) dựng từ dữ liệu form, chỉ dùng để dự đoán"""
+    deadline = data.get('due_date') or data.get('deadline')
+    return ToDoItem(
+        profile=profile,
+        title=data.get('title', ''),
+        description=data.get('description', ''),
+        category=data.get('category', 'study'),
+        priority=data.get('priority', 'medium'),
+        deadline=parse_datetime(deadline) if isinstance(deadline, str) else None,
+        created_at=timezone.now()
+    )
+
+def _confidence(predictor):
+    return 'high' if predictor.profile_id else ('medium' if predictor.model else 'low')
+
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
@@ -177,32 +337,16 @@ def api_predict_duration(request):
         user = request.user
         
         # Tạo task tạm để dự đoán
-        temp_task = ToDoItem(
-            profile=user.profile,
-            title=data.get('title', ''),
-            description=data.get('description', ''),
-            category=data.get('category', 'study'),
-            priority=data.get('priority', 'medium'),
-            created_at=timezone.now()
-        )
+        temp_task = _draft_task(user.profile, data)
         
-        predictor = TaskPredictor()
-        predicted_minutes = predictor.predict_duration(temp_task, user.profile)
-        
-        # Format kết quả
-        hours = predicted_minutes // 60
-        minutes = predicted_minutes % 60
-        
-        if hours > 0:
-            duration_text = f"{hours}h {minutes}m"
-        else:
-            duration_text = f"{minutes}m"
+        predictor = predictor_registry.get(user.profile.pk)
+        predicted_minutes = predictor_registry.predict_duration(temp_task, user.profile)
         
         return JsonResponse({
             'status': 'success',
             'predicted_minutes': predicted_minutes,
-            'duration_text': duration_text,
-            'confidence': 'high' if predictor.model else 'medium'
+            'duration_text': format_minutes(predicted_minutes),
+            'confidence': _confidence(predictor)
         })
         
     except Exception as e:
@@ -211,25 +355,56 @@ def api_predict_duration(request):
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
-def api_train_model(request):
+def api_predict_durations(request):
+    """Dự đoán cho nhiều task nháp trong một request (một lần gọi model)"""
     try:
-        user = request.user
-        
-        completed_tasks = ToDoItem.objects.filter(
-            profile=user.profile,
-            is_completed=True,
-            actual_duration__isnull=False
-        )
-        
-        predictor = TaskPredictor()
-        success = predictor.train_model(completed_tasks)
-        
+        data = json.loads(request.body)
+        drafts = data.get('tasks')
+        if not isinstance(drafts, list) or not all(isinstance(d, dict) for d in drafts):
+            return JsonResponse({'status': 'error', 'message': 'tasks must be a list of objects'}, status=400)
+        if len(drafts) > MAX_BATCH_SIZE:
+            return JsonResponse(
+                {'status': 'error', 'message': f'At most {MAX_BATCH_SIZE} tasks per request'}, status=400
+            )
+
+        profile = request.user.profile
+        tasks = [_draft_task(profile, draft) for draft in drafts]
+        predictor = predictor_registry.get(profile.pk)
+        predictions = predictor_registry.predict_durations(tasks, profile)
+
         return JsonResponse({
             'status': 'success',
-            'trained': success,
-            'training_samples': len(completed_tasks),
-            'message': 'AI model trained successfully!' if success else 'Need more completed tasks to train AI'
+            'predictions': [
+                {'predicted_minutes': minutes, 'duration_text': format_minutes(minutes)}
+                for minutes in predictions
+            ],
+            'total_minutes': sum(predictions),
+            'confidence': _confidence(predictor)
         })
-        
+
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+def api_train_model(request):
+    """Đưa yêu cầu train vào hàng đợi nền; client poll api_training_status để lấy kết quả"""
+    try:
+        job, created = submit_training(request.user.profile)
+        return JsonResponse({'status': 'success', 'created': created, **job.as_dict()}, status=202)
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+@login_required
+@require_http_methods(["GET"])
+def api_training_status(request, job_id):
+    try:
+        job = TrainingJob.objects.get(id=job_id, profile=request.user.profile)
+        return JsonResponse({'status': 'success', **job.as_dict()})
+
+    except TrainingJob.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Training job not found'}, status=404)
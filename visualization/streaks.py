@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import StudyStreak
+
+
+def compute_streaks(days, today=None):
+    '''Tính (current_streak, longest_streak, last_day) từ danh sách ngày (không cần sắp xếp, có thể trùng).
+    - current_streak: số ngày liên tiếp kết thúc ở hôm nay (0 nếu hôm nay chưa có)
+    - longest_streak: chuỗi dài nhất từng đạt'''
+    today = today or timezone.localdate()
+    days = sorted(set(days))
+    if not days:
+        return 0, 0, None
+
+    longest = run = 1
+    for prev, day in zip(days, days[1:]):
+        run = run + 1 if day - prev == timedelta(days=1) else 1
+        longest = max(longest, run)
+
+    # run lúc này là chuỗi kết thúc ở ngày cuối cùng trong danh sách
+    last_day = days[-1]
+    current = run if last_day == today else 0
+    return current, longest, last_day
+
+
+def study_days(user):
+    '''Các ngày (giờ địa phương) có học - 1 query trên bảng rollup'''
+    from study.models import DailyStudyRollup
+
+    return DailyStudyRollup.objects.filter(
+        profile__user=user, session_count__gt=0
+    ).values_list('day', flat=True).distinct()
+
+
+def emotion_days(profile):
+    '''Các ngày (giờ địa phương) có ghi nhận cảm xúc - 1 query'''
+    from emotion.models import EmotionEntry
+
+    return EmotionEntry.objects.filter(profile=profile).annotate(
+        day=TruncDate('created_at')
+    ).order_by().values_list('day', flat=True).distinct()
+
+
+def current_value(streak, today=None):
+    '''Streak hiện tại đọc từ bản ghi StudyStreak (chuỗi đứt nếu hôm nay chưa học)'''
+    today = today or timezone.localdate()
+    if streak.last_study_date == today:
+        return streak.current_streak
+    return 0
+
+
+def rebuild_study_streak(user):
+    '''Tính lại StudyStreak của user từ đầu (1 query ngày + 1 lần ghi)'''
+    days = list(study_days(user))
+    # current_streak lưu chuỗi kết thúc ở last_study_date (kể cả khi đó không phải hôm nay),
+    # khi đọc sẽ so với ngày hiện tại qua current_value()
+    current, longest, last_day = compute_streaks(days, today=max(days) if days else None)
+
+    with transaction.atomic():
+        streak = StudyStreak.objects.select_for_update().filter(user=user).first()
+        if streak is None:
+            streak = StudyStreak(user=user)
+        streak.current_streak = current
+        streak.longest_streak = longest
+        streak.last_study_date = last_day
+        streak.save()
+    return streak
+
+
+def get_study_streak(user):
+    '''Đọc streak học tập - O(1) nếu đã có bản ghi StudyStreak'''
+    streak = StudyStreak.objects.filter(user=user).first()
+    if streak is None:
+        streak = rebuild_study_streak(user)
+    return {
+        'current_streak': current_value(streak),
+        'longest_streak': streak.longest_streak,
+        'last_study_date': streak.last_study_date,
+    }
+
+
+def record_study_day(user, day):
+    '''Cập nhật StudyStreak tăng dần khi có một ngày học mới (gọi khi session kết thúc)'''
+    with transaction.atomic():
+        streak = StudyStreak.objects.select_for_update().filter(user=user).first()
+        if streak is None or streak.last_study_date is None or day < streak.last_study_date:
+            # Chưa có dữ liệu hoặc ghi bù ngày cũ → tính lại toàn bộ
+            return rebuild_study_streak(user)
+
+        if day == streak.last_study_date:
+            return streak
+
+        if day - streak.last_study_date == timedelta(days=1):
+            streak.current_streak += 1
+        else:
+            streak.current_streak = 1
+        streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+        streak.last_study_date = day
+        streak.save(update_fields=['current_streak', 'longest_streak', 'last_study_date', 'updated_at'])
+        return streak
+
+
+def get_emotion_streak(profile):
+    '''Streak số ngày liên tiếp có ghi nhận cảm xúc (cùng engine với streak học tập)'''
+    current, longest, _ = compute_streaks(emotion_days(profile))
+    return current, longest
@@ -1,3 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.cache import get_api_cache, get_cache_stats, reset_cache_stats
+from study.models import StudySession, Subject, DailyStudyRollup
+
+
+class VisualizationApiQueryCountTest(TestCase):
+    '''Số query của các API thống kê không được tăng theo số session'''
+
+    def setUp(self):
+        get_api_cache().clear()
+        self.user = User.objects.create_user(username='viz', password='secret')
+        self.profile = self.user.profile
+        self.subjects = [
+            Subject.objects.create(profile=self.profile, name=name)
+            for name in ('Math', 'Physics', 'English')
+        ]
+        self.client.login(username='viz', password='secret')
+
+    def grow_history(self, total):
+        '''Tạo thêm session đã kết thúc cho đến khi đủ `total` session'''
+        now = timezone.now()
+        existing = StudySession.objects.filter(profile=self.profile).count()
+        StudySession.objects.bulk_create([
+            StudySession(
+                profile=self.profile,
+                subject=self.subjects[i % len(self.subjects)],
+                start_time=now - timedelta(hours=i, minutes=30),
+                end_time=now - timedelta(hours=i),
+                duration_seconds=1800,
+                points_awarded=15,
+                is_active=False,
+            )
+            for i in range(existing, total)
+        ], batch_size=1000)
+        DailyStudyRollup.rebuild(self.profile)
+
+    def count_queries(self, url):
+        '''Số query của một request không đi qua cache API (đo đúng phần đọc rollup)'''
+        get_api_cache().clear()
+        reset_cache_stats()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual([counts['hits'] for counts in get_cache_stats().values()], [0])
+        return len(ctx)
+
+    def test_query_count_constant_as_history_grows(self):
+        urls = [
+            reverse('visualization:api_study_stats'),
+            reverse('visualization:api_subject_breakdown'),
+        ]
+
+        self.grow_history(10)
+        for url in urls:
+            self.client.get(url)  # khởi tạo các bản ghi lazy (vd. StudyStreak)
+        small = {url: self.count_queries(url) for url in urls}
+
+        self.grow_history(10_000)
+        large = {url: self.count_queries(url) for url in urls}
+
+        self.assertEqual(small, large)
+
+    def test_subject_breakdown_totals(self):
+        self.grow_history(30)
+        subjects = self.client.get(reverse('visualization:api_subject_breakdown')).json()['subjects']
+
+        self.assertEqual(sum(s['session_count'] for s in subjects), 30)
+        self.assertEqual({s['name'] for s in subjects}, {'Math', 'Physics', 'English'})
+        self.assertAlmostEqual(sum(s['total_minutes'] for s in subjects), 30 * 30)
+
+    def test_rollup_rebuild_invalidates_cached_stats(self):
+        url = reverse('visualization:api_study_stats')
+        self.grow_history(10)
+        self.assertEqual(self.client.get(url).json()['data']['total_study_time'], '5h 0m')
+
+        # grow_history ghi thẳng bằng bulk_create + DailyStudyRollup.rebuild, không qua view nào
+        self.grow_history(1000)
+
+        self.assertEqual(self.client.get(url).json()['data']['total_study_time'], '500h 0m')
+
+    def test_rebuild_command_invalidates_cached_stats(self):
+        url = reverse('visualization:api_study_stats')
+        self.grow_history(10)
+        self.client.get(url)
+        StudySession.objects.filter(profile=self.profile).update(duration_seconds=3600)
+
+        call_command('rebuild_study_rollups', profile=self.profile.pk, stdout=StringIO())
+
+        self.assertEqual(self.client.get(url).json()['data']['total_study_time'], '10h 0m')
+
+    def test_cancelled_session_leaves_no_empty_subject(self):
+        art = Subject.objects.create(profile=self.profile, name='Art')
+        session = StudySession.objects.create(
+            profile=self.profile, subject=art, start_time=timezone.now() - timedelta(minutes=40),
+        )
+        session.stop()
+        self.grow_history(4)
+        self.client.get(reverse('visualization:api_subject_breakdown'))
+
+        self.client.post(
+            reverse('study:api_cancel_session'), data={'session_id': session.pk}, content_type='application/json',
+        )
+        subjects = self.client.get(reverse('visualization:api_subject_breakdown')).json()['subjects']
 
-# Create your tests here.
+        self.assertEqual(sorted(s['name'] for s in subjects), ['English', 'Math', 'Physics'])
+        self.assertTrue(all(s['session_count'] > 0 for s in subjects))
+        self.assertFalse(DailyStudyRollup.objects.filter(profile=self.profile, session_count=0).exists())
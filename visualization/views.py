@@ -3,8 +3,12 @@ from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.db.models import Sum
 from datetime import timedelta
-from study.models import StudySession, Subject  # Import từ app study thật
+from study.models import StudySession, Subject, DailyStudyRollup  # Import từ app study thật
+from study.pagination import paginate_sessions, parse_page_size
+from .streaks import get_study_streak
+from accounts.cache import cached_api
 
 @login_required
 def study_stats(request):
@@ -26,14 +30,19 @@ def subject_breakdown(request):
 # API ENDPOINTS - Trả về JSON data thật từ app study
 @login_required
 @require_http_methods(["GET"])
+@cached_api('study_stats')
 def api_study_stats(request):
     """API lấy data thống kê tổng quan từ app study"""
     try:
         user = request.user
         
-        # Lấy sessions từ app study - SỬA: dùng profile__user
-        total_sessions = StudySession.objects.filter(profile__user=user)
-        total_duration_seconds = sum(session.duration_seconds for session in total_sessions)
+        # Tổng thời gian & số session lấy từ bảng rollup theo ngày
+        totals = DailyStudyRollup.objects.filter(profile__user=user).aggregate(
+            seconds=Sum('total_seconds'),
+            sessions=Sum('session_count'),
+        )
+        total_duration_seconds = totals['seconds'] or 0
+        total_session_count = totals['sessions'] or 0
         
         # Định dạng thời gian
         hours = total_duration_seconds // 3600
@@ -43,31 +52,22 @@ def api_study_stats(request):
         # Số môn học - SỬA: dùng profile__user
         subjects_count = Subject.objects.filter(profile__user=user).count()
         
-        # Streak (tạm tính)
-        today = timezone.now().date()
-        streak = 0
-        current_date = today
-        
-        # Tính streak đơn giản - kiểm tra 7 ngày gần nhất
-        for i in range(7):
-            if StudySession.objects.filter(
-                profile__user=user, 
-                start_time__date=current_date
-            ).exists():
-                streak += 1
-            else:
-                break
-            current_date -= timedelta(days=1)
+        # Streak đọc từ bảng StudyStreak (O(1))
+        streak = get_study_streak(user)['current_streak']
         
         # Thời gian trung bình mỗi session
-        avg_session = total_duration_seconds / len(total_sessions) / 60 if total_sessions else 0
+        avg_session = total_duration_seconds / total_session_count / 60 if total_session_count else 0
         avg_session_display = f"{int(avg_session)}m"
         
         # Data tuần này
         weekly_data = get_weekly_study_data(user)
         
         # Sessions gần đây
-        recent_sessions = StudySession.objects.filter(profile__user=user).order_by('-start_time')[:5]
+        recent_sessions = (
+            StudySession.objects.filter(profile__user=user)
+            .select_related('subject')
+            .order_by('-start_time')[:5]
+        )
         sessions_data = []
         for session in recent_sessions:
             end_time_display = session.end_time.strftime('%H:%M') if session.end_time else 'Now'
@@ -95,31 +95,40 @@ def api_study_stats(request):
 
 @login_required
 @require_http_methods(["GET"])
+@cached_api('study_sessions')
 def api_study_sessions(request):
-    """API lấy lịch sử sessions từ app study"""
+    """API lấy lịch sử sessions từ app study (phân trang bằng cursor)"""
     try:
         user = request.user
         time_filter = request.GET.get('filter', 'all')
         subject_filter = request.GET.get('subject', 'all')
+        cursor = request.GET.get('cursor')
+        page_size = parse_page_size(request.GET.get('limit'))
         
-        # Base queryset - SỬA: dùng app study
-        sessions = StudySession.objects.filter(profile__user=user)
+        # Base queryset - SỬA: dùng app study, join sẵn subject & emotion để tránh N+1
+        sessions = StudySession.objects.filter(profile__user=user).select_related('subject', 'emotion')
         
         # Áp dụng bộ lọc thời gian
         if time_filter == 'week':
-            start_date = timezone.now().date() - timedelta(days=7)
+            start_date = timezone.localdate() - timedelta(days=7)
             sessions = sessions.filter(start_time__date__gte=start_date)
         elif time_filter == 'month':
-            start_date = timezone.now().date() - timedelta(days=30)
+            start_date = timezone.localdate() - timedelta(days=30)
             sessions = sessions.filter(start_time__date__gte=start_date)
         
         # Áp dụng bộ lọc môn học
         if subject_filter != 'all':
             sessions = sessions.filter(subject__name=subject_filter)
+
+        try:
+            page, next_cursor = paginate_sessions(sessions, cursor, page_size)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
         
         sessions_data = []
-        for session in sessions.order_by('-start_time'):
+        for session in page:
             end_time_display = session.end_time.strftime('%H:%M') if session.end_time else 'Now'
+            emotion_entry = getattr(session, 'emotion', None)
             
             # SỬA: XÓA 'notes' VÌ MODEL THẬT KHÔNG CÓ
             sessions_data.append({
@@ -130,50 +139,56 @@ def api_study_sessions(request):
                 'display_date': session.start_time.strftime('%b %d, %Y'),
                 'start_time': session.start_time.strftime('%H:%M'),
                 'end_time': end_time_display,
-                # XÓA DÒNG NÀY: 'notes': session.notes or ''
+                'emotion': emotion_entry.emotion if emotion_entry else None,
             })
         
-        # Danh sách môn học cho filter - SỬA: dùng app study
-        subjects = Subject.objects.filter(profile__user=user).values_list('name', flat=True)
-        
-        return JsonResponse({
+        data = {
             'status': 'success',
             'sessions': sessions_data,
-            'subjects': list(subjects)
-        })
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        }
+
+        # Danh sách môn học cho filter chỉ cần gửi ở trang đầu
+        if not cursor:
+            data['subjects'] = list(Subject.objects.filter(profile__user=user).values_list('name', flat=True))
+        
+        return JsonResponse(data)
         
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
 
 @login_required
 @require_http_methods(["GET"])
+@cached_api('subject_breakdown')
 def api_subject_breakdown(request):
     """API lấy phân tích theo môn học từ app study"""
     try:
         user = request.user
         
-        # Lấy tất cả sessions của user
-        sessions = StudySession.objects.filter(profile__user=user)
-        
-        # Nhóm theo môn học
+        # Nhóm theo môn học ngay trong database (1 query, mỗi môn một dòng)
+        rows = (
+            DailyStudyRollup.objects.filter(profile__user=user)
+            .values('subject', 'subject__name', 'subject__color')
+            .annotate(total_seconds=Sum('total_seconds'), sessions=Sum('session_count'))
+            .order_by('-total_seconds')
+        )
+
         subject_totals = {}
-        for session in sessions:
-            subject_name = session.subject.name
-            subject_color = session.subject.color
-            
+        for row in rows:
+            subject_name = row['subject__name']
             # SỬA ĐƠN GIẢN: Nếu không có màu, gán màu mặc định
-            if not subject_color:
-                subject_color = '#6C63FF'  # Màu mặc định
-            
+            subject_color = row['subject__color'] or '#6C63FF'
+
             if subject_name not in subject_totals:
                 subject_totals[subject_name] = {
                     'total_duration_seconds': 0,
                     'session_count': 0,
                     'color': subject_color
                 }
-            
-            subject_totals[subject_name]['total_duration_seconds'] += session.duration_seconds
-            subject_totals[subject_name]['session_count'] += 1
+
+            subject_totals[subject_name]['total_duration_seconds'] += row['total_seconds']
+            subject_totals[subject_name]['session_count'] += row['sessions']
         
         # Tính phần trăm và định dạng data
         total_duration_all = sum((data['total_duration_seconds'] for data in subject_totals.values()), 0)
@@ -217,7 +232,7 @@ def api_subject_breakdown(request):
 # Helper functions
 def get_weekly_study_data(user):
     """Lấy data học tập trong tuần từ app study"""
-    today = timezone.now().date()
+    today = timezone.localdate()
     start_of_week = today - timedelta(days=today.weekday())  # Thứ 2
     
     week_days = []
@@ -229,19 +244,17 @@ def get_weekly_study_data(user):
             'minutes': 0
         })
     
-    # Lấy sessions trong tuần từ app study - SỬA: dùng profile__user
-    sessions = StudySession.objects.filter(
-        profile__user=user,
-        start_time__date__range=[start_of_week, today]
+    # Tổng thời gian mỗi ngày lấy từ bảng rollup (tối đa 7 dòng)
+    daily_totals = (
+        DailyStudyRollup.objects.filter(profile__user=user, day__range=[start_of_week, today])
+        .values('day')
+        .annotate(seconds=Sum('total_seconds'))
     )
-    
-    # Tính tổng thời gian mỗi ngày
-    for session in sessions:
-        session_date = session.start_time.date()
-        day_index = (session_date - start_of_week).days
-        
+
+    for row in daily_totals:
+        day_index = (row['day'] - start_of_week).days
+
         if 0 <= day_index < 7:
-            minutes = session.duration_seconds / 60
-            week_days[day_index]['minutes'] += minutes
+            week_days[day_index]['minutes'] += row['seconds'] / 60
     
-    return week_days
\ No newline at end of file
+    return week_days